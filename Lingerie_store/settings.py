@@ -171,12 +171,72 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.1/howto/static-files/
 
 STATIC_URL = "static/"
+STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
+# Hashed names, optimized PNGs and .gz/.br siblings (see womanshop/static_storage.py)
+STATICFILES_STORAGE = "womanshop.static_storage.CompressedManifestStaticFilesStorage"
 MEDIA_URL = "media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
-SESSION_ENGINE = "django.contrib.sessions.backends.signed_cookies"
+# The cookie only carries the session key; carts are rows (womanshop/carts.py)
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
 
 SITE_ID = 1
 
+# In-memory facet index used by catalog_api (see womanshop/facets.py)
+CATALOG_FACET_INDEX = True
+CATALOG_FACET_INDEX_TTL = 300
+CATALOG_FACET_COUNTS_TTL = 300
+# Shared by every process of the host, so the catalog version bumped by the
+# management commands and the image worker reaches the web workers; use a
+# Redis or Memcached CACHE_URL when running on several hosts
+CACHES = {
+    "default": env.cache(
+        "CACHE_URL", default="filecache://" + os.path.join(BASE_DIR, "cache")
+    )
+}
+# Versioned response cache of catalog_api (see womanshop/catalog_cache.py)
+CATALOG_CACHE_TTL = 600
+# Lock rebuilds of expired entries across processes (needs a shared cache backend)
+CATALOG_CACHE_LOCK = False
+CATALOG_CACHE_LOCK_TIMEOUT = 10
+# Seconds a request waits for an identical computation in flight before running its own
+SINGLE_FLIGHT_TIMEOUT = 10
+# Cache-Control max-age of catalog_api, product_api and search responses
+CATALOG_MAX_AGE = 60
+# Per-process Category/Style/Brand/Color/Size name/ID maps (see womanshop/dimensions.py)
+DIMENSION_CACHE_TTL = 300
+# In-memory product search index used by search_view (see womanshop/search_index.py)
+SEARCH_INDEX = True
+SEARCH_INDEX_TTL = 300
+SEARCH_RESULTS_LIMIT = 10
+# Text search configuration of the PostgreSQL search backend (see womanshop/search_backends.py);
+# run rebuild_catalog after changing it so the stored vectors use it too
+SEARCH_CONFIG = "russian"
+# Autocomplete trie used by autocomplete_view (see womanshop/autocomplete.py)
+AUTOCOMPLETE_TTL = 300
+AUTOCOMPLETE_LIMIT = 8
+# Length of the precomputed product recommendation lists (see womanshop/recommendations.py)
+RECOMMENDATIONS_LIMIT = 12
+# Length of the frequently bought together lists (see womanshop/co_purchases.py)
+BOUGHT_TOGETHER_LIMIT = 6
+# Widths of the product image renditions (see womanshop/renditions.py)
+IMAGE_RENDITION_WIDTHS = (68, 180, 360, 800)
+# Width of the blurred image previews stored with the renditions
+IMAGE_PLACEHOLDER_WIDTH = 16
+# Image jobs run by manage.py run_image_worker (see womanshop/jobs.py); when
+# IMAGE_JOBS_ASYNC is False they run inside the request instead
+IMAGE_JOBS_ASYNC = True
+IMAGE_JOB_MAX_ATTEMPTS = 3
+IMAGE_JOB_RETRY_DELAY = 30
+IMAGE_JOB_TIMEOUT = 600
+PROFILE_PIC_MAX_SIZE = 512
+# Hand media transfers to the front server (see womanshop/media.py): "" streams
+# them from Django, "x-accel-redirect" for nginx, "x-sendfile" for Apache
+MEDIA_SENDFILE_BACKEND = env("MEDIA_SENDFILE_BACKEND", default="")
+# nginx internal location aliased to MEDIA_ROOT, used with X-Accel-Redirect
+MEDIA_ACCEL_REDIRECT_PREFIX = "/protected-media/"
+# Cache-Control max-age of media files that are not named after their content
+MEDIA_CACHE_MAX_AGE = 3600
+
 PAYPAL_TEST = True
 PAYPAL_BUSINESS = env("PAYPAL_BUSINESS")
 
@@ -13,10 +13,12 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from womanshop.media import serve_media
 
 urlpatterns = (
     [
@@ -28,5 +30,12 @@ urlpatterns = (
         path("", include("users.urls")),
     ]
     + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-    + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    + [
+        # Also in production: the view hands the transfer to the front server
+        re_path(
+            r"^%s(?P<path>.+)$" % re.escape(settings.MEDIA_URL.lstrip("/")),
+            serve_media,
+            name="media",
+        ),
+    ]
 )
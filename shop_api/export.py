@@ -0,0 +1,145 @@
+"""
+Streaming full-catalog export.
+
+Products are read in chunks with ``.iterator()`` and their variants are
+prefetched per chunk, so memory use does not grow with the catalog. Color
+and size names come from the dimension registry instead of joins.
+"""
+
+import csv
+import json
+
+from django.db.models import Prefetch
+
+from womanshop.dimensions import dimensions
+from womanshop.models import Color, Product, ProductVariant, Size
+
+CHUNK_SIZE = 500
+
+CSV_COLUMNS = (
+    "product_id",
+    "vendor_code",
+    "name",
+    "category",
+    "style",
+    "brand",
+    "collection",
+    "price",
+    "sale",
+    "updated_at",
+    "variant_id",
+    "color",
+    "size",
+    "stock",
+)
+
+
+class Echo:
+    """File-like object that returns what is written, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def export_products(updated_since=None):
+    """
+    Yield the products with their variants as plain dictionaries.
+
+    Args:
+        updated_since (datetime): Only products updated at or after this time.
+
+    Yields:
+        dict: One product with a list of its variants.
+    """
+    products = (
+        Product.objects.select_related("brand", "category", "style")
+        .prefetch_related(
+            Prefetch(
+                "productvariant_set",
+                queryset=ProductVariant.objects.order_by("id").only(
+                    "id", "product_id", "color_id", "size_id", "stock"
+                ),
+            )
+        )
+        .order_by("id")
+    )
+    if updated_since is not None:
+        products = products.filter(updated_at__gte=updated_since)
+    for product in products.iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            "id": product.id,
+            "vendor_code": product.vendor_code,
+            "name": product.name,
+            "category": product.category.name,
+            "style": product.style.name,
+            "brand": product.brand.name,
+            "collection": product.collection,
+            "price": str(product.price),
+            "sale": product.sale,
+            "updated_at": product.updated_at.isoformat(),
+            "variants": [
+                {
+                    "id": variant.id,
+                    "color": dimensions.name_for(Color, variant.color_id),
+                    "size": dimensions.name_for(Size, variant.size_id),
+                    "stock": variant.stock,
+                }
+                for variant in product.productvariant_set.all()
+            ],
+        }
+
+
+def ndjson_lines(products):
+    """
+    Serialize products as newline-delimited JSON.
+
+    Args:
+        products (iterable): Dictionaries from export_products.
+
+    Yields:
+        str: One JSON document per line.
+    """
+    for product in products:
+        yield json.dumps(product, ensure_ascii=False) + "\n"
+
+
+def csv_lines(products):
+    """
+    Serialize products as CSV with one row per variant.
+
+    Products without variants get a single row with empty variant columns.
+
+    Args:
+        products (iterable): Dictionaries from export_products.
+
+    Yields:
+        str: The header row followed by the data rows.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for product in products:
+        columns = [
+            product["id"],
+            product["vendor_code"],
+            product["name"],
+            product["category"],
+            product["style"],
+            product["brand"],
+            product["collection"],
+            product["price"],
+            product["sale"],
+            product["updated_at"],
+        ]
+        for variant in product["variants"] or [None]:
+            if variant is None:
+                yield writer.writerow(columns + ["", "", "", ""])
+            else:
+                yield writer.writerow(
+                    columns
+                    + [
+                        variant["id"],
+                        variant["color"],
+                        variant["size"],
+                        variant["stock"],
+                    ]
+                )
@@ -11,6 +11,7 @@ from womanshop.models import (
     ProductVariant,
     OrderItem,
 )
+from womanshop.renditions import FORMATS as RENDITION_FORMATS, rendition_url
 from django.contrib.auth.models import User
 
 
@@ -26,7 +27,8 @@ class UserSerializer(serializers.HyperlinkedModelSerializer):
 
 class UserProfileSerializer(serializers.HyperlinkedModelSerializer):
     """
-    Serializer for UserProfile model.
+    Serializer for UserProfile model, with the read-only ``image_metadata``
+    of the profile picture.
     """
 
     class Meta:
@@ -97,13 +99,37 @@ class SizeSerializer(serializers.HyperlinkedModelSerializer):
 class ProductSerializer(serializers.HyperlinkedModelSerializer):
     """
     Serializer for Product model.
+
+    ``renditions`` lists the WebP and JPEG rendition URLs of every image by
+    width (see womanshop/renditions.py); the read-only ``image_metadata``
+    gives the width, height, size and format of every image.
     """
 
+    renditions = serializers.SerializerMethodField()
+
     class Meta:
         model = Product
-        fields = "__all__"
+        exclude = ["has_large_size", "updated_at"]
         view_name = "product-detail"
 
+    def get_renditions(self, product):
+        request = self.context.get("request")
+
+        def url(manifest, width, fmt):
+            url = rendition_url(manifest, width, fmt)
+            return request.build_absolute_uri(url) if request else url
+
+        return {
+            field: [
+                {
+                    "width": width,
+                    **{fmt: url(manifest, width, fmt) for fmt in RENDITION_FORMATS},
+                }
+                for width in manifest["widths"]
+            ]
+            for field, manifest in product.renditions.items()
+        }
+
 
 class ProductVariantSerializer(serializers.HyperlinkedModelSerializer):
     """
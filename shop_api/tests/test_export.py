@@ -0,0 +1,102 @@
+import csv
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from womanshop.models import (
+    Product,
+    Brand,
+    Category,
+    Style,
+    Color,
+    Size,
+    ProductVariant,
+)
+
+
+class ProductExportAPITests(TestCase):
+    """Tests for the streaming catalog export."""
+
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="adminpassword"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin_user)
+        self.url = reverse("product-export")
+        self.products = [
+            Product.objects.create(
+                name=f"Product {i}",
+                category=Category.objects.create(name=f"category {i}"),
+                style=Style.objects.create(name=f"style {i}"),
+                brand=Brand.objects.create(name=f"brand {i}"),
+                vendor_code=f"E{i}",
+                collection="Collection",
+                price=Decimal("10.00") + i,
+                description="Description",
+                sale=False,
+                image1="products/test.jpg",
+            )
+            for i in range(3)
+        ]
+        color = Color.objects.create(name="red")
+        for name in ("75B", "80C"):
+            ProductVariant.objects.create(
+                product=self.products[0],
+                color=color,
+                size=Size.objects.create(name=name),
+                stock=4,
+            )
+
+    def read(self, response):
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_ndjson_export(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([row["id"] for row in rows], [p.id for p in self.products])
+        self.assertEqual(rows[0]["price"], "10.00")
+        self.assertEqual(
+            [(v["color"], v["size"], v["stock"]) for v in rows[0]["variants"]],
+            [("red", "75B", 4), ("red", "80C", 4)],
+        )
+        self.assertEqual(rows[1]["variants"], [])
+
+    def test_csv_export(self):
+        response = self.client.get(self.url, {"output": "csv"})
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.DictReader(io.StringIO(self.read(response))))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1]["size"], "80C")
+        self.assertEqual(rows[2]["variant_id"], "")
+
+    def test_updated_since(self):
+        since = timezone.now() + timedelta(seconds=1)
+        Product.objects.update(updated_at=since - timedelta(days=1))
+        ProductVariant.objects.filter(product=self.products[0]).update(stock=9)
+        ProductVariant.objects.create(
+            product=self.products[2],
+            color=Color.objects.get(name="red"),
+            size=Size.objects.get(name="75B"),
+        )
+        response = self.client.get(
+            self.url, {"updated_since": (since - timedelta(hours=1)).isoformat()}
+        )
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([row["id"] for row in rows], [self.products[2].id])
+
+        response = self.client.get(self.url, {"updated_since": "yesterday"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_admin_only(self):
+        user = User.objects.create_user(username="user", password="password")
+        client = APIClient()
+        client.force_authenticate(user=user)
+        self.assertEqual(client.get(self.url).status_code, 403)
@@ -326,6 +326,7 @@ class UserSerializerTest(TestCase):
                     "date_of_birth",
                     "gender",
                     "profile_pic",
+                    "image_metadata",
                 ]
             ),
         )
@@ -358,6 +359,7 @@ class UserSerializerTest(TestCase):
             "date_of_birth": serializer_data["date_of_birth"],
             "gender": "F",
             "profile_pic": "http://testserver/media/profile_pics/not_photo.png",
+            "image_metadata": serializer_data["image_metadata"],
         }
         self.assertEqual(serializer_data, expected_data)
 
@@ -718,6 +720,8 @@ class UserSerializerTest(TestCase):
         - "image2"
         - "image3"
         - "image4"
+        - "renditions"
+        - "image_metadata"
         """
         data = self.product_serializer.data
         self.assertEqual(
@@ -739,6 +743,8 @@ class UserSerializerTest(TestCase):
                     "image2",
                     "image3",
                     "image4",
+                    "renditions",
+                    "image_metadata",
                 ]
             ),
         )
@@ -795,6 +801,8 @@ class UserSerializerTest(TestCase):
             "image2": self.product_serializer.data["image2"],
             "image3": self.product_serializer.data["image3"],
             "image4": self.product_serializer.data["image4"],
+            "renditions": self.product_serializer.data["renditions"],
+            "image_metadata": self.product_serializer.data["image_metadata"],
         }
         self.assertEqual(serialized_data, expected_data)
 
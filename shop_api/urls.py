@@ -6,11 +6,21 @@ from . import views
 
 urlpatterns = [
     path("products/", views.ProductListAPIView.as_view(), name="product-list-api"),
+    path(
+        "products/export/",
+        views.ProductExportAPIView.as_view(),
+        name="product-export",
+    ),
     path(
         "products/<int:pk>/",
         views.ProductDetailAPIView.as_view(),
         name="product-detail",
     ),
+    path(
+        "products/<int:pk>/bought-together/",
+        views.ProductBoughtTogetherAPIView.as_view(),
+        name="product-bought-together",
+    ),
     path("categories/", views.CategoryListAPIView.as_view(), name="category-list-api"),
     path(
         "categories/<int:pk>/",
@@ -1,4 +1,10 @@
+from datetime import datetime, time
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_list_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework import generics, filters
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django_filters.rest_framework import DjangoFilterBackend, FilterSet, NumberFilter
@@ -13,6 +19,7 @@ from womanshop.models import (
     Color,
     Size,
     OrderItem,
+    ProductRecommendation,
 )
 from .serializers import (
     ProductSerializer,
@@ -28,6 +35,8 @@ from .serializers import (
     OrderItemSerializer,
 )
 from django.contrib.auth.models import User
+from womanshop.search_backends import get_search_backend
+from .export import csv_lines, export_products, ndjson_lines
 
 
 class ProductFilters(FilterSet):
@@ -55,9 +64,25 @@ class ProductFilters(FilterSet):
             "brand": ["exact"],
             "category": ["exact"],
             "style": ["exact"],
+            "sale": ["exact"],
+            "has_large_size": ["exact"],
         }
 
 
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter that delegates to the database search backend, so the
+    ``search`` parameter uses full-text search on PostgreSQL.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        fields = getattr(view, "search_fields", None) or ()
+        return get_search_backend().search(queryset, " ".join(terms), tuple(fields))
+
+
 class ProductListAPIView(generics.ListAPIView):
     """
     View for listing products.
@@ -74,7 +99,7 @@ class ProductListAPIView(generics.ListAPIView):
 
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     filterset_class = ProductFilters
     search_fields = [
         "name",
@@ -85,6 +110,65 @@ class ProductListAPIView(generics.ListAPIView):
     ]
 
 
+class ProductExportAPIView(APIView):
+    """
+    Stream the whole catalog with variants and stock (admin only).
+
+    Query parameters:
+        output: "ndjson" (default) or "csv".
+        updated_since: ISO date or datetime; only products updated since then.
+    """
+
+    permission_classes = [IsAdminUser]
+    content_types = {
+        "ndjson": "application/x-ndjson",
+        "csv": "text/csv; charset=utf-8",
+    }
+
+    def get(self, request, format=None):
+        output = request.query_params.get("output", "ndjson")
+        if output not in self.content_types:
+            return Response(
+                {"message": "Error: output must be ndjson or csv."}, status=400
+            )
+        updated_since = request.query_params.get("updated_since")
+        if updated_since:
+            updated_since = self.parse_updated_since(updated_since)
+            if updated_since is None:
+                return Response(
+                    {"message": "Error: Invalid updated_since."}, status=400
+                )
+        products = export_products(updated_since or None)
+        lines = csv_lines(products) if output == "csv" else ndjson_lines(products)
+        response = StreamingHttpResponse(lines, content_type=self.content_types[output])
+        response["Content-Disposition"] = f'attachment; filename="products.{output}"'
+        return response
+
+    @staticmethod
+    def parse_updated_since(value):
+        """
+        Parse an ISO date or datetime into an aware datetime.
+
+        Args:
+            value (str): The raw query parameter.
+
+        Returns:
+            datetime: The parsed value or None if it is invalid.
+        """
+        try:
+            moment = parse_datetime(value)
+            if moment is None:
+                date = parse_date(value)
+                if date is None:
+                    return None
+                moment = datetime.combine(date, time.min)
+        except ValueError:
+            return None
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
+
+
 class ProductDetailAPIView(generics.RetrieveAPIView):
     """
     Retrieve a product instance.
@@ -95,6 +179,26 @@ class ProductDetailAPIView(generics.RetrieveAPIView):
     lookup_field = "pk"
 
 
+class ProductBoughtTogetherAPIView(generics.ListAPIView):
+    """
+    List the products most often bought together with a product, most
+    frequent first (see womanshop/co_purchases.py).
+    """
+
+    serializer_class = ProductSerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        recommendation = ProductRecommendation.objects.filter(
+            pk=self.kwargs["pk"]
+        ).first()
+        if recommendation is None:
+            return []
+        product_ids = recommendation.get_bought_together_ids()
+        products = Product.objects.in_bulk(product_ids)
+        return [products[pk] for pk in product_ids if pk in products]
+
+
 class ProductVariantListAPIView(generics.ListAPIView):
     """
     List all product variants.
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.7 on 2026-10-18 08:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userprofile",
+            name="image_metadata",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
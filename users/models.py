@@ -22,6 +22,8 @@ class UserProfile(models.Model):
     profile_pic = models.ImageField(
         upload_to="profile_pics/", blank=True, default="profile_pics/not_photo.png"
     )
+    # Size and format of profile_pic (see womanshop/image_metadata.py)
+    image_metadata = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return self.user.username
@@ -10,6 +10,7 @@ from .models import (
     Product,
     ProductVariant,
     OrderItem,
+    ImageJob,
 )
 
 # Register your models here.
@@ -22,3 +23,10 @@ admin.site.register(Color)
 admin.site.register(Product)
 admin.site.register(ProductVariant)
 admin.site.register(OrderItem)
+
+
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "object_id", "status", "progress", "attempts")
+    list_filter = ("status", "kind")
+    readonly_fields = ("error",)
@@ -0,0 +1,156 @@
+"""
+Prefix autocomplete over product and brand names.
+
+Completions are kept in a trie whose every node stores its top
+``AUTOCOMPLETE_LIMIT`` entries ranked by popularity (units sold), so a
+lookup walks at most ``MAX_PREFIX_LENGTH`` nodes and never scans the
+catalog. Every word of a name is a starting point, so "ame" completes
+"Body Amelie".
+
+The trie is per process and built lazily with three queries. It is dropped
+by the Product and Brand signals of this process, rebuilt when the shared
+catalog version changes (a change made by another process, which the
+autocomplete ETags follow) and after ``AUTOCOMPLETE_TTL`` seconds, which
+also refreshes the popularity. Only paid orders count towards popularity.
+"""
+
+import threading
+import time
+from bisect import insort
+
+from django.conf import settings
+from django.db.models import Sum
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from .catalog_cache import get_catalog_version
+from .models import Brand, OrderItem, Product
+from .recommendations import PAID_STATUSES
+from .search_index import tokenize
+
+# Prefixes longer than this are matched on their first MAX_PREFIX_LENGTH characters
+MAX_PREFIX_LENGTH = 24
+
+
+def normalize(text):
+    """
+    Normalize text the way the search index does.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        str: The case folded tokens joined by single spaces.
+    """
+    return " ".join(tokenize(text))
+
+
+class _Node:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children = {}
+        self.top = []
+
+
+class Autocomplete:
+    """
+    Trie of product and brand names with precomputed top-k completions.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built_at = None
+        # Catalog version the trie was built from
+        self._version = None
+        self._root = _Node()
+
+    @property
+    def ttl(self):
+        return getattr(settings, "AUTOCOMPLETE_TTL", 300)
+
+    @property
+    def limit(self):
+        return getattr(settings, "AUTOCOMPLETE_LIMIT", 8)
+
+    def invalidate(self):
+        """Drop the trie; it will be rebuilt on the next query."""
+        with self._lock:
+            self._built_at = None
+
+    def _ensure_built(self):
+        with self._lock:
+            version = get_catalog_version()
+            if (
+                self._built_at is None
+                or self._version != version
+                or time.monotonic() - self._built_at > self.ttl
+            ):
+                self._root = self._build()
+                self._built_at = time.monotonic()
+                self._version = version
+            return self._root
+
+    def _build(self):
+        sold = dict(
+            OrderItem.objects.filter(order__status__in=PAID_STATUSES)
+            .values_list("product_variant__product_id")
+            .annotate(Sum("quantity"))
+        )
+        brand_sold = {}
+        root = _Node()
+        for product_id, name, brand_id in Product.objects.values_list(
+            "id", "name", "brand_id"
+        ):
+            popularity = sold.get(product_id, 0)
+            brand_sold[brand_id] = brand_sold.get(brand_id, 0) + popularity
+            url = reverse("product", args=[product_id])
+            self._insert(root, name, (-popularity, 1, name, "product", product_id, url))
+        catalog_url = reverse("catalog")
+        for brand_id, name in Brand.objects.values_list("id", "name"):
+            popularity = brand_sold.get(brand_id, 0)
+            url = f"{catalog_url}?{urlencode({'categors': name.lower()})}"
+            self._insert(root, name, (-popularity, 0, name, "brand", brand_id, url))
+        return root
+
+    def _insert(self, root, name, entry):
+        key = normalize(name)
+        limit = self.limit
+        for start in range(len(key)):
+            if start and key[start - 1] != " ":
+                continue
+            node = root
+            for char in key[start : start + MAX_PREFIX_LENGTH]:
+                node = node.children.setdefault(char, _Node())
+                if entry in node.top:
+                    continue
+                insort(node.top, entry)
+                if len(node.top) > limit:
+                    node.top.pop()
+
+    def complete(self, prefix):
+        """
+        Return the most popular completions of a prefix.
+
+        Args:
+            prefix (str): The typed text.
+
+        Returns:
+            list: Dictionaries with the type ("product" or "brand"), id, name
+            and url of each completion, most popular first.
+        """
+        key = normalize(prefix)[:MAX_PREFIX_LENGTH]
+        if not key:
+            return []
+        node = self._ensure_built()
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return [
+            {"type": kind, "id": pk, "name": name, "url": url}
+            for _, _, name, kind, pk, url in node.top
+        ]
+
+
+autocomplete = Autocomplete()
@@ -0,0 +1,157 @@
+"""
+Reference counts of the content-addressed product images.
+
+Each MediaBlob row counts the product image fields pointing at a file of
+womanshop/storage.py. The product save and delete signals acquire the names
+a product starts using and release the ones it stops using; a file and
+its renditions are deleted once the transaction that dropped its last
+reference commits.
+
+Only content-addressed names are counted. Files uploaded before the storage
+existed are moved into it by ``manage.py dedupe_media``, which also
+recounts every reference.
+"""
+
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .models import MediaBlob, Product
+from .renditions import IMAGE_FIELDS, delete_renditions
+from .storage import blob_digest, is_blob_name, product_image_storage
+
+
+def image_names(images):
+    """
+    Count the content-addressed names among product image values.
+
+    Args:
+        images (iterable): Image field values or names.
+
+    Returns:
+        Counter: The number of references by name.
+    """
+    names = (getattr(image, "name", image) for image in images)
+    return Counter(name for name in names if is_blob_name(name))
+
+
+def product_image_names(product):
+    """
+    Count the content-addressed names of the images of a product.
+
+    Args:
+        product (Product): The product.
+
+    Returns:
+        Counter: The number of references by name.
+    """
+    return image_names(getattr(product, field) for field in IMAGE_FIELDS)
+
+
+def stored_image_names(product_id):
+    """
+    Count the content-addressed names saved for a product.
+
+    Args:
+        product_id (int): The ID of the product, may be None.
+
+    Returns:
+        Counter: The number of references by name, empty for a new product.
+    """
+    if product_id is None:
+        return Counter()
+    row = Product.objects.filter(pk=product_id).values_list(*IMAGE_FIELDS).first()
+    return image_names(row or ())
+
+
+def _size(name):
+    try:
+        return product_image_storage.size(name)
+    except OSError:
+        return 0
+
+
+def acquire(names):
+    """
+    Add references to files.
+
+    Args:
+        names (Counter): The number of new references by name.
+    """
+    for name, count in names.items():
+        blob, created = MediaBlob.objects.get_or_create(
+            name=name, defaults={"size": _size(name), "refcount": count}
+        )
+        if not created:
+            MediaBlob.objects.filter(pk=name).update(refcount=F("refcount") + count)
+
+
+def delete_file(name):
+    """
+    Delete a content-addressed file and its renditions.
+
+    The renditions are kept while another referenced file has the same
+    content under another extension.
+
+    Args:
+        name (str): The storage name.
+    """
+    product_image_storage.delete(name)
+    digest = blob_digest(name)
+    if not MediaBlob.objects.filter(name__contains=digest, refcount__gt=0).exists():
+        delete_renditions(digest)
+
+
+def _delete_unreferenced(names):
+    for name in names:
+        # A concurrent acquire may have revived the blob in the meantime
+        if MediaBlob.objects.filter(pk=name, refcount=0).delete()[0]:
+            delete_file(name)
+
+
+def release(names):
+    """
+    Drop references to files and delete the files nobody references.
+
+    Args:
+        names (Counter): The number of dropped references by name.
+    """
+    for name, count in names.items():
+        MediaBlob.objects.filter(pk=name).update(
+            refcount=Greatest(F("refcount") - count, 0)
+        )
+    unreferenced = list(
+        MediaBlob.objects.filter(name__in=list(names), refcount=0).values_list(
+            "name", flat=True
+        )
+    )
+    if unreferenced:
+        transaction.on_commit(lambda: _delete_unreferenced(unreferenced))
+
+
+def recount():
+    """
+    Recompute every reference count from the product image fields.
+
+    Blobs that are no longer referenced keep a zero count and their file.
+
+    Returns:
+        int: The number of referenced files.
+    """
+    names = Counter()
+    for row in Product.objects.values_list(*IMAGE_FIELDS).iterator():
+        names.update(image_names(row))
+    with transaction.atomic():
+        MediaBlob.objects.update(refcount=0)
+        MediaBlob.objects.bulk_create(
+            [
+                MediaBlob(name=name, size=_size(name), refcount=count)
+                for name, count in names.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["name"],
+            update_fields=["size", "refcount"],
+        )
+    return len(names)
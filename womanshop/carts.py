@@ -0,0 +1,225 @@
+"""
+Server-side shopping carts and favorites.
+
+The cart and the favorites used to be lists in the session, and with the
+signed-cookie session engine both travelled in the cookie of every request,
+static files included, growing with each item. They are rows now: one Cart
+per user, or per anonymous session whose data only holds the cart ID, with
+one CartLine per product variant and one Favorite per product. Adding,
+updating or removing an item changes one row and leaves the session alone.
+
+An anonymous cart is handed over to the user on login, merged into the cart
+the user already has (see the ``adopt_session_cart`` signal). A cart whose
+session has expired cannot be reached anymore and is deleted by
+``delete_expired_carts`` (the ``clear_carts`` command).
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Cart, CartLine, Favorite
+
+# Session key of the cart ID of an anonymous session
+SESSION_KEY = "cart_id"
+
+
+def cart_lookup(request):
+    """
+    Build the lookup of the rows belonging to the cart of a request.
+
+    Args:
+        request (HttpRequest): The request.
+
+    Returns:
+        dict: Filter arguments for CartLine and Favorite, or None if the
+        anonymous session has no cart yet.
+    """
+    if request.user.is_authenticated:
+        return {"cart__user": request.user}
+    cart_id = request.session.get(SESSION_KEY)
+    if cart_id is None:
+        return None
+    return {"cart_id": cart_id, "cart__user": None}
+
+
+def get_cart(request, create=False):
+    """
+    Return the cart of the user or of the anonymous session.
+
+    Fetching an anonymous cart to change it refreshes its ``updated_at`` and
+    saves the session again, so both expire SESSION_COOKIE_AGE after the
+    last change.
+
+    Args:
+        request (HttpRequest): The request.
+        create (bool): Create the cart if there is none.
+
+    Returns:
+        Cart: The cart, or None if there is none and create is False.
+    """
+    if request.user.is_authenticated:
+        if create:
+            return Cart.objects.get_or_create(user=request.user)[0]
+        return Cart.objects.filter(user=request.user).first()
+    cart_id = request.session.get(SESSION_KEY)
+    cart = None
+    if cart_id is not None:
+        cart = Cart.objects.filter(pk=cart_id, user=None).first()
+    if cart is None and create:
+        cart = Cart.objects.create()
+        request.session[SESSION_KEY] = cart.pk
+    elif cart is not None and create:
+        cart.save(update_fields=["updated_at"])
+        request.session.modified = True
+    return cart
+
+
+def cart_lines(request):
+    """
+    Return the lines of the cart of a request.
+
+    Args:
+        request (HttpRequest): The request.
+
+    Returns:
+        QuerySet: The CartLine rows, in the order they were added.
+    """
+    lookup = cart_lookup(request)
+    if lookup is None:
+        return CartLine.objects.none()
+    return CartLine.objects.filter(**lookup).order_by("id")
+
+
+def favorites(request):
+    """
+    Return the favorites of a request.
+
+    Args:
+        request (HttpRequest): The request.
+
+    Returns:
+        QuerySet: The Favorite rows.
+    """
+    lookup = cart_lookup(request)
+    if lookup is None:
+        return Favorite.objects.none()
+    return Favorite.objects.filter(**lookup)
+
+
+def cart_size(request):
+    """
+    Count the lines of the cart of a request, shown in the page header.
+
+    Args:
+        request (HttpRequest): The request.
+
+    Returns:
+        int: The number of lines; anonymous sessions without a cart cost no query.
+    """
+    if cart_lookup(request) is None:
+        return 0
+    return cart_lines(request).count()
+
+
+def favorite_ids(request):
+    """
+    List the IDs of the favorite products of a request.
+
+    Args:
+        request (HttpRequest): The request.
+
+    Returns:
+        list: The product IDs.
+    """
+    if cart_lookup(request) is None:
+        return []
+    return list(favorites(request).order_by("id").values_list("product_id", flat=True))
+
+
+def add_line(cart, product_variant_id, quantity):
+    """
+    Add a quantity of a product variant to a cart.
+
+    A variant already in the cart gets its quantity increased in place, also
+    when a concurrent request added it first.
+
+    Args:
+        cart (Cart): The cart.
+        product_variant_id (int): The ID of the product variant.
+        quantity (int): The quantity to add.
+
+    Returns:
+        None
+    """
+    lines = CartLine.objects.filter(cart=cart, product_variant_id=product_variant_id)
+    if lines.update(quantity=F("quantity") + quantity):
+        return
+    try:
+        with transaction.atomic():
+            CartLine.objects.create(
+                cart=cart, product_variant_id=product_variant_id, quantity=quantity
+            )
+    except IntegrityError:
+        # A concurrent add created the line in the meantime
+        lines.update(quantity=F("quantity") + quantity)
+
+
+def adopt_session_cart(request, user):
+    """
+    Hand the cart of an anonymous session over to the user who logged in.
+
+    The session cart becomes the cart of the user, or is merged into the
+    cart the user already has and deleted.
+
+    Args:
+        request (HttpRequest): The login request.
+        user (User): The user.
+
+    Returns:
+        None
+    """
+    cart_id = request.session.pop(SESSION_KEY, None)
+    if cart_id is None:
+        return
+    with transaction.atomic():
+        session_cart = Cart.objects.filter(pk=cart_id, user=None).first()
+        if session_cart is None:
+            return
+        cart = Cart.objects.filter(user=user).first()
+        if cart is None:
+            session_cart.user = user
+            session_cart.save(update_fields=["user"])
+            return
+        for variant_id, quantity in session_cart.lines.values_list(
+            "product_variant_id", "quantity"
+        ):
+            add_line(cart, variant_id, quantity)
+        Favorite.objects.bulk_create(
+            [
+                Favorite(cart=cart, product_id=product_id)
+                for product_id in session_cart.favorites.values_list(
+                    "product_id", flat=True
+                )
+            ],
+            ignore_conflicts=True,
+        )
+        session_cart.delete()
+
+
+def delete_expired_carts():
+    """
+    Delete the anonymous carts unchanged for longer than SESSION_COOKIE_AGE.
+
+    Their sessions have expired with them, so nobody can reach them anymore.
+    The carts of users are kept.
+
+    Returns:
+        int: The number of deleted carts.
+    """
+    expired = timezone.now() - timedelta(seconds=settings.SESSION_COOKIE_AGE)
+    carts = Cart.objects.filter(user=None, updated_at__lt=expired)
+    return carts.delete()[1].get(Cart._meta.label, 0)
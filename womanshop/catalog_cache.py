@@ -0,0 +1,279 @@
+"""
+Versioned response cache for the catalog endpoints.
+
+Every cached response is stored under the current catalog version. Saving
+or deleting a Product, ProductVariant, Brand, Category or Style bumps the
+version (see womanshop/signals.py), so stale pages are never served; old
+entries simply expire.
+
+The same version drives the weak ETags of the catalog endpoints, so a
+browser revalidating a page it already has gets a 304 without any database
+work.
+
+The version lives in the default cache, which must be shared by all the
+processes (see CACHES in settings.py): bumps made by the management commands
+and the image worker have to reach the web workers.
+
+Identical concurrent misses are coalesced: within a process by single
+flight, and across processes, when CATALOG_CACHE_LOCK is enabled, by a lock
+key taken with ``cache.add`` so only one worker rebuilds an entry.
+"""
+
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .singleflight import single_flight
+
+VERSION_KEY = "catalog:version"
+STOCK_VERSION_KEY = "stock:version:{}"
+HITS_KEY = "catalog:hits"
+MISSES_KEY = "catalog:misses"
+
+
+def get_catalog_version():
+    """
+    Return the current catalog version.
+
+    A missing version is seeded with the current time, so a cleared or
+    culled cache never hands out a version an old ETag was built from.
+
+    Returns:
+        int: The catalog version.
+    """
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        seed = time.time_ns()
+        cache.add(VERSION_KEY, seed, None)
+        version = cache.get(VERSION_KEY, seed)
+    return version
+
+
+def bump_catalog_version():
+    """
+    Invalidate all cached catalog responses by bumping the catalog version.
+
+    Returns:
+        int: The new catalog version, or None if the version was missing and
+        has been seeded again.
+    """
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        return None
+
+
+def get_stock_versions(product_ids):
+    """
+    Return the stock versions of products.
+
+    Missing versions are seeded with the current time, so a restarted cache
+    never hands out a version an old ETag was built from.
+
+    Args:
+        product_ids (list): Product IDs.
+
+    Returns:
+        dict: {product ID: stock version}.
+    """
+    keys = {
+        STOCK_VERSION_KEY.format(product_id): product_id for product_id in product_ids
+    }
+    versions = cache.get_many(keys)
+    for key in keys.keys() - versions.keys():
+        cache.add(key, time.time_ns(), None)
+        versions[key] = cache.get(key)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def bump_stock_version(product_id):
+    """
+    Mark the stock of a product as changed.
+
+    Args:
+        product_id (int): The ID of the product.
+    """
+    key = STOCK_VERSION_KEY.format(product_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def _incr(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def make_key(prefix, params):
+    """
+    Build a versioned cache key for canonical request parameters.
+
+    Args:
+        prefix (str): The endpoint name.
+        params (str): The canonical, URL-encoded request parameters.
+
+    Returns:
+        str: The cache key.
+    """
+    return f"catalog:{prefix}:{get_catalog_version()}:{_digest(params)}"
+
+
+def _digest(params):
+    return hashlib.md5(params.encode("utf-8")).hexdigest()
+
+
+def make_etag(prefix, params):
+    """
+    Build a weak ETag for canonical request parameters.
+
+    Args:
+        prefix (str): The endpoint name.
+        params (str): The canonical, URL-encoded request parameters.
+
+    Returns:
+        str: The quoted weak ETag.
+    """
+    return f'W/"{prefix}-{get_catalog_version()}-{_digest(params)}"'
+
+
+def conditional_response(prefix, params_func):
+    """
+    Decorator adding conditional GET support to a catalog endpoint.
+
+    The ETag is computed from the catalog version and the canonical request
+    parameters before the view runs, so a matching If-None-Match header is
+    answered with 304 without calling the view. Successful responses are
+    public for CATALOG_MAX_AGE seconds.
+
+    Args:
+        prefix (str): The endpoint name.
+        params_func (callable): Returns the canonical parameters of a request.
+
+    Returns:
+        callable: The decorator.
+    """
+
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=lambda request, *args, **kwargs: make_etag(
+                prefix, params_func(request)
+            )
+        )(view)
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                patch_cache_control(
+                    response,
+                    public=True,
+                    max_age=getattr(settings, "CATALOG_MAX_AGE", 60),
+                )
+            else:
+                # Error responses must not be revalidated
+                response.headers.pop("ETag", None)
+            return response
+
+        return inner
+
+    return decorator
+
+
+def get_response(key):
+    """
+    Return a cached response and update the hit/miss counters.
+
+    Args:
+        key (str): The cache key from make_key.
+
+    Returns:
+        The cached value or None.
+    """
+    value = cache.get(key)
+    _incr(MISSES_KEY if value is None else HITS_KEY)
+    return value
+
+
+def set_response(key, value):
+    """
+    Store a response for CATALOG_CACHE_TTL seconds.
+
+    Args:
+        key (str): The cache key from make_key.
+        value: The response data.
+    """
+    cache.set(key, value, getattr(settings, "CATALOG_CACHE_TTL", 600))
+
+
+def get_or_build(key, build):
+    """
+    Return a cached response, building and storing it on a miss.
+
+    Concurrent misses for the same key in this process share one call of
+    ``build``. With CATALOG_CACHE_LOCK enabled, processes that find the entry
+    being rebuilt elsewhere wait up to CATALOG_CACHE_LOCK_TIMEOUT seconds for
+    it instead of rebuilding it themselves.
+
+    Args:
+        key (str): The cache key from make_key.
+        build (callable): Computes the response data.
+
+    Returns:
+        tuple: The response data and a flag telling whether it was cached.
+    """
+    value = get_response(key)
+    if value is not None:
+        return value, True
+    return single_flight.do(key, lambda: _build(key, build)), False
+
+
+def _build(key, build):
+    if not getattr(settings, "CATALOG_CACHE_LOCK", False):
+        value = build()
+        set_response(key, value)
+        return value
+    lock_key = f"{key}:lock"
+    timeout = getattr(settings, "CATALOG_CACHE_LOCK_TIMEOUT", 10)
+    locked = cache.add(lock_key, 1, timeout)
+    deadline = time.monotonic() + timeout
+    while not locked and time.monotonic() < deadline:
+        time.sleep(0.05)
+        value = cache.get(key)
+        if value is not None:
+            return value
+        # The holder may have failed without storing a value
+        locked = cache.add(lock_key, 1, timeout)
+    try:
+        value = build()
+        set_response(key, value)
+        return value
+    finally:
+        if locked:
+            cache.delete(lock_key)
+
+
+def stats():
+    """
+    Return the cache hit/miss counters.
+
+    Returns:
+        dict: The number of hits and misses and the catalog version.
+    """
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0,
+        "version": get_catalog_version(),
+    }
@@ -0,0 +1,126 @@
+"""
+Maintenance of the ProductCatalogEntry read model.
+"""
+
+from django.db import transaction
+from django.db.models import Max, Min
+
+from .models import Product, ProductCatalogEntry, ProductVariant
+
+# Sizes that put a product on the "XXL" landing page
+LARGE_SIZES = {"80B", "80C", "80D", "80E", "80F"}
+
+
+def image_url(image):
+    """
+    Return the URL of an image field or an empty string if it has no file.
+
+    Args:
+        image (ImageFieldFile): The image field value.
+
+    Returns:
+        str: The image URL.
+    """
+    return image.url if image else ""
+
+
+def has_large_size(sizes):
+    """
+    Tell whether any of the given size names is a large size.
+
+    Args:
+        sizes (iterable): Size names of the product variants.
+
+    Returns:
+        bool: True if the product belongs on the "XXL" landing page.
+    """
+    return not LARGE_SIZES.isdisjoint(sizes)
+
+
+def build_catalog_entry(product, sizes):
+    """
+    Build an unsaved catalog entry for a product.
+
+    Args:
+        product (Product): The product with brand, category and style loaded.
+        sizes (list): Size names of the product variants.
+
+    Returns:
+        ProductCatalogEntry: The catalog entry.
+    """
+    sizes = sorted(set(sizes))
+    return ProductCatalogEntry(
+        product=product,
+        name=product.name,
+        price=product.price,
+        category_name=product.category.name,
+        style_name=product.style.name,
+        brand_name=product.brand.name,
+        sale=product.sale,
+        has_large_size=has_large_size(sizes),
+        sizes=",".join(sizes)[:255],
+        image1_url=image_url(product.image1),
+        image1_renditions=product.renditions.get("image1", {}),
+        created_at=product.created_at,
+    )
+
+
+def refresh_catalog_entry(product_id):
+    """
+    Rebuild the catalog entry of one product, or delete it if the product is gone.
+
+    Also updates the ``Product.has_large_size`` flag from the variants.
+
+    Args:
+        product_id (int): The ID of the product.
+    """
+    product = (
+        Product.objects.select_related("brand", "category", "style")
+        .filter(id=product_id)
+        .first()
+    )
+    if product is None:
+        ProductCatalogEntry.objects.filter(product_id=product_id).delete()
+        return
+    sizes = list(
+        ProductVariant.objects.filter(product_id=product_id).values_list(
+            "size__name", flat=True
+        )
+    )
+    large = has_large_size(sizes)
+    if product.has_large_size != large:
+        # update() keeps the Product post_save signals from firing again
+        Product.objects.filter(id=product_id).update(has_large_size=large)
+        product.has_large_size = large
+    build_catalog_entry(product, sizes).save()
+
+
+def rebuild_catalog_entries(batch_size=1000):
+    """
+    Rebuild the whole catalog read model and the ``Product.has_large_size`` flags.
+
+    Args:
+        batch_size (int): The number of entries inserted per query.
+
+    Returns:
+        int: The number of catalog entries written.
+    """
+    sizes = {}
+    for product_id, size in ProductVariant.objects.values_list(
+        "product_id", "size__name"
+    ).iterator(chunk_size=batch_size):
+        sizes.setdefault(product_id, []).append(size)
+    entries = [
+        build_catalog_entry(product, sizes.get(product.id, []))
+        for product in Product.objects.select_related(
+            "brand", "category", "style"
+        ).iterator(chunk_size=batch_size)
+    ]
+    with transaction.atomic():
+        ProductCatalogEntry.objects.all().delete()
+        ProductCatalogEntry.objects.bulk_create(entries, batch_size=batch_size)
+        large = ProductCatalogEntry.objects.filter(has_large_size=True)
+        large = large.values("product_id")
+        Product.objects.filter(id__in=large).update(has_large_size=True)
+        Product.objects.exclude(id__in=large).update(has_large_size=False)
+    return len(entries)
@@ -0,0 +1,199 @@
+"""
+"Frequently bought together" lists built from the order history.
+
+The paid orders (see PAID_STATUSES) are streamed in chunks of
+``chunk_size`` orders. Every chunk becomes a sparse order x product basket
+matrix B, and B.T @ B, the number of orders containing both products of
+every pair, is added to the item-item co-occurrence matrix. Memory is thus
+bounded by one chunk of order lines plus the non-zero pairs, never by the
+length of the order history.
+
+The matrix work uses NumPy and SciPy when they are installed; otherwise the
+same counts are kept in dictionaries, which is fine for small shops and
+the test runs. The lists are stored in ProductRecommendation and rebuilt
+with ``manage.py build_bought_together``; the counts also feed the
+co-purchase score of ``rebuild_recommendations``.
+"""
+
+from collections import Counter, defaultdict
+from itertools import permutations
+
+from django.conf import settings
+
+from .models import Order, OrderItem, Product
+from .recommendations import PAID_STATUSES, store_lists
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # pragma: no cover - optional dependency
+    np = sparse = None
+
+# Number of orders read per query
+CHUNK_SIZE = 10000
+
+
+def get_limit():
+    return getattr(settings, "BOUGHT_TOGETHER_LIMIT", 6)
+
+
+def iter_order_lines(chunk_size=CHUNK_SIZE):
+    """
+    Stream the distinct (order ID, product ID) pairs of the paid orders.
+
+    Args:
+        chunk_size (int): Number of orders per chunk.
+
+    Yields:
+        list: The pairs of the next ``chunk_size`` paid orders.
+    """
+    paid = Order.objects.filter(status__in=PAID_STATUSES)
+    last_id = 0
+    while True:
+        order_ids = list(
+            paid.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:chunk_size]
+        )
+        if not order_ids:
+            return
+        yield list(
+            OrderItem.objects.filter(
+                order_id__gte=order_ids[0],
+                order_id__lte=order_ids[-1],
+                order__status__in=PAID_STATUSES,
+            )
+            .values_list("order_id", "product_variant__product_id")
+            .distinct()
+        )
+        last_id = order_ids[-1]
+
+
+def _top(counts, limit):
+    """Return the items of a Counter with the highest counts, ties by ID."""
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+
+def count_python(chunks, limit):
+    """
+    Count the co-purchases with dictionaries.
+
+    Args:
+        chunks (iterable): Lists of (order ID, product ID) pairs.
+        limit (int): Products per list.
+
+    Returns:
+        dict: Product ID -> (product ID, number of shared orders) pairs of
+        the products most often bought with it.
+    """
+    counts = defaultdict(Counter)
+    for pairs in chunks:
+        baskets = defaultdict(list)
+        for order_id, product_id in pairs:
+            baskets[order_id].append(product_id)
+        for products in baskets.values():
+            for product_id, other_id in permutations(products, 2):
+                counts[product_id][other_id] += 1
+    return {product_id: _top(others, limit) for product_id, others in counts.items()}
+
+
+def count_sparse(chunks, limit, product_ids):
+    """
+    Count the co-purchases with a sparse co-occurrence matrix.
+
+    Args:
+        chunks (iterable): Lists of (order ID, product ID) pairs.
+        limit (int): Products per list.
+        product_ids (list): IDs of all products, ascending.
+
+    Returns:
+        dict: Product ID -> (product ID, number of shared orders) pairs of
+        the products most often bought with it.
+    """
+    product_ids = np.asarray(product_ids, dtype=np.int64)
+    size = len(product_ids)
+    matrix = sparse.csr_matrix((size, size), dtype=np.int64)
+    for pairs in chunks:
+        if not pairs:
+            continue
+        lines = np.asarray(pairs, dtype=np.int64)
+        columns = np.searchsorted(product_ids, lines[:, 1])
+        # Skip the products created after product_ids was read
+        known = product_ids[np.minimum(columns, size - 1)] == lines[:, 1]
+        lines, columns = lines[known], columns[known]
+        if not len(lines):
+            continue
+        _, rows = np.unique(lines[:, 0], return_inverse=True)
+        baskets = sparse.csr_matrix(
+            (np.ones(len(lines), dtype=np.int64), (rows, columns)),
+            shape=(rows.max() + 1, size),
+        )
+        matrix = matrix + baskets.T @ baskets
+    matrix.setdiag(0)
+    matrix.eliminate_zeros()
+    lists = {}
+    for row in np.flatnonzero(np.diff(matrix.indptr)):
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        others = product_ids[matrix.indices[start:end]]
+        counts = matrix.data[start:end]
+        best = np.lexsort((others, -counts))[:limit]
+        lists[int(product_ids[row])] = list(
+            zip(others[best].tolist(), counts[best].tolist())
+        )
+    return lists
+
+
+def count_co_purchases(limit, chunk_size=CHUNK_SIZE):
+    """
+    Count the co-purchases of the paid orders.
+
+    Args:
+        limit (int): Products per list.
+        chunk_size (int): Number of orders read per query.
+
+    Returns:
+        dict: Product ID -> (product ID, number of shared orders) pairs of
+        the products most often bought with it, most frequent first.
+        Products never bought with another are missing.
+    """
+    chunks = iter_order_lines(chunk_size)
+    if sparse is None:
+        return count_python(chunks, limit)
+    product_ids = list(Product.objects.order_by("id").values_list("id", flat=True))
+    return count_sparse(chunks, limit, product_ids)
+
+
+def build_bought_together(limit=None, chunk_size=CHUNK_SIZE):
+    """
+    Build the "frequently bought together" lists of the paid orders.
+
+    Args:
+        limit (int): Products per list, BOUGHT_TOGETHER_LIMIT by default.
+        chunk_size (int): Number of orders read per query.
+
+    Returns:
+        dict: Product ID -> IDs of the products most often bought with it,
+        most frequent first. Products never bought with another are missing.
+    """
+    counts = count_co_purchases(limit or get_limit(), chunk_size)
+    return {
+        product_id: [other_id for other_id, _ in pairs]
+        for product_id, pairs in counts.items()
+    }
+
+
+def rebuild_bought_together(limit=None, chunk_size=CHUNK_SIZE, batch_size=1000):
+    """
+    Recompute and store the "frequently bought together" lists.
+
+    Args:
+        limit (int): Products per list, BOUGHT_TOGETHER_LIMIT by default.
+        chunk_size (int): Number of orders read per query.
+        batch_size (int): Number of lists written per query.
+
+    Returns:
+        int: The number of products with a list.
+    """
+    lists = build_bought_together(limit, chunk_size)
+    store_lists("bought_together_ids", lists, batch_size=batch_size)
+    return len(lists)
@@ -0,0 +1,111 @@
+"""
+Process-local registry of the small dimension tables.
+
+Category, Style, Brand, Color and Size hold a handful of rows that almost
+never change, yet the views resolved them by name on every request. The
+registry loads each table once per process into name->id and id->name maps.
+The maps are dropped by the save/delete signals of the model (see
+womanshop/signals.py) and reloaded after ``DIMENSION_CACHE_TTL`` seconds, so
+changes made in other processes are picked up as well.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404
+
+from .models import Brand, Category, Color, Size, Style
+
+DIMENSION_MODELS = (Category, Style, Brand, Color, Size)
+
+
+class DimensionRegistry:
+    """
+    Name->id and id->name maps for the dimension models.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._maps = {}
+
+    @property
+    def ttl(self):
+        return getattr(settings, "DIMENSION_CACHE_TTL", 300)
+
+    def _load(self, model):
+        with self._lock:
+            maps = self._maps.get(model)
+            if maps is None or time.monotonic() - maps[2] > self.ttl:
+                by_name = {}
+                by_id = {}
+                for pk, name in model.objects.order_by("id").values_list("id", "name"):
+                    by_name.setdefault(name, pk)
+                    by_id[pk] = name
+                maps = (by_name, by_id, time.monotonic())
+                self._maps[model] = maps
+            return maps
+
+    def id_for(self, model, name):
+        """
+        Return the ID of the dimension row with the given name.
+
+        Args:
+            model: One of DIMENSION_MODELS.
+            name (str): The name to look up.
+
+        Returns:
+            int: The ID, or None if there is no such row.
+        """
+        return self._load(model)[0].get(name)
+
+    def name_for(self, model, pk):
+        """
+        Return the name of the dimension row with the given ID.
+
+        Args:
+            model: One of DIMENSION_MODELS.
+            pk (int): The ID to look up.
+
+        Returns:
+            str: The name, or None if there is no such row.
+        """
+        return self._load(model)[1].get(pk)
+
+    def get_id_or_404(self, model, name):
+        """
+        Return the ID of the dimension row with the given name.
+
+        Args:
+            model: One of DIMENSION_MODELS.
+            name (str): The name to look up.
+
+        Returns:
+            int: The ID.
+
+        Raises:
+            Http404: If there is no such row.
+        """
+        pk = self.id_for(model, name)
+        if pk is None:
+            raise Http404(f"No {model._meta.object_name} matches the given query.")
+        return pk
+
+    def invalidate(self, model):
+        """
+        Drop the maps of a model now and again once the transaction commits.
+
+        Args:
+            model: One of DIMENSION_MODELS.
+        """
+
+        def drop():
+            with self._lock:
+                self._maps.pop(model, None)
+
+        drop()
+        transaction.on_commit(drop)
+
+
+dimensions = DimensionRegistry()
@@ -0,0 +1,418 @@
+"""
+In-memory faceted index over the product catalog.
+
+The index keeps one bitset (a Python ``int``) per category, style, brand,
+large size and sale flag, plus one presorted array per sortable field.
+A filtered catalog page is answered by intersecting bitsets and walking the
+presorted array, so the database is only touched to hydrate the rows that
+end up on the page.
+
+The index is per process. It is built lazily from the ProductCatalogEntry
+read model and kept up to date from the model signals of this process, which
+also hand it the catalog version they bump. It is rebuilt when the shared
+catalog version changes otherwise (a change made by another process or a
+``rebuild_catalog`` run) and after ``CATALOG_FACET_INDEX_TTL`` seconds.
+"""
+
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+
+from .catalog_cache import get_catalog_version
+from .models import ProductCatalogEntry
+from .pagination import InvalidCursor
+
+# Sortable fields of the catalog and the ProductCatalogEntry field used as the sort key
+SORT_FIELDS = {"price": "price", "name": "name", "brand": "brand_name"}
+DEFAULT_SORT = "price"
+
+
+def parse_price(value):
+    """
+    Convert a price query parameter to Decimal.
+
+    Args:
+        value (str): The raw query parameter.
+
+    Returns:
+        Decimal: The parsed price or None if the value is empty or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return Decimal(value)
+    except (InvalidOperation, TypeError):
+        return None
+
+
+class FacetIndex:
+    """
+    Bitset index of products by category, style, brand, large size and sale.
+
+    Every product occupies a slot; bit ``slot`` of a facet bitset is set when
+    the product belongs to that facet value. Slots of deleted products are
+    reused.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built_at = None
+        # Catalog version the index was built from
+        self._version = None
+        # Bumped on every change; part of the facet count cache keys
+        self.generation = 0
+
+    @property
+    def ttl(self):
+        return getattr(settings, "CATALOG_FACET_INDEX_TTL", 300)
+
+    def invalidate(self):
+        """Drop the index; it will be rebuilt on the next query."""
+        with self._lock:
+            self._built_at = None
+            self.generation += 1
+
+    def _reset(self):
+        self._slots = {}
+        self._rows = []
+        self._free = []
+        self._all = 0
+        self._categories = {}
+        self._styles = {}
+        self._brands = {}
+        self._large_size = 0
+        self._sale = 0
+        self._orders = {field: [] for field in SORT_FIELDS.values()}
+
+    def _ensure_built(self):
+        version = get_catalog_version()
+        if (
+            self._built_at is None
+            or self._version != version
+            or time.monotonic() - self._built_at > self.ttl
+        ):
+            self.build(version)
+
+    def build(self, version=None):
+        """
+        Rebuild the whole index from the catalog read model with one query.
+
+        The rows are collected first; every bitset is then written in one
+        pass and every order list sorted once.
+
+        Args:
+            version (int): The catalog version read before the query.
+        """
+        with self._lock:
+            self._reset()
+            rows = list(ProductCatalogEntry.objects.values(*self._row_fields()))
+            self._rows = rows
+            self._slots = {row["product_id"]: slot for slot, row in enumerate(rows)}
+            self._all = (1 << len(rows)) - 1
+            facets = ({}, {}, {})
+            large_size = []
+            sale = []
+            for slot, row in enumerate(rows):
+                for (_, key), slots in zip(self._facets(row), facets):
+                    slots.setdefault(key, []).append(slot)
+                if row["has_large_size"]:
+                    large_size.append(slot)
+                if row["sale"]:
+                    sale.append(slot)
+            bitsets = (self._categories, self._styles, self._brands)
+            for target, slots in zip(bitsets, facets):
+                for key, members in slots.items():
+                    target[key] = self._bitset(members, len(rows))
+            self._large_size = self._bitset(large_size, len(rows))
+            self._sale = self._bitset(sale, len(rows))
+            for field in self._orders:
+                self._orders[field] = sorted(
+                    (row[field], row["product_id"]) for row in rows
+                )
+            self._built_at = time.monotonic()
+            self._version = get_catalog_version() if version is None else version
+            self.generation += 1
+
+    @staticmethod
+    def _row_fields():
+        return (
+            "product_id",
+            "name",
+            "price",
+            "sale",
+            "has_large_size",
+            "category_name",
+            "style_name",
+            "brand_name",
+        )
+
+    def refresh_product(self, product_id):
+        """
+        Re-read the catalog entry of one product and update its bits.
+
+        Called from the model signals after the entry was refreshed. Does
+        nothing while the index is not built.
+
+        Args:
+            product_id (int): The ID of the changed product.
+        """
+        with self._lock:
+            self.generation += 1
+            if self._built_at is None:
+                return
+            row = ProductCatalogEntry.objects.filter(product_id=product_id)
+            row = row.values(*self._row_fields()).first()
+            self._remove(product_id)
+            if row is not None:
+                self._add(row)
+
+    def adopt_version(self, version):
+        """
+        Record the catalog version bumped for a change this process applied.
+
+        Only a version following the one the index is at is adopted; a
+        version that skipped a bump made elsewhere still forces a rebuild.
+
+        Args:
+            version (int): The new catalog version, or None.
+        """
+        with self._lock:
+            if version is not None and self._version == version - 1:
+                self._version = version
+
+    def remove_product(self, product_id):
+        """
+        Remove a deleted product from the index.
+
+        Args:
+            product_id (int): The ID of the deleted product.
+        """
+        with self._lock:
+            self.generation += 1
+            if self._built_at is not None:
+                self._remove(product_id)
+
+    def _add(self, row):
+        if self._free:
+            slot = self._free.pop()
+            self._rows[slot] = row
+        else:
+            slot = len(self._rows)
+            self._rows.append(row)
+        self._slots[row["product_id"]] = slot
+        bit = 1 << slot
+        self._all |= bit
+        for bitsets, key in self._facets(row):
+            bitsets[key] = bitsets.get(key, 0) | bit
+        if row["has_large_size"]:
+            self._large_size |= bit
+        if row["sale"]:
+            self._sale |= bit
+        for field, order in self._orders.items():
+            insort(order, (row[field], row["product_id"]))
+
+    def _remove(self, product_id):
+        slot = self._slots.pop(product_id, None)
+        if slot is None:
+            return
+        row = self._rows[slot]
+        mask = ~(1 << slot)
+        self._all &= mask
+        for bitsets, key in self._facets(row):
+            bitsets[key] &= mask
+        self._large_size &= mask
+        self._sale &= mask
+        for field, order in self._orders.items():
+            item = (row[field], product_id)
+            del order[bisect_left(order, item)]
+        self._rows[slot] = None
+        self._free.append(slot)
+
+    @staticmethod
+    def _bitset(slots, size):
+        """Return the bitset with the bits of the given slots set."""
+        bits = bytearray((size + 7) // 8)
+        for slot in slots:
+            bits[slot >> 3] |= 1 << (slot & 7)
+        return int.from_bytes(bits, "little")
+
+    def _facets(self, row):
+        return (
+            (self._categories, row["category_name"]),
+            (self._styles, row["style_name"]),
+            (self._brands, row["brand_name"]),
+        )
+
+    @staticmethod
+    def _union(bitsets, names):
+        result = 0
+        for name in names:
+            result |= bitsets.get(name, 0)
+        return result
+
+    def _price_mask(self, start_price, end_price):
+        order = self._orders["price"]
+        lo = 0
+        hi = len(order)
+        if start_price is not None:
+            lo = bisect_right(order, (start_price, float("inf")))
+        if end_price is not None:
+            hi = bisect_left(order, (end_price, float("-inf")))
+        slots = self._slots
+        return self._bitset(
+            (slots[product_id] for _, product_id in order[lo:hi]), len(self._rows)
+        )
+
+    def _mask(self, categories, styles, brands, start_price, end_price, xxl, sale):
+        mask = self._all
+        if categories:
+            mask &= self._union(self._categories, categories)
+        if styles:
+            mask &= self._union(self._styles, styles)
+        if brands:
+            mask &= self._union(self._brands, brands)
+        if xxl:
+            mask &= self._large_size
+        if sale:
+            mask &= self._sale
+        if start_price is not None or end_price is not None:
+            mask &= self._price_mask(start_price, end_price)
+        return mask
+
+    def counts(
+        self,
+        categories=(),
+        styles=(),
+        brands=(),
+        start_price=None,
+        end_price=None,
+        xxl=False,
+        sale=False,
+    ):
+        """
+        Count the matching products per category, style and brand.
+
+        The count of a facet value ignores the selection of its own group, so it
+        tells how many products the page would show if that value were added.
+
+        Args:
+            categories (list): Selected category names.
+            styles (list): Selected style names.
+            brands (list): Selected brand names.
+            start_price (Decimal): Exclusive lower price bound.
+            end_price (Decimal): Exclusive upper price bound.
+            xxl (bool): Only products that have a large size variant.
+            sale (bool): Only products on sale.
+
+        Returns:
+            dict: {"categories": {name: count}, "styles": {...}, "brands": {...}}.
+        """
+        with self._lock:
+            self._ensure_built()
+            masks = {
+                "categories": self._mask(
+                    (), styles, brands, start_price, end_price, xxl, sale
+                ),
+                "styles": self._mask(
+                    categories, (), brands, start_price, end_price, xxl, sale
+                ),
+                "brands": self._mask(
+                    categories, styles, (), start_price, end_price, xxl, sale
+                ),
+            }
+            groups = {
+                "categories": self._categories,
+                "styles": self._styles,
+                "brands": self._brands,
+            }
+            return {
+                group: {
+                    name: (masks[group] & bitset).bit_count()
+                    for name, bitset in bitsets.items()
+                }
+                for group, bitsets in groups.items()
+            }
+
+    @staticmethod
+    def _position(order, field, after, descending):
+        """Return the range of order positions that follow the cursor."""
+        if after is None:
+            return range(len(order) - 1, -1, -1) if descending else range(len(order))
+        value, pk = after
+        try:
+            if field == "price":
+                value = Decimal(value)
+                if not value.is_finite():
+                    raise InvalidOperation(value)
+        except InvalidOperation as error:
+            raise InvalidCursor(value) from error
+        if descending:
+            return range(bisect_left(order, (value, pk)) - 1, -1, -1)
+        return range(bisect_right(order, (value, pk)), len(order))
+
+    def search(
+        self,
+        categories=(),
+        styles=(),
+        brands=(),
+        start_price=None,
+        end_price=None,
+        xxl=False,
+        sale=False,
+        sort_by=DEFAULT_SORT,
+        sort_direction="asc",
+        offset=0,
+        limit=12,
+        after=None,
+    ):
+        """
+        Return one page of product IDs matching the filters.
+
+        Args:
+            categories (list): Category names; a product matches any of them.
+            styles (list): Style names; a product matches any of them.
+            brands (list): Brand names; a product matches any of them.
+            start_price (Decimal): Exclusive lower price bound.
+            end_price (Decimal): Exclusive upper price bound.
+            xxl (bool): Only products that have a large size variant.
+            sale (bool): Only products on sale.
+            sort_by (str): One of ``SORT_FIELDS``.
+            sort_direction (str): "asc" or "desc".
+            offset (int): Number of matching products to skip.
+            limit (int): Page size.
+            after (tuple): Decoded cursor (sort value, ID); the page starts
+                right after this position instead of at ``offset``.
+
+        Returns:
+            tuple: The list of (sort key, product ID) pairs and a flag telling
+            whether more products follow.
+        """
+        field = SORT_FIELDS.get(sort_by, SORT_FIELDS[DEFAULT_SORT])
+        with self._lock:
+            self._ensure_built()
+            mask = self._mask(
+                categories, styles, brands, start_price, end_price, xxl, sale
+            )
+            if not mask:
+                return [], False
+            bits = mask.to_bytes((len(self._rows) + 7) // 8, "little")
+            order = self._orders[field]
+            slots = self._slots
+            wanted = offset + limit + 1
+            found = []
+            for position in self._position(
+                order, field, after, sort_direction == "desc"
+            ):
+                key, product_id = order[position]
+                slot = slots[product_id]
+                if bits[slot >> 3] >> (slot & 7) & 1:
+                    found.append((key, product_id))
+                    if len(found) == wanted:
+                        break
+        return found[offset : offset + limit], len(found) == wanted
+
+
+facet_index = FacetIndex()
@@ -0,0 +1,120 @@
+"""
+Stored metadata of the uploaded images.
+
+``Product.image_metadata`` and ``UserProfile.image_metadata`` map each image
+field name to the width, height, byte size and Pillow format of its file,
+together with the file name they were read from (only the name for a
+missing or broken file). They are filled when an image is uploaded (see
+womanshop/signals.py) and backfilled by ``manage.py backfill_image_metadata``,
+so the pages, the admin and the API never open an image to learn its size.
+The width and height are the displayed ones, with the EXIF orientation
+applied like in the renditions manifest of womanshop/renditions.py.
+
+``width_field``/``height_field`` were not used: Django fills them on every
+model load while they are empty, which would open every image of the rows
+not backfilled yet.
+"""
+
+import logging
+
+from PIL import ExifTags, Image
+
+logger = logging.getLogger(__name__)
+
+# EXIF orientations that turn the image by 90 degrees
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+# Image fields with stored metadata, by model label
+IMAGE_FIELDS = {
+    "womanshop.product": ("image1", "image2", "image3", "image4"),
+    "users.userprofile": ("profile_pic",),
+}
+
+
+def image_fields(instance):
+    return IMAGE_FIELDS[instance._meta.label_lower]
+
+
+def read_metadata(field_file):
+    """
+    Read the metadata of an image from its header.
+
+    Args:
+        field_file (ImageFieldFile): The image.
+
+    Returns:
+        dict: The name, displayed width and height, size in bytes and format
+        of the image, or None if the file is missing or not an image.
+    """
+    storage = field_file.storage
+    try:
+        # The stored file, not the upload the field may still hold
+        with storage.open(field_file.name, "rb") as file:
+            # Only the header is decoded
+            with Image.open(file) as image:
+                width, height = image.size
+                image_format = image.format
+                orientation = image.getexif().get(ExifTags.Base.Orientation)
+        if orientation in TRANSPOSED_ORIENTATIONS:
+            width, height = height, width
+        size = storage.size(field_file.name)
+    except (OSError, ValueError, Image.DecompressionBombError) as error:
+        logger.warning("No metadata for %s: %s", field_file.name, error)
+        return None
+    return {
+        "name": field_file.name,
+        "width": width,
+        "height": height,
+        "size": size,
+        "format": image_format,
+    }
+
+
+def metadata_outdated(instance):
+    """
+    Tell whether an image of the instance has no metadata for its file.
+
+    Args:
+        instance (Model): A Product or UserProfile.
+
+    Returns:
+        bool: True if refresh_image_metadata has work to do.
+    """
+    names = {
+        field: getattr(instance, field).name
+        for field in image_fields(instance)
+        if getattr(instance, field)
+    }
+    stored = {field: item["name"] for field, item in instance.image_metadata.items()}
+    return names != stored
+
+
+def refresh_image_metadata(instance, force=False):
+    """
+    Read the metadata of the images of an instance that changed.
+
+    Images whose metadata still names the current file are not opened. The
+    metadata is saved with a queryset update, so no save signal is sent.
+
+    Args:
+        instance (Model): A Product or UserProfile.
+        force (bool): Read every image again.
+
+    Returns:
+        bool: True if ``instance.image_metadata`` changed.
+    """
+    metadata = {}
+    for field in image_fields(instance):
+        field_file = getattr(instance, field)
+        if not field_file:
+            continue
+        item = instance.image_metadata.get(field)
+        if force or item is None or item["name"] != field_file.name:
+            # A missing or broken file is not read again until replaced
+            item = read_metadata(field_file) or {"name": field_file.name}
+        metadata[field] = item
+    if metadata == instance.image_metadata:
+        return False
+    instance.image_metadata = metadata
+    type(instance).objects.filter(pk=instance.pk).update(image_metadata=metadata)
+    return True
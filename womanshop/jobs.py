@@ -0,0 +1,236 @@
+"""
+Database-backed queue of image processing jobs.
+
+Upload signals call ``enqueue`` instead of processing images inside the
+request; ``manage.py run_image_worker`` claims pending jobs and runs them in
+a process pool. A job is claimed with a conditional UPDATE, so several
+workers can share the queue on any database. Failed jobs are retried after
+``IMAGE_JOB_RETRY_DELAY * 2 ** (attempts - 1)`` seconds until they have used
+``IMAGE_JOB_MAX_ATTEMPTS`` attempts, and jobs left running by a crashed
+worker are requeued after ``IMAGE_JOB_TIMEOUT`` seconds.
+
+With ``IMAGE_JOBS_ASYNC = False`` the jobs run inside the request instead.
+"""
+
+import io
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from users.models import UserProfile
+
+from . import catalog_cache
+from .catalog_entries import refresh_catalog_entry
+from .image_metadata import refresh_image_metadata
+from .models import ImageJob, Product
+from .renditions import refresh_product_renditions
+
+logger = logging.getLogger(__name__)
+
+# Default profile picture, never processed
+DEFAULT_PROFILE_PIC = "profile_pics/not_photo.png"
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def process_product_renditions(product_id, progress):
+    """
+    Generate the renditions of a product and refresh its catalog entry.
+
+    Args:
+        product_id (int): The ID of the product.
+        progress (callable): Called with the percentage done.
+    """
+    product = Product.objects.filter(pk=product_id).first()
+    if product is None:
+        return
+    if refresh_product_renditions(product, progress):
+        refresh_catalog_entry(product_id)
+        catalog_cache.bump_catalog_version()
+
+
+def process_profile_pic(profile_id, progress):
+    """
+    Shrink an oversized profile picture to ``PROFILE_PIC_MAX_SIZE`` pixels.
+
+    Args:
+        profile_id (int): The ID of the user profile.
+        progress (callable): Called with the percentage done.
+    """
+    profile = UserProfile.objects.filter(pk=profile_id).first()
+    if profile is None or not profile.profile_pic:
+        return
+    if profile.profile_pic.name == DEFAULT_PROFILE_PIC:
+        return
+    max_size = _setting("PROFILE_PIC_MAX_SIZE", 512)
+    with profile.profile_pic.open("rb") as file:
+        image = Image.open(io.BytesIO(file.read()))
+        image.load()
+    if max(image.size) <= max_size:
+        return
+    progress(50)
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_size, max_size), Image.LANCZOS)
+    output = io.BytesIO()
+    if image.mode in ("RGBA", "LA", "P"):
+        image.save(output, "PNG", optimize=True)
+        extension = "png"
+    else:
+        image.convert("RGB").save(output, "JPEG", quality=85, optimize=True)
+        extension = "jpg"
+    old_name = profile.profile_pic.name
+    stem = old_name.rsplit("/", 1)[-1].rsplit(".", 1)[0]
+    storage = profile.profile_pic.storage
+    name = storage.save(
+        f"profile_pics/{stem}.{extension}", ContentFile(output.getvalue())
+    )
+    # A queryset update, so the upload signal does not enqueue the job again
+    UserProfile.objects.filter(pk=profile_id).update(profile_pic=name)
+    storage.delete(old_name)
+    profile.profile_pic.name = name
+    refresh_image_metadata(profile)
+
+
+HANDLERS = {
+    ImageJob.PRODUCT_RENDITIONS: process_product_renditions,
+    ImageJob.PROFILE_PIC: process_profile_pic,
+}
+
+
+def enqueue(kind, object_id):
+    """
+    Queue an image job, or run it now if IMAGE_JOBS_ASYNC is off.
+
+    A job that is already pending for the same object is not queued twice.
+
+    Args:
+        kind (str): One of ImageJob.KIND_CHOICES.
+        object_id (int): The ID of the product or user profile.
+
+    Returns:
+        ImageJob: The pending job, or None if the job ran immediately.
+    """
+    if not _setting("IMAGE_JOBS_ASYNC", True):
+        HANDLERS[kind](object_id, lambda percent: None)
+        return None
+    job = ImageJob.objects.filter(
+        kind=kind, object_id=object_id, status=ImageJob.PENDING
+    ).first()
+    if job is None:
+        job = ImageJob.objects.create(
+            kind=kind, object_id=object_id, available_at=timezone.now()
+        )
+    return job
+
+
+def requeue_stale_jobs():
+    """
+    Return the jobs of crashed workers to the queue.
+
+    Returns:
+        int: The number of requeued jobs.
+    """
+    timeout = timedelta(seconds=_setting("IMAGE_JOB_TIMEOUT", 600))
+    return ImageJob.objects.filter(
+        status=ImageJob.RUNNING, updated_at__lt=timezone.now() - timeout
+    ).update(status=ImageJob.PENDING, available_at=timezone.now())
+
+
+def claim_jobs(limit):
+    """
+    Claim up to ``limit`` pending jobs that are due.
+
+    Args:
+        limit (int): The maximum number of jobs.
+
+    Returns:
+        list: The IDs of the claimed jobs.
+    """
+    candidates = ImageJob.objects.filter(
+        status=ImageJob.PENDING, available_at__lte=timezone.now()
+    ).order_by("available_at", "id")
+    claimed = []
+    for job_id in candidates.values_list("id", flat=True)[: limit * 2]:
+        # Only one worker wins the conditional update of a job
+        if ImageJob.objects.filter(pk=job_id, status=ImageJob.PENDING).update(
+            status=ImageJob.RUNNING,
+            progress=0,
+            attempts=F("attempts") + 1,
+            updated_at=timezone.now(),
+        ):
+            claimed.append(job_id)
+            if len(claimed) == limit:
+                break
+    return claimed
+
+
+def run_job(job_id):
+    """
+    Run a claimed job and record its outcome.
+
+    Args:
+        job_id (int): The ID of the job.
+
+    Returns:
+        str: The new status of the job.
+    """
+    job = ImageJob.objects.get(pk=job_id)
+
+    def progress(percent):
+        ImageJob.objects.filter(pk=job_id).update(
+            progress=percent, updated_at=timezone.now()
+        )
+
+    try:
+        HANDLERS[job.kind](job.object_id, progress)
+    except Exception:
+        logger.exception("Image job %s failed", job_id)
+        status = ImageJob.FAILED
+        available_at = job.available_at
+        if job.attempts < _setting("IMAGE_JOB_MAX_ATTEMPTS", 3):
+            status = ImageJob.PENDING
+            delay = _setting("IMAGE_JOB_RETRY_DELAY", 30) * 2 ** (job.attempts - 1)
+            available_at = timezone.now() + timedelta(seconds=delay)
+        ImageJob.objects.filter(pk=job_id).update(
+            status=status,
+            error=traceback.format_exc(),
+            available_at=available_at,
+            updated_at=timezone.now(),
+        )
+        return status
+    ImageJob.objects.filter(pk=job_id).update(
+        status=ImageJob.DONE, progress=100, error="", updated_at=timezone.now()
+    )
+    return ImageJob.DONE
+
+
+def run_pending_jobs(pool=None, limit=100):
+    """
+    Claim and run one batch of due jobs.
+
+    Args:
+        pool (ProcessPoolExecutor): The worker processes, None to run the
+            jobs in this process.
+        limit (int): The maximum number of jobs.
+
+    Returns:
+        list: The new statuses of the jobs that ran.
+    """
+    requeue_stale_jobs()
+    job_ids = claim_jobs(limit)
+    if not job_ids:
+        return []
+    if pool is None:
+        return [run_job(job_id) for job_id in job_ids]
+    # Forked workers must not share the connection of this process
+    connections.close_all()
+    return list(pool.map(run_job, job_ids))
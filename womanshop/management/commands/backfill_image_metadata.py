@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from womanshop.image_metadata import refresh_image_metadata
+from womanshop.models import Product, UserProfile
+
+
+class Command(BaseCommand):
+    """
+    Store the width, height, size and format of the product images and
+    profile pictures uploaded before the metadata existed, or of all of them
+    with --force.
+
+    Usage:
+        python manage.py backfill_image_metadata [--force]
+    """
+
+    help = "Backfill the stored metadata of the uploaded images."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Read every image again, not only new or replaced ones.",
+        )
+
+    def handle(self, *args, **options):
+        for model in (Product, UserProfile):
+            count = 0
+            for instance in model.objects.order_by("pk").iterator():
+                if refresh_image_metadata(instance, force=options["force"]):
+                    count += 1
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Updated the image metadata of {count} "
+                    f"{model._meta.verbose_name_plural}."
+                )
+            )
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from womanshop.catalog_cache import bump_catalog_version
+from womanshop.co_purchases import CHUNK_SIZE, rebuild_bought_together
+
+
+class Command(BaseCommand):
+    """
+    Recompute the "frequently bought together" lists of all products from
+    the paid orders.
+
+    Usage:
+        python manage.py build_bought_together [--limit 6] [--chunk-size 10000]
+    """
+
+    help = "Rebuild the frequently bought together product lists."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Number of products per list.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help="Number of orders read per query.",
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_bought_together(
+            limit=options["limit"], chunk_size=options["chunk_size"]
+        )
+        bump_catalog_version()
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt bought together lists of {count} products.")
+        )
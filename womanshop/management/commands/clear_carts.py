@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from womanshop.carts import delete_expired_carts
+
+
+class Command(BaseCommand):
+    """
+    Delete the anonymous carts whose session has expired, unchanged for
+    longer than SESSION_COOKIE_AGE. Run it next to clearsessions.
+
+    Usage:
+        python manage.py clear_carts
+    """
+
+    help = "Delete the anonymous carts of expired sessions."
+
+    def handle(self, *args, **options):
+        count = delete_expired_carts()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {count} expired carts."))
@@ -0,0 +1,148 @@
+import os
+from functools import partial
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from womanshop.blobs import delete_file, recount
+from womanshop.catalog_cache import bump_catalog_version
+from womanshop.catalog_entries import refresh_catalog_entry
+from womanshop.models import MediaBlob, Product
+from womanshop.renditions import IMAGE_FIELDS
+from womanshop.storage import (
+    blob_name,
+    file_digest,
+    is_blob_name,
+    product_image_storage,
+)
+
+
+class Command(BaseCommand):
+    """
+    Move the product images uploaded before the content-addressed storage
+    (see womanshop/storage.py) into it. Byte-identical copies collapse into
+    one file, the products are pointed at the new names and every reference
+    count is recomputed. The old files are deleted only once the new names
+    are committed, so an interrupted run leaves every product pointing at an
+    existing file.
+
+    Usage:
+        python manage.py dedupe_media [--dry-run] [--delete-unreferenced]
+    """
+
+    help = "Deduplicate the product images by content hash."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the duplicates, change nothing.",
+        )
+        parser.add_argument(
+            "--delete-unreferenced",
+            action="store_true",
+            help="Also delete the stored files no product points at.",
+        )
+
+    def handle(self, *args, **options):
+        storage = product_image_storage
+        directory = Product.upload_to.strip("/")
+        renamed = {}
+        seen = set()
+        duplicates = 0
+        saved_bytes = 0
+        for name in self.legacy_files(directory):
+            with storage.open(name) as file:
+                target = blob_name(
+                    directory, file_digest(file), os.path.splitext(name)[1]
+                )
+                if target in seen or storage.exists(target):
+                    duplicates += 1
+                    saved_bytes += storage.size(name)
+                elif not options["dry_run"]:
+                    storage.save(name, file)
+            seen.add(target)
+            renamed[name] = target
+        summary = (
+            f"{len(renamed)} files, {duplicates} duplicates "
+            f"({saved_bytes / 1024 / 1024:.1f} MB)"
+        )
+        if options["dry_run"]:
+            self.stdout.write(f"Would move {summary}.")
+            return
+
+        with transaction.atomic():
+            products = self.rename_references(renamed)
+            referenced = recount()
+            transaction.on_commit(partial(self.delete_legacy_files, renamed))
+        deleted = 0
+        if options["delete_unreferenced"]:
+            deleted = self.delete_unreferenced(directory)
+        bump_catalog_version()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Moved {summary}, updated {products} products; "
+                f"{referenced} files referenced, {deleted} unreferenced deleted."
+            )
+        )
+
+    @staticmethod
+    def legacy_files(directory):
+        _, files = product_image_storage.listdir(directory)
+        for filename in sorted(files):
+            name = f"{directory}/{filename}"
+            if not filename.startswith(".") and not is_blob_name(name):
+                yield name
+
+    @staticmethod
+    def delete_legacy_files(renamed):
+        for name in renamed:
+            product_image_storage.delete(name)
+
+    @staticmethod
+    def rename_references(renamed):
+        """
+        Point the product images, their rendition manifests and their
+        metadata at the new names.
+
+        Queryset updates are used, so the save signals do not count the
+        references one by one; recount() runs afterwards.
+        """
+        count = 0
+        rows = Product.objects.values_list(
+            "id", "renditions", "image_metadata", *IMAGE_FIELDS
+        )
+        for product_id, renditions, metadata, *names in rows.iterator():
+            changes = {
+                field: renamed[name]
+                for field, name in zip(IMAGE_FIELDS, names)
+                if name in renamed
+            }
+            if not changes:
+                continue
+            for items in (renditions, metadata):
+                for field, item in items.items():
+                    if field in changes:
+                        item["name"] = changes[field]
+            Product.objects.filter(pk=product_id).update(
+                renditions=renditions, image_metadata=metadata, **changes
+            )
+            refresh_catalog_entry(product_id)
+            count += 1
+        return count
+
+    @staticmethod
+    def delete_unreferenced(directory):
+        storage = product_image_storage
+        referenced = set(
+            MediaBlob.objects.filter(refcount__gt=0).values_list("name", flat=True)
+        )
+        count = 0
+        subdirectories, _ = storage.listdir(directory)
+        for subdirectory in subdirectories:
+            _, files = storage.listdir(f"{directory}/{subdirectory}")
+            for filename in files:
+                name = f"{directory}/{subdirectory}/{filename}"
+                if is_blob_name(name) and name not in referenced:
+                    delete_file(name)
+                    count += 1
+        MediaBlob.objects.filter(refcount=0).delete()
+        return count
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from womanshop.catalog_cache import bump_catalog_version
+from womanshop.catalog_entries import refresh_catalog_entry
+from womanshop.models import Product
+from womanshop.renditions import refresh_product_renditions
+
+
+class Command(BaseCommand):
+    """
+    Generate the missing renditions of the product images, e.g. after
+    changing IMAGE_RENDITION_WIDTHS or for products uploaded before the
+    renditions existed.
+
+    Usage:
+        python manage.py generate_renditions [--force]
+    """
+
+    help = "Generate the responsive renditions of the product images."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate the manifests of all images, not only changed ones.",
+        )
+
+    def handle(self, *args, **options):
+        count = 0
+        for product in Product.objects.order_by("id").iterator():
+            if options["force"]:
+                product.renditions = {}
+            if refresh_product_renditions(product):
+                refresh_catalog_entry(product.id)
+                count += 1
+        bump_catalog_version()
+        self.stdout.write(
+            self.style.SUCCESS(f"Updated renditions of {count} products.")
+        )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from womanshop.catalog_cache import bump_catalog_version
+from womanshop.catalog_entries import rebuild_catalog_entries
+from womanshop.search_backends import get_search_backend
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the ProductCatalogEntry read model and the database search data
+    from the product tables, then bump the catalog version so the cached
+    responses are dropped and the web processes rebuild their facet index.
+
+    Usage:
+        python manage.py rebuild_catalog
+    """
+
+    help = "Rebuild the denormalized product catalog entries."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of entries inserted per query.",
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_catalog_entries(batch_size=options["batch_size"])
+        get_search_backend().update_products()
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} catalog entries."))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from womanshop.catalog_cache import bump_catalog_version
+from womanshop.recommendations import rebuild_recommendations
+
+
+class Command(BaseCommand):
+    """
+    Recompute the "you may also like" lists of all products from the
+    catalog entries and the order history.
+
+    Usage:
+        python manage.py rebuild_recommendations [--limit 12]
+    """
+
+    help = "Rebuild the precomputed product recommendations."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Number of recommended products per product.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of lists inserted per query.",
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_recommendations(
+            limit=options["limit"], batch_size=options["batch_size"]
+        )
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} recommendation lists."))
@@ -0,0 +1,84 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from womanshop.jobs import run_pending_jobs
+from womanshop.models import ImageJob
+
+
+class Command(BaseCommand):
+    """
+    Process the queued image jobs (see womanshop/jobs.py) until stopped.
+
+    Usage:
+        python manage.py run_image_worker [--processes 2] [--once]
+    """
+
+    help = "Run the image processing worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=2,
+            help="Number of worker processes, 0 to run the jobs in this process.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=20,
+            help="Number of jobs claimed at a time.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait when the queue is empty.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once no job is due instead of polling.",
+        )
+
+    def handle(self, *args, **options):
+        pool = None
+        if options["processes"]:
+            pool = ProcessPoolExecutor(max_workers=options["processes"])
+        try:
+            while True:
+                statuses = run_pending_jobs(pool, limit=options["batch_size"])
+                if statuses:
+                    self.stdout.write(self.summary(statuses))
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        counts = dict(
+            ImageJob.objects.values_list("status").annotate(Count("id")).order_by()
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Queue: "
+                + ", ".join(
+                    f"{label.lower()} {counts.get(status, 0)}"
+                    for status, label in ImageJob.STATUS_CHOICES
+                )
+            )
+        )
+
+    @staticmethod
+    def summary(statuses):
+        labels = dict(ImageJob.STATUS_CHOICES)
+        return "Ran {} jobs: {}".format(
+            len(statuses),
+            ", ".join(
+                f"{labels[status].lower()} {statuses.count(status)}"
+                for status in dict.fromkeys(statuses)
+            ),
+        )
@@ -0,0 +1,216 @@
+"""
+Serving of the uploaded media files.
+
+With ``MEDIA_SENDFILE_BACKEND`` set, Django only checks the request and
+hands the transfer to the front server:
+
+- ``"x-accel-redirect"``: nginx, through an ``internal`` location mapped to
+  MEDIA_ROOT at ``MEDIA_ACCEL_REDIRECT_PREFIX``,
+- ``"x-sendfile"``: Apache mod_xsendfile or lighttpd.
+
+The front server then handles Range requests itself. Without a backend,
+e.g. in development, the file is streamed in chunks with a FileResponse and
+single byte ranges are answered with a 206.
+
+Hidden files, such as the ``.upload-*`` temporary files the
+content-addressed storage writes before renaming them, are never served.
+
+Files whose name is derived from their content (product images in the
+content-addressed storage and renditions) never change and are cached for a
+year as immutable; other files for ``MEDIA_CACHE_MAX_AGE`` seconds.
+"""
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .renditions import is_rendition_name
+from .storage import is_blob_name
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def is_immutable(name):
+    """
+    Tell whether a media file is named after its content.
+
+    Args:
+        name (str): The name relative to MEDIA_ROOT.
+
+    Returns:
+        bool: True if the file behind the name never changes.
+    """
+    return is_blob_name(name) or is_rendition_name(name)
+
+
+def parse_range(header, size):
+    """
+    Parse a single byte range of a Range header.
+
+    Args:
+        header (str): The Range header value.
+        size (int): The size of the file.
+
+    Returns:
+        tuple: The first and last byte offsets, or None if the header is not
+        a single byte range this view serves (multiple ranges get the whole
+        file).
+
+    Raises:
+        ValueError: If the range is outside the file.
+    """
+    match = RANGE_RE.match(header.replace(" ", ""))
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        first, last = max(0, size - length), size - 1
+    else:
+        first = int(first)
+        last = min(int(last), size - 1) if last else size - 1
+    if first >= size or first > last:
+        raise ValueError(header)
+    return first, last
+
+
+def _iter_range(file, first, length):
+    try:
+        file.seek(first)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        return if_none_match == "*" or etag in re.split(r"\s*,\s*", if_none_match)
+    since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+    return since is not None and int(mtime) <= since
+
+
+def _range_applies(request, etag, mtime):
+    # A stale If-Range asks for the whole, current file
+    if_range = request.headers.get("If-Range")
+    if if_range is None:
+        return True
+    return if_range == etag or parse_http_date_safe(if_range) == int(mtime)
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve a file of MEDIA_ROOT.
+
+    Args:
+        request (HttpRequest): The request object.
+        path (str): The name of the file relative to MEDIA_ROOT.
+
+    Returns:
+        HttpResponse: The file, a 206 with a part of it, a 304, or a
+        response for the front server to fill.
+
+    Raises:
+        Http404: If the file does not exist or is hidden.
+    """
+    if any(part.startswith(".") for part in path.split("/")):
+        raise Http404("File not found")
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("File not found")
+    try:
+        stat = os.stat(full_path)
+    except (OSError, ValueError):
+        raise Http404("File not found")
+    if not os.path.isfile(full_path):
+        raise Http404("File not found")
+
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or "application/octet-stream"
+    backend = getattr(settings, "MEDIA_SENDFILE_BACKEND", "")
+
+    if _not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+    elif backend == "x-accel-redirect":
+        response = HttpResponse(content_type=content_type)
+        prefix = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip("/")
+        response["X-Accel-Redirect"] = f"{prefix}/{quote(path)}"
+    elif backend == "x-sendfile":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = full_path
+    else:
+        response = _file_response(request, full_path, stat, etag, content_type)
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    response["Accept-Ranges"] = "bytes"
+    if encoding:
+        response["Content-Encoding"] = encoding
+    if response.status_code == 416:
+        return response
+    if is_immutable(path):
+        patch_cache_control(
+            response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True
+        )
+    else:
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=getattr(settings, "MEDIA_CACHE_MAX_AGE", 3600),
+        )
+    return response
+
+
+def _file_response(request, full_path, stat, etag, content_type):
+    size = stat.st_size
+    header = request.headers.get("Range")
+    byte_range = None
+    if header and _range_applies(request, etag, stat.st_mtime):
+        try:
+            byte_range = parse_range(header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+    file = open(full_path, "rb")
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+        response.block_size = CHUNK_SIZE
+        return response
+    first, last = byte_range
+    length = last - first + 1
+    response = StreamingHttpResponse(
+        _iter_range(file, first, length), status=206, content_type=content_type
+    )
+    response["Content-Length"] = str(length)
+    response["Content-Range"] = f"bytes {first}-{last}/{size}"
+    return response
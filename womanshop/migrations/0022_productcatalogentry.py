@@ -0,0 +1,80 @@
+# Generated by Django 4.1.7 on 2026-10-18 07:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+LARGE_SIZES = {"80B", "80C", "80D", "80E", "80F"}
+
+
+def populate_catalog_entries(apps, schema_editor):
+    Product = apps.get_model("womanshop", "Product")
+    ProductVariant = apps.get_model("womanshop", "ProductVariant")
+    ProductCatalogEntry = apps.get_model("womanshop", "ProductCatalogEntry")
+    variants = {}
+    for product_id, size, stock in ProductVariant.objects.values_list(
+        "product_id", "size__name", "stock"
+    ):
+        variants.setdefault(product_id, []).append((size, stock))
+    entries = []
+    for product in Product.objects.select_related("brand", "category", "style"):
+        sizes = sorted({size for size, _ in variants.get(product.id, [])})
+        stocks = [stock for _, stock in variants.get(product.id, [])]
+        entries.append(
+            ProductCatalogEntry(
+                product=product,
+                name=product.name,
+                price=product.price,
+                category_name=product.category.name,
+                style_name=product.style.name,
+                brand_name=product.brand.name,
+                sale=product.sale,
+                has_large_size=not LARGE_SIZES.isdisjoint(sizes),
+                min_stock=min(stocks, default=0),
+                max_stock=max(stocks, default=0),
+                sizes=",".join(sizes)[:255],
+                image1_url=product.image1.url if product.image1 else "",
+                created_at=product.created_at,
+            )
+        )
+    ProductCatalogEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("womanshop", "0021_alter_order_user_profile_delete_userprofile"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductCatalogEntry",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="catalog_entry",
+                        serialize=False,
+                        to="womanshop.product",
+                    ),
+                ),
+                ("name", models.CharField(db_index=True, max_length=100)),
+                (
+                    "price",
+                    models.DecimalField(db_index=True, decimal_places=2, max_digits=8),
+                ),
+                ("category_name", models.CharField(db_index=True, max_length=100)),
+                ("style_name", models.CharField(db_index=True, max_length=100)),
+                ("brand_name", models.CharField(db_index=True, max_length=100)),
+                ("sale", models.BooleanField(db_index=True, default=False)),
+                ("has_large_size", models.BooleanField(db_index=True, default=False)),
+                ("min_stock", models.PositiveIntegerField(default=0)),
+                ("max_stock", models.PositiveIntegerField(default=0)),
+                ("sizes", models.CharField(blank=True, max_length=255)),
+                ("image1_url", models.CharField(blank=True, max_length=255)),
+                ("created_at", models.DateTimeField()),
+            ],
+        ),
+        migrations.RunPython(populate_catalog_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.1.7 on 2026-10-18 09:10
+
+from django.db import migrations, models
+
+
+LARGE_SIZES = {"80B", "80C", "80D", "80E", "80F"}
+
+
+def populate_has_large_size(apps, schema_editor):
+    Product = apps.get_model("womanshop", "Product")
+    ProductVariant = apps.get_model("womanshop", "ProductVariant")
+    large = ProductVariant.objects.filter(size__name__in=LARGE_SIZES)
+    Product.objects.filter(id__in=large.values("product_id")).update(
+        has_large_size=True
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("womanshop", "0022_productcatalogentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="has_large_size",
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+        migrations.AlterField(
+            model_name="product",
+            name="sale",
+            field=models.BooleanField(db_index=True),
+        ),
+        migrations.RunPython(populate_has_large_size, migrations.RunPython.noop),
+    ]
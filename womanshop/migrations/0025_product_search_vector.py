@@ -0,0 +1,53 @@
+# Generated by Django 4.1.7 on 2026-10-18 10:30
+
+from django.db import migrations
+
+from womanshop.search_backends import get_search_config
+
+# The stored tsvector column and its GIN index only exist on PostgreSQL; the
+# other databases use the portable search backend (womanshop/search_backends.py).
+# The vectors use the same text search configuration as the queries
+# (get_search_config); rebuild_catalog recomputes them after it changes.
+
+
+def add_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "ALTER TABLE womanshop_product ADD COLUMN IF NOT EXISTS search_vector tsvector"
+    )
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS womanshop_product_search_vector_gin "
+        "ON womanshop_product USING gin (search_vector)"
+    )
+    schema_editor.execute(
+        """
+        UPDATE womanshop_product AS p SET search_vector =
+            setweight(to_tsvector(%s::regconfig, p.name), 'A') ||
+            setweight(to_tsvector(%s::regconfig, p.vendor_code), 'A') ||
+            setweight(to_tsvector(%s::regconfig, b.name), 'B') ||
+            setweight(to_tsvector(%s::regconfig, p.collection), 'B') ||
+            setweight(to_tsvector(%s::regconfig, p.description), 'C')
+        FROM womanshop_brand AS b
+        WHERE b.id = p.brand_id
+        """,
+        [get_search_config()] * 5,
+    )
+
+
+def remove_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "ALTER TABLE womanshop_product DROP COLUMN IF EXISTS search_vector"
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("womanshop", "0024_product_updated_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_vector, remove_search_vector),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.1.7 on 2026-10-18 11:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("womanshop", "0025_product_search_vector"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductRecommendation",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="recommendation",
+                        serialize=False,
+                        to="womanshop.product",
+                    ),
+                ),
+                ("product_ids", models.TextField(blank=True)),
+                ("computed_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
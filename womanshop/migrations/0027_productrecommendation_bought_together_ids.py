@@ -0,0 +1,17 @@
+# Generated by Django 4.1.7 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("womanshop", "0026_productrecommendation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productrecommendation",
+            name="bought_together_ids",
+            field=models.TextField(blank=True, default=""),
+        ),
+    ]
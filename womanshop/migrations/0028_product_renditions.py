@@ -0,0 +1,22 @@
+# Generated by Django 4.1.7 on 2026-10-18 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("womanshop", "0027_productrecommendation_bought_together_ids"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="renditions",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name="productcatalogentry",
+            name="image1_renditions",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.1.7 on 2026-10-18 07:58
+
+from django.db import migrations, models
+import womanshop.storage
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("womanshop", "0029_imagejob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MediaBlob",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=255, primary_key=True, serialize=False),
+                ),
+                ("size", models.PositiveBigIntegerField(default=0)),
+                ("refcount", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name="product",
+            name="image1",
+            field=models.ImageField(
+                storage=womanshop.storage.ContentAddressedStorage(),
+                upload_to="products/",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="product",
+            name="image2",
+            field=models.ImageField(
+                storage=womanshop.storage.ContentAddressedStorage(),
+                upload_to="products/",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="product",
+            name="image3",
+            field=models.ImageField(
+                storage=womanshop.storage.ContentAddressedStorage(),
+                upload_to="products/",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="product",
+            name="image4",
+            field=models.ImageField(
+                storage=womanshop.storage.ContentAddressedStorage(),
+                upload_to="products/",
+            ),
+        ),
+    ]
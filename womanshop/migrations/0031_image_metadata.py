@@ -0,0 +1,17 @@
+# Generated by Django 4.1.7 on 2026-10-18 08:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("womanshop", "0030_mediablob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="image_metadata",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
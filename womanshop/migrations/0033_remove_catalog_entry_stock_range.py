@@ -0,0 +1,20 @@
+# Generated by Django 4.1.7 on 2026-10-18 08:28
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("womanshop", "0032_cart"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="productcatalogentry",
+            name="max_stock",
+        ),
+        migrations.RemoveField(
+            model_name="productcatalogentry",
+            name="min_stock",
+        ),
+    ]
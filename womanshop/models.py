@@ -5,6 +5,7 @@ from django.contrib.auth.models import User
 import datetime
 from decimal import Decimal
 from users.models import UserProfile
+from .storage import product_image_storage
 
 
 class Order(models.Model):
@@ -100,12 +101,22 @@ class Product(models.Model):
     collection = models.CharField(max_length=200)
     price = models.DecimalField(max_digits=8, decimal_places=2)
     description = models.TextField()
-    image1 = models.ImageField(upload_to=upload_to)
-    image2 = models.ImageField(upload_to=upload_to)
-    image3 = models.ImageField(upload_to=upload_to)
-    image4 = models.ImageField(upload_to=upload_to)
-    sale = models.BooleanField()
+    # Stored once per content hash (see womanshop/storage.py)
+    image1 = models.ImageField(upload_to=upload_to, storage=product_image_storage)
+    image2 = models.ImageField(upload_to=upload_to, storage=product_image_storage)
+    image3 = models.ImageField(upload_to=upload_to, storage=product_image_storage)
+    image4 = models.ImageField(upload_to=upload_to, storage=product_image_storage)
+    sale = models.BooleanField(db_index=True)
+    # Whether the product has a variant in one of the LARGE_SIZES, maintained
+    # from the variants by womanshop/catalog_entries.py
+    has_large_size = models.BooleanField(default=False, db_index=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Also bumped when a variant of the product changes (see womanshop/signals.py)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Manifests of the image renditions by field name (see womanshop/renditions.py)
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
+    # Size and format of the images by field name (see womanshop/image_metadata.py)
+    image_metadata = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return self.name
@@ -125,6 +136,85 @@ class ProductVariant(models.Model):
         return f"{self.product.name} - Color: {self.color.name}, Size: {self.size.name}"
 
 
+class ProductCatalogEntry(models.Model):
+    """
+    Denormalized read model of a product for the catalog pages.
+
+    Holds everything a catalog card and the catalog filters need, so a
+    catalog page is a single indexed query without joins. Kept in sync by
+    the womanshop signals and rebuilt with ``manage.py rebuild_catalog``.
+    """
+
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="catalog_entry",
+    )
+    name = models.CharField(max_length=100, db_index=True)
+    price = models.DecimalField(max_digits=8, decimal_places=2, db_index=True)
+    category_name = models.CharField(max_length=100, db_index=True)
+    style_name = models.CharField(max_length=100, db_index=True)
+    brand_name = models.CharField(max_length=100, db_index=True)
+    sale = models.BooleanField(default=False, db_index=True)
+    has_large_size = models.BooleanField(default=False, db_index=True)
+    sizes = models.CharField(max_length=255, blank=True)
+    image1_url = models.CharField(max_length=255, blank=True)
+    image1_renditions = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField()
+
+    def __str__(self):
+        return self.name
+
+
+class ProductRecommendation(models.Model):
+    """
+    Precomputed product lists of a product.
+
+    The related product IDs are stored best first as comma-separated
+    strings, so a product page reads its lists with a single primary-key
+    fetch. ``product_ids`` ("you may also like") is rebuilt with
+    ``manage.py rebuild_recommendations``, ``bought_together_ids``
+    ("frequently bought together") with ``manage.py build_bought_together``.
+    """
+
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="recommendation",
+    )
+    product_ids = models.TextField(blank=True)
+    bought_together_ids = models.TextField(blank=True, default="")
+    computed_at = models.DateTimeField(auto_now=True)
+
+    @staticmethod
+    def parse_ids(value):
+        return [int(pk) for pk in value.split(",") if pk]
+
+    def get_product_ids(self):
+        """
+        Return the recommended product IDs, best first.
+
+        Returns:
+            list: The product IDs.
+        """
+        return self.parse_ids(self.product_ids)
+
+    def get_bought_together_ids(self):
+        """
+        Return the IDs of the products most often bought together with this
+        one, most frequent first.
+
+        Returns:
+            list: The product IDs.
+        """
+        return self.parse_ids(self.bought_together_ids)
+
+    def __str__(self):
+        return f"Recommendations for {self.product_id}"
+
+
 class OrderItem(models.Model):
     """
     Model representing an item in an order.
@@ -148,3 +238,125 @@ class OrderItem(models.Model):
 
         self.subtotal = self.product_variant.product.price * quantity
         return super().save(*args, **kwargs)
+
+
+class ImageJob(models.Model):
+    """
+    Image processing job run by ``manage.py run_image_worker``.
+
+    Jobs are created by the upload signals and claimed by the worker one at
+    a time; a failed job is retried after a growing delay until it has used
+    ``IMAGE_JOB_MAX_ATTEMPTS`` attempts (see womanshop/jobs.py).
+    """
+
+    PRODUCT_RENDITIONS = "product_renditions"
+    PROFILE_PIC = "profile_pic"
+    KIND_CHOICES = (
+        (PRODUCT_RENDITIONS, "Product image renditions"),
+        (PROFILE_PIC, "Profile picture"),
+    )
+
+    PENDING = "P"
+    RUNNING = "R"
+    DONE = "D"
+    FAILED = "F"
+    STATUS_CHOICES = (
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    )
+
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    status = models.CharField(
+        max_length=1, choices=STATUS_CHOICES, default=PENDING, db_index=True
+    )
+    # Percentage of the work done by the current attempt
+    progress = models.PositiveSmallIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    available_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["kind", "object_id"])]
+
+    def __str__(self):
+        return (
+            f"{self.get_kind_display()} {self.object_id}: {self.get_status_display()}"
+        )
+
+
+class MediaBlob(models.Model):
+    """
+    A file of the content-addressed product image storage.
+
+    ``refcount`` is the number of product image fields pointing at the file;
+    the file is deleted when it drops to zero (see womanshop/blobs.py).
+    """
+
+    name = models.CharField(max_length=255, primary_key=True)
+    size = models.PositiveBigIntegerField(default=0)
+    refcount = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
+
+
+class Cart(models.Model):
+    """
+    Shopping cart and favorites of a user, or of an anonymous session.
+
+    An anonymous session only stores the cart ID; the cart is handed over to
+    the user on login (see womanshop/carts.py), or deleted by
+    ``manage.py clear_carts`` once its session has expired.
+    """
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Last change of an anonymous cart; expired ones are deleted by clear_carts
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"Cart {self.pk} of {self.user or 'an anonymous session'}"
+
+
+class CartLine(models.Model):
+    """
+    Quantity of a product variant in a cart.
+    """
+
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name="lines")
+    product_variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["cart", "product_variant"], name="unique_cart_variant"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.product_variant_id} x {self.quantity} in cart {self.cart_id}"
+
+
+class Favorite(models.Model):
+    """
+    Product marked as a favorite, kept in the cart of its user or session.
+    """
+
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name="favorites")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["cart", "product"], name="unique_cart_favorite"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} in cart {self.cart_id}"
@@ -0,0 +1,109 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is an opaque token holding the sort value and the ID of the last
+product of the previous page. The next page starts right after that pair, so
+deep pages cost the same as the first one and no COUNT query is needed.
+"""
+
+import base64
+import binascii
+import json
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token cannot be decoded."""
+
+
+def encode_cursor(value, pk):
+    """
+    Encode the sort value and ID of the last row into a cursor token.
+
+    Args:
+        value: The sort value of the last row.
+        pk (int): The ID of the last row.
+
+    Returns:
+        str: The URL-safe cursor token.
+    """
+    raw = json.dumps([str(value), pk], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Decode a cursor token.
+
+    Args:
+        token (str): The cursor token from the query string.
+
+    Returns:
+        tuple: The sort value (as a string) and the ID, or None for an empty token.
+
+    Raises:
+        InvalidCursor: If the token is malformed.
+    """
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        value, pk = json.loads(raw.decode("utf-8"))
+        return str(value), int(pk)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as error:
+        raise InvalidCursor(token) from error
+
+
+def keyset_paginate(queryset, sort_field, sort_direction, cursor, per_page):
+    """
+    Return the page of a queryset that follows the given cursor.
+
+    The queryset is ordered by (sort_field, pk) so the order is total.
+
+    Args:
+        queryset (QuerySet): The filtered queryset.
+        sort_field (str): The model field to sort by, or "pk".
+        sort_direction (str): "asc" or "desc".
+        cursor (str): The cursor token of the previous page, empty for the first page.
+        per_page (int): The number of rows per page.
+
+    Returns:
+        tuple: The list of rows and the cursor of the next page (None on the last page).
+
+    Raises:
+        InvalidCursor: If the cursor is malformed or its sort value does not
+        fit the sort field.
+    """
+    position = decode_cursor(cursor)
+    descending = sort_direction == "desc"
+    if position is not None:
+        value, pk = position
+        if sort_field != "pk":
+            # A tampered value must not reach the database as is
+            field = queryset.model._meta.get_field(sort_field)
+            try:
+                value = field.to_python(value)
+            except ValidationError as error:
+                raise InvalidCursor(cursor) from error
+            if isinstance(value, Decimal) and not value.is_finite():
+                raise InvalidCursor(cursor)
+        lookup = "lt" if descending else "gt"
+        after = Q(**{f"{sort_field}__{lookup}": value}) | Q(
+            **{sort_field: value, f"pk__{lookup}": pk}
+        )
+        if sort_field == "pk":
+            after = Q(**{f"pk__{lookup}": pk})
+        queryset = queryset.filter(after)
+    prefix = "-" if descending else ""
+    ordering = [f"{prefix}{sort_field}", f"{prefix}pk"]
+    if sort_field == "pk":
+        ordering = [f"{prefix}pk"]
+    rows = list(queryset.order_by(*ordering)[: per_page + 1])
+    if len(rows) <= per_page:
+        return rows, None
+    rows = rows[:per_page]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, sort_field), last.pk)
@@ -0,0 +1,258 @@
+"""
+Precomputed "you may also like" lists of the products.
+
+Every product gets the ``RECOMMENDATIONS_LIMIT`` best related products,
+scored from:
+
+* the same category and the same brand,
+* price proximity, 1 for the same price down to 0 for a price twice as high,
+* co-purchases, the number of paid orders containing both products.
+
+Candidates are the products closest in price within the same category and
+brand, the same category and the same brand, plus the most co-purchased
+ones, so a product is scored against a few dozen others, never a whole
+category. The lists are stored in ProductRecommendation, rebuilt with
+``manage.py rebuild_recommendations`` and computed for new products by the
+womanshop signals, which only load the candidates of the new product and
+the orders containing it.
+"""
+
+import heapq
+import math
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import OrderItem, ProductCatalogEntry, ProductRecommendation
+
+# Statuses of the orders that were paid (see Order.STATUS_CHOICES)
+PAID_STATUSES = ("O", "C", "S", "D")
+
+# Score of the shared attributes
+CATEGORY_WEIGHT = 3.0
+BRAND_WEIGHT = 2.0
+PRICE_WEIGHT = 1.0
+# Score of the co-purchases, multiplied by log(1 + number of shared orders)
+CO_PURCHASE_WEIGHT = 1.5
+# Most co-purchased products scored per product
+CO_PURCHASE_CANDIDATES = 50
+
+
+def get_limit():
+    return getattr(settings, "RECOMMENDATIONS_LIMIT", 12)
+
+
+def price_proximity(price, other_price):
+    """
+    Return how close two prices are.
+
+    Args:
+        price (Decimal): The first price.
+        other_price (Decimal): The second price.
+
+    Returns:
+        float: 1.0 for equal prices down to 0.0 when one price is twice the
+        other or more.
+    """
+    highest = max(price, other_price)
+    if not highest:
+        return 1.0
+    return max(0.0, 1.0 - float(abs(price - other_price) / highest) * 2)
+
+
+class _Catalog:
+    """
+    Product attributes, price ordered groups and co-purchase counts.
+
+    The whole catalog is read with one query and its co-purchases are
+    counted by the streamed sparse co-occurrence of womanshop/co_purchases.py.
+    With a product ID only the orders containing the product and its
+    candidates are loaded.
+    """
+
+    def __init__(self, product_id=None):
+        self.entries = {}
+        # (price, product ID) pairs, ascending, per category, brand and both
+        self.by_category = defaultdict(list)
+        self.by_brand = defaultdict(list)
+        self.by_category_brand = defaultdict(list)
+        entries = ProductCatalogEntry.objects.all()
+        if product_id is None:
+            # co_purchases imports this module
+            from .co_purchases import count_co_purchases
+
+            self.co_purchases = {
+                other_id: dict(pairs)
+                for other_id, pairs in count_co_purchases(
+                    CO_PURCHASE_CANDIDATES
+                ).items()
+            }
+        else:
+            self.co_purchases = {}
+            entry = entries.filter(product_id=product_id)
+            entry = entry.values_list("category_name", "brand_name").first()
+            if entry is None:
+                return
+            self.co_purchases[product_id] = self._product_co_purchases(product_id)
+            category, brand = entry
+            entries = entries.filter(
+                Q(category_name=category)
+                | Q(brand_name=brand)
+                | Q(product_id__in=[product_id, *self.co_purchases[product_id]])
+            )
+        rows = entries.values_list("product_id", "category_name", "brand_name", "price")
+        for other_id, category, brand, price in rows:
+            self.entries[other_id] = (category, brand, price)
+            self.by_category[category].append((price, other_id))
+            self.by_brand[brand].append((price, other_id))
+            self.by_category_brand[category, brand].append((price, other_id))
+        for groups in (self.by_category, self.by_brand, self.by_category_brand):
+            for group in groups.values():
+                group.sort()
+
+    @staticmethod
+    def _product_co_purchases(product_id):
+        """Count the paid orders shared by a product with each other product."""
+        order_ids = OrderItem.objects.filter(
+            order__status__in=PAID_STATUSES, product_variant__product_id=product_id
+        ).values("order_id")
+        lines = (
+            OrderItem.objects.filter(order__in=order_ids)
+            .values_list("order_id", "product_variant__product_id")
+            .distinct()
+        )
+        counts = Counter(other_id for _, other_id in lines if other_id != product_id)
+        return dict(counts.most_common(CO_PURCHASE_CANDIDATES))
+
+    @staticmethod
+    def _nearest(group, price, count):
+        """Return the IDs of the products of a group closest in price."""
+        high = bisect_left(group, (price,))
+        low = high - 1
+        found = []
+        while len(found) < count and (low >= 0 or high < len(group)):
+            if high < len(group) and (
+                low < 0
+                or price_proximity(price, group[high][0])
+                >= price_proximity(price, group[low][0])
+            ):
+                found.append(group[high][1])
+                high += 1
+            else:
+                found.append(group[low][1])
+                low -= 1
+        return found
+
+    def score(self, product_id, other_id):
+        category, brand, price = self.entries[product_id]
+        other_category, other_brand, other_price = self.entries[other_id]
+        score = PRICE_WEIGHT * price_proximity(price, other_price)
+        if category == other_category:
+            score += CATEGORY_WEIGHT
+        if brand == other_brand:
+            score += BRAND_WEIGHT
+        shared_orders = self.co_purchases.get(product_id, {}).get(other_id)
+        if shared_orders:
+            score += CO_PURCHASE_WEIGHT * math.log1p(shared_orders)
+        return score
+
+    def recommend(self, product_id, limit):
+        """
+        Return the IDs of the best related products, best first.
+
+        Only the products closest in price within the same category and
+        brand, the same category and the same brand, plus the most
+        co-purchased ones, are scored: any other product of these groups
+        scores lower than ``limit`` of them.
+        """
+        if product_id not in self.entries:
+            return []
+        category, brand, price = self.entries[product_id]
+        candidates = set(self.co_purchases.get(product_id, ()))
+        for group in (
+            self.by_category_brand[category, brand],
+            self.by_category[category],
+            self.by_brand[brand],
+        ):
+            # One more, as the product itself is in its groups
+            candidates.update(self._nearest(group, price, limit + 1))
+        candidates &= self.entries.keys()
+        candidates.discard(product_id)
+        best = heapq.nlargest(
+            limit,
+            ((self.score(product_id, other_id), -other_id) for other_id in candidates),
+        )
+        return [-other_id for _, other_id in best]
+
+
+def serialize_ids(product_ids):
+    return ",".join(map(str, product_ids))
+
+
+def store_lists(field, lists, batch_size=1000):
+    """
+    Replace one list field of all ProductRecommendation rows.
+
+    Rows are inserted or updated in place, so the other list of a product
+    is kept. Products missing from ``lists`` get an empty list.
+
+    Args:
+        field (str): "product_ids" or "bought_together_ids".
+        lists (dict): Product ID -> related product IDs, best first.
+        batch_size (int): Number of rows written per query.
+    """
+    rows = [
+        ProductRecommendation(product_id=product_id, **{field: serialize_ids(ids)})
+        for product_id, ids in lists.items()
+    ]
+    with transaction.atomic():
+        ProductRecommendation.objects.update(**{field: ""})
+        ProductRecommendation.objects.bulk_create(
+            rows,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["product"],
+            update_fields=[field, "computed_at"],
+        )
+
+
+def rebuild_recommendations(limit=None, batch_size=1000):
+    """
+    Recompute the recommendations of all products.
+
+    Args:
+        limit (int): Products per list, RECOMMENDATIONS_LIMIT by default.
+        batch_size (int): Number of lists written per query.
+
+    Returns:
+        int: The number of lists written.
+    """
+    limit = limit or get_limit()
+    catalog = _Catalog()
+    lists = {
+        product_id: catalog.recommend(product_id, limit)
+        for product_id in catalog.entries
+    }
+    store_lists("product_ids", lists, batch_size=batch_size)
+    return len(lists)
+
+
+def refresh_recommendations(product_id, limit=None):
+    """
+    Recompute the recommendations of one product.
+
+    Args:
+        product_id (int): The ID of the product.
+        limit (int): Products per list, RECOMMENDATIONS_LIMIT by default.
+
+    Returns:
+        list: The recommended product IDs, best first.
+    """
+    product_ids = _Catalog(product_id).recommend(product_id, limit or get_limit())
+    ProductRecommendation.objects.update_or_create(
+        product_id=product_id, defaults={"product_ids": serialize_ids(product_ids)}
+    )
+    return product_ids
@@ -0,0 +1,301 @@
+"""
+Fixed-width renditions of the product images.
+
+Every product image is resized to the ``IMAGE_RENDITION_WIDTHS`` that are
+not wider than the original and saved in each of FORMATS under
+``renditions/`` with a name derived from the SHA-256 of the original file.
+Identical uploads thus share their renditions, and a rendition that is
+already on disk is never rebuilt. The renditions of a content-addressed
+original are deleted with it (see womanshop/blobs.py).
+
+What was generated for an image is kept in ``Product.renditions``, keyed by
+field name, so the pages build ``srcset`` attributes without touching the
+storage. The manifest also holds the intrinsic size of the original and a
+tiny blurred preview as a data URI, so the pages reserve the image box and
+paint the preview before the image arrives. The catalog entry copies the
+manifest of ``image1`` for the cards. A missing or broken file gets a
+manifest holding only its name, so it is not read again until replaced.
+"""
+
+import base64
+import hashlib
+import io
+import logging
+import re
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Product image fields with renditions
+IMAGE_FIELDS = ("image1", "image2", "image3", "image4")
+# Rendition formats: file extension, Pillow format and save options
+FORMATS = {
+    "webp": ("webp", "WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("jpg", "JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+RENDITIONS_DIR = "renditions"
+RENDITION_NAME_RE = re.compile(
+    rf"^{RENDITIONS_DIR}/([0-9a-f]{{2}})/\1[0-9a-f]{{30}}_\d+\.(?:webp|jpg)$"
+)
+# Keys of a complete manifest; older manifests are regenerated
+MANIFEST_KEYS = {"name", "digest", "widths", "width", "height", "placeholder"}
+
+
+def get_widths():
+    return tuple(getattr(settings, "IMAGE_RENDITION_WIDTHS", (68, 180, 360, 800)))
+
+
+def rendition_name(digest, width, fmt):
+    """
+    Return the storage name of a rendition.
+
+    Args:
+        digest (str): The content hash of the original image.
+        width (int): The rendition width in pixels.
+        fmt (str): One of FORMATS.
+
+    Returns:
+        str: The name relative to MEDIA_ROOT.
+    """
+    extension = FORMATS[fmt][0]
+    return f"{RENDITIONS_DIR}/{digest[:2]}/{digest}_{width}.{extension}"
+
+
+def delete_renditions(digest):
+    """
+    Delete every rendition of an original image.
+
+    Args:
+        digest (str): The hex SHA-256 of the original image.
+    """
+    directory = f"{RENDITIONS_DIR}/{digest[:2]}"
+    prefix = f"{digest[:32]}_"
+    try:
+        _, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for filename in files:
+        if filename.startswith(prefix):
+            default_storage.delete(f"{directory}/{filename}")
+
+
+def placeholder(image):
+    """
+    Return a tiny JPEG preview of an image as a data URI.
+
+    Args:
+        image (Image): The original image.
+
+    Returns:
+        str: The ``data:image/jpeg;base64,...`` URI of an image
+        ``IMAGE_PLACEHOLDER_WIDTH`` pixels wide, under a kilobyte long.
+    """
+    width = getattr(settings, "IMAGE_PLACEHOLDER_WIDTH", 16)
+    preview = image.copy()
+    preview.thumbnail((width, width * 4), Image.BILINEAR)
+    if preview.mode != "RGB":
+        rgba = preview.convert("RGBA")
+        preview = Image.new("RGB", rgba.size, "white")
+        preview.paste(rgba, mask=rgba.getchannel("A"))
+    output = io.BytesIO()
+    preview.save(output, "JPEG", quality=40)
+    return "data:image/jpeg;base64," + base64.b64encode(output.getvalue()).decode()
+
+
+def is_rendition_name(name):
+    """
+    Tell whether a storage name is the name of a rendition.
+
+    Args:
+        name (str): The storage name.
+
+    Returns:
+        bool: True if the name was produced by rendition_name.
+    """
+    return RENDITION_NAME_RE.match(name) is not None
+
+
+def _resize(image, width, fmt):
+    height = max(1, round(image.height * width / image.width))
+    resized = image.resize((width, height), Image.LANCZOS)
+    if fmt == "jpeg" and resized.mode != "RGB":
+        # JPEG has no alpha channel: flatten transparent images onto white
+        rgba = resized.convert("RGBA")
+        resized = Image.new("RGB", rgba.size, "white")
+        resized.paste(rgba, mask=rgba.getchannel("A"))
+    elif resized.mode not in ("RGB", "RGBA"):
+        resized = resized.convert("RGBA")
+    _, pillow_format, options = FORMATS[fmt]
+    output = io.BytesIO()
+    resized.save(output, pillow_format, **options)
+    return output.getvalue()
+
+
+def generate_renditions(field_file):
+    """
+    Write the missing renditions of an image.
+
+    Args:
+        field_file (ImageFieldFile): The original image.
+
+    Returns:
+        dict: The manifest of the image (its name, content hash, rendition
+        widths, intrinsic width and height and placeholder), or None if the
+        file is missing or not an image.
+    """
+    try:
+        with field_file.open("rb") as file:
+            data = file.read()
+        image = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+    except (OSError, ValueError, Image.DecompressionBombError) as error:
+        logger.warning("No renditions for %s: %s", field_file.name, error)
+        return None
+    digest = hashlib.sha256(data).hexdigest()[:32]
+    widths = [width for width in get_widths() if width <= image.width]
+    if not widths:
+        widths = [image.width]
+    for width in widths:
+        for fmt in FORMATS:
+            name = rendition_name(digest, width, fmt)
+            if not default_storage.exists(name):
+                default_storage.save(name, ContentFile(_resize(image, width, fmt)))
+    return {
+        "name": field_file.name,
+        "digest": digest,
+        "widths": widths,
+        "width": image.width,
+        "height": image.height,
+        "placeholder": placeholder(image),
+    }
+
+
+def has_renditions(manifest):
+    """
+    Tell whether a manifest describes generated renditions.
+
+    Args:
+        manifest (dict): The stored manifest, may be None or empty.
+
+    Returns:
+        bool: False for no manifest and for the name-only manifest of an
+        unreadable file.
+    """
+    return bool(manifest) and "digest" in manifest
+
+
+def manifest_outdated(manifest, name):
+    """
+    Tell whether a manifest must be regenerated for the file ``name``.
+
+    Args:
+        manifest (dict): The stored manifest, may be None.
+        name (str): The current file name of the image.
+
+    Returns:
+        bool: True if the manifest is missing, incomplete or for another
+        file. The name-only manifest of an unreadable file is up to date.
+    """
+    if manifest is None or manifest["name"] != name:
+        return True
+    return manifest.keys() != {"name"} and not MANIFEST_KEYS <= manifest.keys()
+
+
+def renditions_outdated(product):
+    """
+    Tell whether an image of the product has no manifest for its current file.
+
+    Args:
+        product (Product): The product.
+
+    Returns:
+        bool: True if refresh_product_renditions has work to do.
+    """
+    names = {
+        field: getattr(product, field).name
+        for field in IMAGE_FIELDS
+        if getattr(product, field)
+    }
+    if names.keys() != product.renditions.keys():
+        return True
+    return any(
+        manifest_outdated(product.renditions[field], name)
+        for field, name in names.items()
+    )
+
+
+def refresh_product_renditions(product, progress=None):
+    """
+    Generate the renditions of the product images that changed.
+
+    Images whose manifest is complete and still names the current file are
+    skipped. The new
+    manifests are saved with a queryset update, so no save signal is sent.
+
+    Args:
+        product (Product): The product.
+        progress (callable): Called with the percentage of images done.
+
+    Returns:
+        bool: True if ``product.renditions`` changed.
+    """
+    renditions = {}
+    for done, field in enumerate(IMAGE_FIELDS):
+        if progress is not None:
+            progress(100 * done // len(IMAGE_FIELDS))
+        field_file = getattr(product, field)
+        if not field_file:
+            continue
+        manifest = product.renditions.get(field)
+        if manifest_outdated(manifest, field_file.name):
+            # A missing or broken file is not read again until replaced
+            manifest = generate_renditions(field_file) or {"name": field_file.name}
+        renditions[field] = manifest
+    if renditions == product.renditions:
+        return False
+    product.renditions = renditions
+    type(product).objects.filter(pk=product.pk).update(renditions=renditions)
+    return True
+
+
+def rendition_url(manifest, width, fmt="jpeg"):
+    """
+    Return the URL of the narrowest rendition at least ``width`` pixels wide.
+
+    Args:
+        manifest (dict): The manifest of the image, may be empty.
+        width (int): The displayed width in pixels.
+        fmt (str): One of FORMATS.
+
+    Returns:
+        str: The URL, the widest rendition if none is wide enough, or an
+        empty string if the image has no renditions.
+    """
+    if not has_renditions(manifest):
+        return ""
+    widths = manifest["widths"]
+    chosen = next((w for w in widths if w >= width), widths[-1])
+    return default_storage.url(rendition_name(manifest["digest"], chosen, fmt))
+
+
+def srcset(manifest, fmt="jpeg"):
+    """
+    Return the ``srcset`` attribute value of an image.
+
+    Args:
+        manifest (dict): The manifest of the image, may be empty.
+        fmt (str): One of FORMATS.
+
+    Returns:
+        str: The comma-separated "URL width" candidates, or an empty string.
+    """
+    if not has_renditions(manifest):
+        return ""
+    digest = manifest["digest"]
+    return ", ".join(
+        f"{default_storage.url(rendition_name(digest, width, fmt))} {width}w"
+        for width in manifest["widths"]
+    )
@@ -0,0 +1,160 @@
+"""
+Database search backends for products.
+
+``PostgresSearchBackend`` matches a stored, weighted ``tsvector`` column
+(``womanshop_product.search_vector``, GIN indexed, see migration 0025) with
+``websearch_to_tsquery`` and orders by ``ts_rank``. The column only exists on
+PostgreSQL and is kept up to date from the Product and Brand signals.
+
+``PortableSearchBackend`` is the fallback for other databases (SQLite in the
+test runs): every term has to be contained in one of the search fields.
+
+``get_search_backend`` picks the backend for the default database; the
+SEARCH_BACKEND setting can name another backend class by dotted path.
+
+The text search configuration comes from ``get_search_config`` for both the
+stored vectors (migration 0025 and ``update_products``) and the queries.
+After changing SEARCH_CONFIG run ``manage.py rebuild_catalog`` so the stored
+vectors are rebuilt with it.
+"""
+
+from functools import reduce
+from operator import and_, or_
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Brand, Product
+
+# Product fields searched by the portable backend
+SEARCH_FIELDS = ("name", "vendor_code", "brand__name", "collection", "description")
+
+
+def get_search_config():
+    """
+    Return the PostgreSQL text search configuration of the product search.
+
+    Returns:
+        str: The SEARCH_CONFIG setting, "russian" by default.
+    """
+    return getattr(settings, "SEARCH_CONFIG", "russian")
+
+
+class BaseSearchBackend:
+    """
+    Interface of the product search backends.
+    """
+
+    def search(self, queryset, query, fields=SEARCH_FIELDS):
+        """
+        Filter a Product queryset by a search query, best matches first.
+
+        Args:
+            queryset (QuerySet): The products to search.
+            query (str): The search query.
+            fields (tuple): Fields searched by backends without an index.
+
+        Returns:
+            QuerySet: The matching products.
+        """
+        raise NotImplementedError
+
+    def update_products(self, product_ids=None, brand_id=None):
+        """
+        Refresh the search data of products after they changed.
+
+        Args:
+            product_ids (list): IDs of the changed products.
+            brand_id (int): ID of a renamed brand whose products changed.
+        """
+
+
+class PortableSearchBackend(BaseSearchBackend):
+    """
+    Case-insensitive containment search that works on every database.
+    """
+
+    def search(self, queryset, query, fields=SEARCH_FIELDS):
+        terms = query.split()
+        if not terms:
+            return queryset.none()
+        conditions = [
+            reduce(or_, (Q(**{f"{field}__icontains": term}) for field in fields))
+            for term in terms
+        ]
+        return queryset.filter(reduce(and_, conditions)).order_by("id")
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    PostgreSQL full-text search over the stored search_vector column.
+    """
+
+    @property
+    def config(self):
+        return get_search_config()
+
+    def search(self, queryset, query, fields=SEARCH_FIELDS):
+        table = Product._meta.db_table
+        tsquery = "websearch_to_tsquery(%s::regconfig, %s)"
+        return (
+            queryset.alias(
+                search_match=RawSQL(
+                    f"{table}.search_vector @@ {tsquery}",
+                    (self.config, query),
+                    output_field=BooleanField(),
+                )
+            )
+            .annotate(
+                search_rank=RawSQL(
+                    f"ts_rank({table}.search_vector, {tsquery})",
+                    (self.config, query),
+                    output_field=FloatField(),
+                )
+            )
+            .filter(search_match=True)
+            .order_by("-search_rank", "id")
+        )
+
+    def update_products(self, product_ids=None, brand_id=None):
+        condition = "TRUE"
+        params = [self.config] * 5
+        if product_ids is not None:
+            condition = "p.id = ANY(%s)"
+            params.append(list(product_ids))
+        elif brand_id is not None:
+            condition = "p.brand_id = %s"
+            params.append(brand_id)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {Product._meta.db_table} AS p SET search_vector =
+                    setweight(to_tsvector(%s::regconfig, p.name), 'A') ||
+                    setweight(to_tsvector(%s::regconfig, p.vendor_code), 'A') ||
+                    setweight(to_tsvector(%s::regconfig, b.name), 'B') ||
+                    setweight(to_tsvector(%s::regconfig, p.collection), 'B') ||
+                    setweight(to_tsvector(%s::regconfig, p.description), 'C')
+                FROM {Brand._meta.db_table} AS b
+                WHERE b.id = p.brand_id AND {condition}
+                """,
+                params,
+            )
+
+
+def get_search_backend():
+    """
+    Return the search backend for the default database.
+
+    Returns:
+        BaseSearchBackend: The SEARCH_BACKEND class if set, otherwise the
+        PostgreSQL backend on PostgreSQL and the portable backend elsewhere.
+    """
+    backend = getattr(settings, "SEARCH_BACKEND", None)
+    if backend:
+        return import_string(backend)()
+    if connection.vendor == "postgresql":
+        return PostgresSearchBackend()
+    return PortableSearchBackend()
@@ -0,0 +1,271 @@
+"""
+In-memory full-text index for the product search.
+
+The index maps every token of the product name, brand, collection, vendor
+code and description to the products containing it, weighted by field, and
+every token trigram to the tokens containing it. A query is answered with
+exact, prefix and trigram (typo tolerant) token matches and returns the
+top ranked products, without touching the database.
+
+Text is case folded and "ё" is folded to "е", so Cyrillic and Latin names
+are matched alike.
+
+The index is per process. It is built lazily and kept up to date from the
+model signals of this process, which also hand it the catalog version they
+bump. It is rebuilt when the shared catalog version changes otherwise (a
+change made by another process) and after ``SEARCH_INDEX_TTL`` seconds.
+"""
+
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from .catalog_cache import get_catalog_version
+from .models import Product
+
+# Weight of a token per product field
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "vendor_code": 3.0,
+    "brand__name": 2.0,
+    "collection": 1.0,
+    "description": 0.5,
+}
+# Score factors of the match kinds
+PREFIX_FACTOR = 0.8
+FUZZY_FACTOR = 0.6
+# Minimum trigram similarity of a fuzzy match
+FUZZY_THRESHOLD = 0.3
+# Maximum number of index tokens a prefix or fuzzy term expands to
+MAX_EXPANSIONS = 50
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """
+    Split text into normalized tokens.
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        list: The case folded tokens.
+    """
+    return TOKEN_RE.findall((text or "").casefold().replace("ё", "е"))
+
+
+def trigrams(token):
+    """
+    Return the trigrams of a token padded with spaces, as in pg_trgm.
+
+    Args:
+        token (str): A normalized token.
+
+    Returns:
+        set: The trigrams.
+    """
+    padded = f"  {token} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """
+    Inverted token index and trigram index of the products.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built_at = None
+        # Catalog version the index was built from
+        self._version = None
+
+    @property
+    def ttl(self):
+        return getattr(settings, "SEARCH_INDEX_TTL", 300)
+
+    def invalidate(self):
+        """Drop the index; it will be rebuilt on the next query."""
+        with self._lock:
+            self._built_at = None
+
+    def _reset(self):
+        self._names = {}
+        self._product_tokens = {}
+        self._postings = {}
+        self._trigrams = {}
+        self._sorted_tokens = []
+
+    def _ensure_built(self):
+        version = get_catalog_version()
+        if (
+            self._built_at is None
+            or self._version != version
+            or time.monotonic() - self._built_at > self.ttl
+        ):
+            self.build(version)
+
+    def build(self, version=None):
+        """
+        Rebuild the whole index with one query.
+
+        Args:
+            version (int): The catalog version read before the query.
+        """
+        with self._lock:
+            self._reset()
+            for row in Product.objects.values("id", *FIELD_WEIGHTS):
+                self._add(row, sort=False)
+            self._sorted_tokens = sorted(self._postings)
+            self._built_at = time.monotonic()
+            self._version = get_catalog_version() if version is None else version
+
+    def refresh_product(self, product_id):
+        """
+        Re-read one product and update its postings.
+
+        Does nothing while the index is not built.
+
+        Args:
+            product_id (int): The ID of the changed product.
+        """
+        with self._lock:
+            if self._built_at is None:
+                return
+            row = Product.objects.filter(id=product_id)
+            row = row.values("id", *FIELD_WEIGHTS).first()
+            self._remove(product_id)
+            if row is not None:
+                self._add(row)
+
+    def adopt_version(self, version):
+        """
+        Record the catalog version bumped for a change this process applied.
+
+        Args:
+            version (int): The new catalog version, or None.
+        """
+        with self._lock:
+            if version is not None and self._version == version - 1:
+                self._version = version
+
+    def remove_product(self, product_id):
+        """
+        Remove a deleted product from the index.
+
+        Args:
+            product_id (int): The ID of the deleted product.
+        """
+        with self._lock:
+            if self._built_at is not None:
+                self._remove(product_id)
+
+    def _add(self, row, sort=True):
+        product_id = row["id"]
+        weights = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(row[field]):
+                weights[token] = max(weights.get(token, 0), weight)
+        for token, weight in weights.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                for trigram in trigrams(token):
+                    self._trigrams.setdefault(trigram, set()).add(token)
+                if sort:
+                    insort(self._sorted_tokens, token)
+            postings[product_id] = weight
+        self._names[product_id] = row["name"]
+        self._product_tokens[product_id] = weights
+
+    def _remove(self, product_id):
+        weights = self._product_tokens.pop(product_id, None)
+        if weights is None:
+            return
+        del self._names[product_id]
+        for token in weights:
+            postings = self._postings[token]
+            del postings[product_id]
+            if not postings:
+                del self._postings[token]
+                del self._sorted_tokens[bisect_left(self._sorted_tokens, token)]
+                for trigram in trigrams(token):
+                    tokens = self._trigrams[trigram]
+                    tokens.discard(token)
+                    if not tokens:
+                        del self._trigrams[trigram]
+
+    def _expand(self, term):
+        """Return the index tokens matching a query term with their score factor."""
+        if term in self._postings:
+            matches = {term: 1.0}
+        else:
+            matches = {}
+        position = bisect_left(self._sorted_tokens, term)
+        for token in self._sorted_tokens[position : position + MAX_EXPANSIONS]:
+            if not token.startswith(term):
+                break
+            matches.setdefault(token, PREFIX_FACTOR)
+        if matches or len(term) < 3:
+            return matches
+        term_trigrams = trigrams(term)
+        shared = {}
+        for trigram in term_trigrams:
+            for token in self._trigrams.get(trigram, ()):
+                shared[token] = shared.get(token, 0) + 1
+        for token, count in heapq.nlargest(
+            MAX_EXPANSIONS, shared.items(), key=lambda item: item[1]
+        ):
+            similarity = count / (len(term_trigrams) + len(trigrams(token)) - count)
+            if similarity >= FUZZY_THRESHOLD:
+                matches[token] = FUZZY_FACTOR * similarity
+        return matches
+
+    def search(self, query, limit=10):
+        """
+        Return the best matching products for a query.
+
+        Every query term has to match a token of the product exactly, as a
+        prefix or, failing both, approximately by trigram similarity.
+
+        Args:
+            query (str): The search query.
+            limit (int): The maximum number of results.
+
+        Returns:
+            list: (product ID, name) pairs, best match first.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            self._ensure_built()
+            scores = None
+            for term in dict.fromkeys(terms):
+                term_scores = {}
+                for token, factor in self._expand(term).items():
+                    for product_id, weight in self._postings[token].items():
+                        score = weight * factor
+                        if score > term_scores.get(product_id, 0):
+                            term_scores[product_id] = score
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {
+                        product_id: score + term_scores[product_id]
+                        for product_id, score in scores.items()
+                        if product_id in term_scores
+                    }
+                if not scores:
+                    return []
+            best = heapq.nlargest(
+                limit, scores.items(), key=lambda item: (item[1], -item[0])
+            )
+            return [(product_id, self._names[product_id]) for product_id, _ in best]
+
+
+search_index = SearchIndex()
@@ -1,8 +1,36 @@
 from sys import argv
-from django.db.models.signals import post_save, post_delete
+from collections import Counter
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Order, OrderItem, ProductVariant
+from django.contrib.auth.signals import user_logged_in
+from .models import (
+    Order,
+    OrderItem,
+    Product,
+    ProductVariant,
+    Category,
+    Style,
+    Brand,
+    Size,
+    Color,
+    ProductCatalogEntry,
+    ImageJob,
+)
+from .catalog_entries import refresh_catalog_entry
+from .facets import facet_index
+from .search_index import search_index
+from .autocomplete import autocomplete
+from .search_backends import get_search_backend
+from .catalog_cache import bump_catalog_version, bump_stock_version
+from .dimensions import dimensions
+from .recommendations import refresh_recommendations
+from .renditions import renditions_outdated
+from .jobs import enqueue
+from .image_metadata import metadata_outdated, refresh_image_metadata
+from .carts import adopt_session_cart
+from .blobs import acquire, release, product_image_names, stored_image_names
 from users.models import UserProfile
 from paypal.standard.models import ST_PP_COMPLETED
 from paypal.standard.ipn.signals import valid_ipn_received
@@ -10,6 +38,7 @@ from django.conf import settings
 from django.shortcuts import get_object_or_404
 from decimal import Decimal
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 
 
 @receiver(post_save, sender=User)
@@ -28,6 +57,22 @@ def create_user_profile(sender, instance, **kwargs):
             UserProfile.objects.create(user=obj[0])
 
 
+@receiver(user_logged_in)
+def merge_session_cart(sender, request, user, **kwargs):
+    """
+    Signal user_logged_in that hands the cart and the favorites collected
+    before login over to the user.
+    Args:
+        sender: The class of the user.
+        request: The login request.
+        user: The user who logged in.
+    Returns:
+        None
+    """
+    if request is not None:
+        adopt_session_cart(request, user)
+
+
 @receiver(valid_ipn_received)
 def show_me_the_money(sender, **kwargs):
     """
@@ -73,3 +118,350 @@ def update_stock_on_order_delete(sender, instance, **kwargs):
         order = get_object_or_404(Order, id=instance.order_id)
         order.order_total -= instance.subtotal
         order.save()
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_images(sender, instance, **kwargs):
+    """
+    Signal pre_save that remembers the content-addressed images the product
+    pointed at before the save.
+    Args:
+        sender: The model class that initiated the signal.
+        instance: The model instance being saved.
+    Returns:
+        None
+    """
+    instance._stored_image_names = stored_image_names(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+def count_product_image_references(sender, instance, **kwargs):
+    """
+    Signal post_save that updates the reference counts of the images the
+    product started or stopped using.
+    Args:
+        sender: The model class that initiated the signal.
+        instance: The model instance that was saved.
+    Returns:
+        None
+    """
+    old = getattr(instance, "_stored_image_names", Counter())
+    new = product_image_names(instance)
+    acquire(new - old)
+    release(old - new)
+    instance._stored_image_names = new
+
+
+@receiver(post_save, sender=Product)
+def generate_product_renditions(sender, instance, **kwargs):
+    """
+    Signal post_save that queues the rendition job of new or replaced
+    product images. Connected before update_catalog_on_product_save, so with
+    IMAGE_JOBS_ASYNC off the catalog entry picks up the new manifests.
+    Args:
+        sender: The model class that initiated the signal.
+        instance: The model instance that was saved.
+    Returns:
+        None
+    """
+    if renditions_outdated(instance):
+        if enqueue(ImageJob.PRODUCT_RENDITIONS, instance.id) is None:
+            # The job ran inline on a fresh copy of the product
+            instance.renditions = (
+                sender.objects.filter(pk=instance.pk)
+                .values_list("renditions", flat=True)
+                .get()
+            )
+
+
+@receiver(pre_save, sender=UserProfile)
+def mark_profile_pic_upload(sender, instance, **kwargs):
+    """
+    Signal pre_save that remembers whether a new profile picture is being
+    uploaded; the file is only written by the save itself.
+    Args:
+        sender: The model class that initiated the signal.
+        instance: The model instance being saved.
+    Returns:
+        None
+    """
+    instance._profile_pic_uploaded = bool(
+        instance.profile_pic and not instance.profile_pic._committed
+    )
+
+
+@receiver(post_save, sender=UserProfile)
+def process_uploaded_profile_pic(sender, instance, **kwargs):
+    """
+    Signal post_save that queues the processing of an uploaded profile
+    picture.
+    Args:
+        sender: The model class that initiated the signal.
+        instance: The model instance that was saved.
+    Returns:
+        None
+    """
+    if getattr(instance, "_profile_pic_uploaded", False):
+        enqueue(ImageJob.PROFILE_PIC, instance.id)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=UserProfile)
+def store_image_metadata(sender, instance, **kwargs):
+    """
+    Signal post_save that stores the width, height, size and format of new
+    or replaced images, reading only their headers.
+    Args:
+        sender: The model class that initiated the signal.
+        instance: The model instance that was saved.
+    Returns:
+        None
+    """
+    if metadata_outdated(instance):
+        refresh_image_metadata(instance)
+
+
+@receiver(post_save, sender=Product)
+def update_catalog_on_product_save(sender, instance, **kwargs):
+    """
+    Signal post_save that refreshes the product catalog entry, the
+    product's bits in the catalog facet index and its search index postings.
+    Args:
+        sender: The model class that initiated the signal.
+        instance: The model instance that was saved.
+    Returns:
+        None
+    """
+    refresh_catalog_entry(instance.id)
+    facet_index.refresh_product(instance.id)
+    search_index.refresh_product(instance.id)
+
+
+@receiver(post_delete, sender=Product)
+def update_catalog_on_product_delete(sender, instance, **kwargs):
+    """
+    Signal post_delete that removes the product from the catalog facet index
+    and the search index. The catalog entry itself is deleted by the cascade.
+    Args:
+        sender: The model class that initiated the signal.
+        instance: The model instance that was deleted.
+    Returns:
+        None
+    """
+    facet_index.remove_product(instance.id)
+    search_index.remove_product(instance.id)
+
+
+@receiver(post_delete, sender=Product)
+def release_product_images(sender, instance, **kwargs):
+    """
+    Signal post_delete that drops the references of the product to its
+    images, deleting the files no other product uses.
+    Args:
+        sender: The model class that initiated the signal.
+        instance: The model instance that was deleted.
+    Returns:
+        None
+    """
+    release(product_image_names(instance))
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def update_catalog_on_variant_change(sender, instance, **kwargs):
+    """
+    Signal post_save/post_delete that refreshes the stock, sizes and large
+    size flag of the variant's product in the catalog entry and facet index.
+    Args:
+        sender: The model class that initiated the signal.
+        instance: The model instance that was saved or deleted.
+    Returns:
+        None
+    """
+    refresh_catalog_entry(instance.product_id)
+    facet_index.refresh_product(instance.product_id)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Style)
+@receiver(post_save, sender=Brand)
+def update_catalog_on_rename(sender, instance, created, **kwargs):
+    """
+    Signal post_save that copies a new category, style or brand name into the
+    catalog entries and drops the catalog facet index, since the names are
+    the facet keys. A brand rename also drops the search index.
+    Args:
+        sender: The model class that initiated the signal.
+        instance: The model instance that was saved.
+        created: Whether a new record was created.
+    Returns:
+        None
+    """
+    if created:
+        return
+    field = {Category: "category", Style: "style", Brand: "brand"}[sender]
+    ProductCatalogEntry.objects.filter(**{f"product__{field}": instance}).update(
+        **{f"{field}_name": instance.name}
+    )
+    facet_index.invalidate()
+    if sender is Brand:
+        search_index.invalidate()
+
+
+@receiver(post_save, sender=Size)
+def update_catalog_on_size_rename(sender, instance, created, **kwargs):
+    """
+    Signal post_save that refreshes the catalog entries of the products that
+    have a variant of a renamed size.
+    Args:
+        sender: The model class that initiated the signal.
+        instance: The model instance that was saved.
+        created: Whether a new record was created.
+    Returns:
+        None
+    """
+    if created:
+        return
+    product_ids = ProductVariant.objects.filter(size=instance).values_list(
+        "product_id", flat=True
+    )
+    for product_id in set(product_ids):
+        refresh_catalog_entry(product_id)
+    facet_index.invalidate()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Style)
+@receiver(post_delete, sender=Style)
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+def invalidate_catalog_cache(sender, instance, **kwargs):
+    """
+    Signal post_save/post_delete that bumps the catalog version once the
+    transaction commits, so cached catalog responses are never served after
+    a catalog change, nor rebuilt from uncommitted data under the new
+    version. The facet and search indexes, already updated by the signals
+    above, keep the new version.
+    Args:
+        sender: The model class that initiated the signal.
+        instance: The model instance that was saved or deleted.
+    Returns:
+        None
+    """
+
+    def bump():
+        version = bump_catalog_version()
+        facet_index.adopt_version(version)
+        search_index.adopt_version(version)
+
+    transaction.on_commit(bump)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Style)
+@receiver(post_delete, sender=Style)
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+@receiver(post_save, sender=Color)
+@receiver(post_delete, sender=Color)
+@receiver(post_save, sender=Size)
+@receiver(post_delete, sender=Size)
+def invalidate_dimensions(sender, instance, **kwargs):
+    """
+    Signal post_save/post_delete that drops the cached name/ID maps of a
+    dimension model, so the next lookup reloads them.
+    Args:
+        sender: The model class that initiated the signal.
+        instance: The model instance that was saved or deleted.
+    Returns:
+        None
+    """
+    dimensions.invalidate(sender)
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def touch_product_on_variant_change(sender, instance, **kwargs):
+    """
+    Signal post_save/post_delete that bumps the updated_at timestamp of the
+    variant's product, so incremental catalog exports pick up stock changes.
+    Args:
+        sender: The model class that initiated the signal.
+        instance: The model instance that was saved or deleted.
+    Returns:
+        None
+    """
+    Product.objects.filter(id=instance.product_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+def invalidate_autocomplete(sender, instance, **kwargs):
+    """
+    Signal post_save/post_delete that drops the autocomplete trie, so new,
+    renamed and deleted products and brands are picked up on the next query.
+    Args:
+        sender: The model class that initiated the signal.
+        instance: The model instance that was saved or deleted.
+    Returns:
+        None
+    """
+    autocomplete.invalidate()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Brand)
+def update_search_vector(sender, instance, created, **kwargs):
+    """
+    Signal post_save that refreshes the database full-text search data of a
+    saved product or of the products of a renamed brand.
+    Args:
+        sender: The model class that initiated the signal.
+        instance: The model instance that was saved.
+        created: Whether a new record was created.
+    Returns:
+        None
+    """
+    if sender is Product:
+        get_search_backend().update_products(product_ids=[instance.id])
+    elif not created:
+        get_search_backend().update_products(brand_id=instance.id)
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def invalidate_stock_version(sender, instance, **kwargs):
+    """
+    Signal post_save/post_delete that bumps the stock version of the
+    variant's product, so stock_api ETags change.
+    Args:
+        sender: The model class that initiated the signal.
+        instance: The model instance that was saved or deleted.
+    Returns:
+        None
+    """
+    bump_stock_version(instance.product_id)
+
+
+@receiver(post_save, sender=Product)
+def recommend_new_product(sender, instance, created, **kwargs):
+    """
+    Signal post_save that computes the recommendations of a new product.
+    Existing lists pick the product up on the next rebuild_recommendations.
+    Args:
+        sender: The model class that initiated the signal.
+        instance: The model instance that was saved.
+        created: Whether a new record was created.
+    Returns:
+        None
+    """
+    if created:
+        refresh_recommendations(instance.id)
@@ -0,0 +1,75 @@
+"""
+Single-flight execution of identical concurrent computations.
+
+When several threads of one process ask for the same key at the same time,
+only the first one runs the computation; the others wait for it and share
+its result (or its exception). A waiter gives up after
+``SINGLE_FLIGHT_TIMEOUT`` seconds and runs the computation itself, so one
+stuck computation cannot hang every request waiting for it.
+"""
+
+import threading
+
+from django.conf import settings
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one computation.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, timeout=None):
+        """
+        Run ``func`` unless a call with the same key is already in flight.
+
+        Args:
+            key (str): Identifies identical computations.
+            func (callable): The computation, called without arguments.
+            timeout (float): Seconds to wait for a call in flight before
+                running ``func`` directly; SINGLE_FLIGHT_TIMEOUT by default.
+
+        Returns:
+            The result of ``func``, computed by this or a concurrent caller.
+
+        Raises:
+            Exception: Whatever ``func`` raised in the leading call.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            if timeout is None:
+                timeout = getattr(settings, "SINGLE_FLIGHT_TIMEOUT", 10)
+            if not call.done.wait(timeout):
+                return func()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+single_flight = SingleFlight()
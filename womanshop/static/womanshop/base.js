@@ -56,12 +56,12 @@ document.addEventListener("DOMContentLoaded", () => {
             return;
         }
 
-        // Send an AJAX request to the server with the entered search term
-        fetch(`/search/?q=${encodeURIComponent(searchTerm)}`)
+        // Send an AJAX request to the server with the entered prefix
+        fetch(`/autocomplete/?q=${encodeURIComponent(searchTerm)}`)
             .then(response => response.json())
             .then(data => {
-                // Process the response data and display search results
-                const resultsHtml = data.map(item => `<li><a href="/product/${item.id}/">${item.name}</a></li>`).join('');
+                // Process the response data and display the product and brand completions
+                const resultsHtml = data.map(item => `<li class="search-${item.type}"><a href="${item.url}">${item.name}</a></li>`).join('');
                 searchResults.innerHTML = `<ul>${resultsHtml}</ul>`;
             })
             .catch(error => {
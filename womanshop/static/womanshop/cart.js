@@ -73,7 +73,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 cartTotal(itemsId);
 
                 let data = {
-                    index: element[0],
+                    line: element[0],
                     quantity: quantityInput.value
                 };
 
@@ -89,7 +89,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 cartTotal(itemsId);
 
                 let data = {
-                    index: element[0],
+                    line: element[0],
                     quantity: quantityInput.value
                 };
 
@@ -6,10 +6,10 @@ document.addEventListener("DOMContentLoaded", () => {
 
     // Function to fetch data from the API using parameters
 
-    async function getData(url, page, paginateBy, sortBy, sortDirection, bodysuit, bras, tights_and_socks, swimwear, men_underwear, panties, seamless_underwear, thermal_underwear, accessories, basic_underwear, new_style, сomfort_underwear, sexual, lacy, everyday, homewear, sleepwear, for_wedding, avelin, comazo, lauma, melado, milavitsa, serge, teatro, triumph, start, end, categors) {
+    async function getData(url, cursor, paginateBy, sortBy, sortDirection, bodysuit, bras, tights_and_socks, swimwear, men_underwear, panties, seamless_underwear, thermal_underwear, accessories, basic_underwear, new_style, сomfort_underwear, sexual, lacy, everyday, homewear, sleepwear, for_wedding, avelin, comazo, lauma, melado, milavitsa, serge, teatro, triumph, start, end, categors) {
         // Construct the URL with query parameters
         const urlWithParams = url + "?" + new URLSearchParams({
-            page: page,
+            cursor: cursor,
             per_page: paginateBy,
             sort_by: sortBy,
             sort_direction: sortDirection,
@@ -41,7 +41,8 @@ document.addEventListener("DOMContentLoaded", () => {
             triumph: triumph,
             start: start,
             end: end,
-            categors: categors
+            categors: categors,
+            facets: 1
         });
 
         // Fetch the data from the API
@@ -49,6 +50,26 @@ document.addEventListener("DOMContentLoaded", () => {
         return response.json();
     }
 
+    // Grey out the filters that would leave the catalog empty
+    function updateFacetCounts(facets) {
+        Object.values(facets).forEach((group) => {
+            Object.entries(group).forEach(([name, count]) => {
+                const checkbox = document.getElementById("sort_" + name);
+                if (checkbox) {
+                    checkbox.parentElement.style.opacity = count === 0 && !checkbox.checked ? "0.4" : "1";
+                    checkbox.title = count;
+                }
+            });
+        });
+    }
+
+    // Paint the placeholder of a card image until the image loads
+    function placeholderStyle(product) {
+        return product.image1_placeholder
+            ? `background: url(${product.image1_placeholder}) center / cover no-repeat`
+            : '';
+    }
+
     // Paginator class for handling pagination and filtering
     class LoadMorePaginator {
         constructor(perPage) {
@@ -56,7 +77,9 @@ document.addEventListener("DOMContentLoaded", () => {
             // Bind event listeners for various filter options
             // Load initial data by calling this.loadMore()
             this.perPage = perPage
-            this.pageIndex = 1
+            // Keyset pagination: an empty cursor requests the first page
+            this.cursor = ""
+            this.nextCursor = null
             this.container = document.querySelector("#a")
             this.next = document.querySelector("#next")
             this.sortBy = document.querySelector("#sort-by")
@@ -127,131 +150,131 @@ document.addEventListener("DOMContentLoaded", () => {
         // Event handler for the "Next" button click
         onNextClick(event) {
             event.preventDefault()
-            this.pageIndex++
+            this.cursor = this.nextCursor
             this.loadMore()
         }
 
         // Event handler for changing the "Sort By" option
         onSortByChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
 
         onSortDirectionChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onBodysuitChange(event) {
 
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onBrasChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onTights_and_socksChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onSwimwearChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onMen_underwearChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onPantiesChande(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onSeamless_underwearChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onThermal_underwearChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onAccessoriesChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onBasic_underwearChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onNew_style_Change(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onComfort_underwearChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onSexualChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onLacyChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onEverydayChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onHomewearChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onSleepwearChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onFor_weddingChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onAvelinChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onComazoChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onLaumaChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onMeladoChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onMilavitsaChande(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onSergeChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onTeatroChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onTriumphChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onStartChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
         onEndChange(event) {
-            this.pageIndex = 1
+            this.cursor = ""
             this.loadMore()
         }
 
@@ -266,7 +289,11 @@ document.addEventListener("DOMContentLoaded", () => {
             }
             div.innerHTML = `
             <div class="col">
-                <img src="${product.image1}" width="273px" height="364px" alt="Not photo">
+                <picture>
+                    <source type="image/webp" srcset="${product.image1_webp_srcset}" sizes="273px">
+                    <img src="${product.image1}" srcset="${product.image1_srcset}" sizes="273px"
+                        width="273px" height="364px" style="${placeholderStyle(product)}" alt="Not photo">
+                </picture>
                 <img src="${favoriteImageURL}" style="position: relative; top: -350px;
                 left: 235px" width="20px" height="18px" alt="Not photo">
                 <p id="name_product">${product.name}</p>
@@ -317,13 +344,15 @@ document.addEventListener("DOMContentLoaded", () => {
             const categors = this.categors
             console.log(this.categors)
 
-            getData(apiURL, this.pageIndex, this.perPage, sortBy, sortDirection, bodysuit, bras, tights_and_socks, swimwear, men_underwear, panties, seamless_underwear, thermal_underwear, accessories, basic_underwear, new_style, сomfort_underwear, sexual, lacy, everyday, homewear, sleepwear, for_wedding, avelin, comazo, lauma, melado, milavitsa, serge, teatro, triumph, start, end, categors)
+            getData(apiURL, this.cursor, this.perPage, sortBy, sortDirection, bodysuit, bras, tights_and_socks, swimwear, men_underwear, panties, seamless_underwear, thermal_underwear, accessories, basic_underwear, new_style, сomfort_underwear, sexual, lacy, everyday, homewear, sleepwear, for_wedding, avelin, comazo, lauma, melado, milavitsa, serge, teatro, triumph, start, end, categors)
                 .then(response => {
                     this.container.innerHTML = ""
                     response.data.forEach((el) => {
                         this.addElement(el)
                     });
-                    this.next.style.display = !response.has_next ? "none" : "block"
+                    this.nextCursor = response.next
+                    updateFacetCounts(response.facets)
+                    this.next.style.display = !response.next ? "none" : "block"
                 });
         }
     }
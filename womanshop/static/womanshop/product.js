@@ -6,11 +6,41 @@ document.addEventListener("DOMContentLoaded", () => {
     let image4 = document.getElementById('product_image4');
     // Save the original src attribute of image1
     let originalSrc = image1.src;
-    // Function to replace images when clicked
+    // Swap an attribute of two elements, including a missing one
+    function swapAttribute(first, second, name) {
+        let firstValue = first.getAttribute(name);
+        let secondValue = second.getAttribute(name);
+        for (const [element, value] of [[first, secondValue], [second, firstValue]]) {
+            if (value === null) {
+                element.removeAttribute(name);
+            } else {
+                element.setAttribute(name, value);
+            }
+        }
+    }
+    // The WebP <source> of an image rendered inside a <picture>, if any
+    function webpSource(image) {
+        return image.parentElement.tagName === 'PICTURE'
+            ? image.parentElement.querySelector('source')
+            : null;
+    }
+    // Paint the placeholder of a card image until the image loads
+    function placeholderStyle(product) {
+        return product.image1_placeholder
+            ? `background: url(${product.image1_placeholder}) center / cover no-repeat`
+            : '';
+    }
+    // Function to replace images when clicked; the srcset candidates and
+    // placeholders are swapped too, each slot keeps its own sizes
     function replaceImage(clickedImage) {
-        let clickedSrc = clickedImage.src;
-        clickedImage.src = image1.src;
-        image1.src = clickedSrc;
+        swapAttribute(clickedImage, image1, 'src');
+        swapAttribute(clickedImage, image1, 'srcset');
+        swapAttribute(clickedImage, image1, 'style');
+        let clickedSource = webpSource(clickedImage);
+        let mainSource = webpSource(image1);
+        if (clickedSource && mainSource) {
+            swapAttribute(clickedSource, mainSource, 'srcset');
+        }
     }
     // Event listeners for images 2, 3, and 4 to swap with image 1
 
@@ -43,6 +73,19 @@ document.addEventListener("DOMContentLoaded", () => {
     const favoriteList = JSON.parse(productScript.dataset.favoritelist);
     console.log(favoriteList);
     const apiURL = document.querySelector("script[src$='product.js']").getAttribute("data-api-url");
+    // Color -> size -> stock matrix rendered by ProductDetailView
+    let availability = JSON.parse(document.getElementById('product-availability').textContent);
+    const stockURL = productScript.dataset.stockUrl;
+    // Function to refresh the stock matrix; the browser revalidates with
+    // If-None-Match, so an unchanged stock costs a 304
+    async function refreshAvailability() {
+        const productId = productScript.dataset.productid;
+        const response = await fetch(`${stockURL}?product_id=${productId}`);
+        if (response.ok) {
+            const data = await response.json();
+            availability = data.products[productId];
+        }
+    }
     // Function to get the value of a cookie by name
     function getCookie(name) {
         let cookieValue = null;
@@ -137,33 +180,18 @@ document.addEventListener("DOMContentLoaded", () => {
             // Change the text color of the selected size box
             this.style.color = 'pink';
 
-            const productQuantityURL = document.querySelector("#productQuantityURL").value;
             let selectedColor = document.querySelector('.color_circle.selected');
             let selectedSize = document.querySelector('.size_square.selected');
             let color = selectedColor.getAttribute('data-color');
             let size = selectedSize.getAttribute('data-size');
-            let data = {
-                color: color,
-                size: size
-            };
-
-            // Creating and configuring the XMLHttpRequest object
-            let xhr = new XMLHttpRequest();
-            xhr.open('POST', productQuantityURL);
-            xhr.setRequestHeader('Content-Type', 'application/json');
-            xhr.setRequestHeader('X-CSRFToken', getCookie('csrftoken'));
-            // Sending data to the server
-            xhr.send(JSON.stringify(data));
-
-            // Server response handler
-            xhr.onload = function () {
-                if (xhr.status === 200) {
-                    // Update information about the quantity of goods in stock
-                    let response = JSON.parse(xhr.responseText);
-                    productStock.textContent = 'В наличии: ' + response.stock;
-                    stock = response.stock
-                }
-            }
+
+            // Update information about the quantity of goods in stock
+            stock = (availability[color] || {})[size] || 0;
+            productStock.textContent = 'В наличии: ' + stock;
+            refreshAvailability().then(() => {
+                stock = (availability[color] || {})[size] || 0;
+                productStock.textContent = 'В наличии: ' + stock;
+            });
         })
     });
 
@@ -230,8 +258,8 @@ document.addEventListener("DOMContentLoaded", () => {
                         // Update the number of items in the cart
                         let itemInCartElement = document.getElementById('item_in_cart');
                         if (itemInCartElement) {
-                            let currentItemCount = parseInt(itemInCartElement.textContent);
-                            itemInCartElement.textContent = currentItemCount + 1;
+                            // Adding a variant already in the cart adds no line
+                            itemInCartElement.textContent = response.item_in_cart;
                         }
 
 
@@ -252,9 +280,9 @@ document.addEventListener("DOMContentLoaded", () => {
     });
 
     // Function to fetch more product data (pagination)
-    async function getDataProductLove(url, page, paginateBy) {
+    async function getDataProductLove(url, cursor, paginateBy) {
         const urlWithParams = url + "?" + new URLSearchParams({
-            page: page,
+            cursor: cursor,
             per_page: paginateBy,
             category_by: productScript.dataset.categoryby,
             product_id: productScript.dataset.productid
@@ -267,7 +295,9 @@ document.addEventListener("DOMContentLoaded", () => {
     class LoadMorePaginatorLove {
         constructor(per_page) {
             this.per_page = per_page
-            this.pageIndex = 1
+            // Cursors of the pages visited so far; an empty cursor is the first page
+            this.cursors = [""]
+            this.nextCursor = null
             this.container = document.querySelector('#love')
             this.minusNext = document.querySelector('#minus_next')
             this.plusNext = document.querySelector('#plus_next')
@@ -277,14 +307,14 @@ document.addEventListener("DOMContentLoaded", () => {
         }
 
         onMinusClickNext(event) {
-            if (this.pageIndex > 1) {
-                this.pageIndex--;
+            if (this.cursors.length > 1) {
+                this.cursors.pop();
                 this.loadLoveMore();
             }
         }
 
         onPlusClickNext(event) {
-            this.pageIndex++;
+            this.cursors.push(this.nextCursor);
             this.loadLoveMore();
         }
 
@@ -296,7 +326,11 @@ document.addEventListener("DOMContentLoaded", () => {
             }
             div.innerHTML = `
           <div class="col">
-            <img src="${product.image1}"  width="273px" height="364px"  alt="Not photo">
+            <picture>
+              <source type="image/webp" srcset="${product.image1_webp_srcset}" sizes="273px">
+              <img src="${product.image1}" srcset="${product.image1_srcset}" sizes="273px"
+                width="273px" height="364px" style="${placeholderStyle(product)}" alt="Not photo">
+            </picture>
             <img src="${favoriteImageURL}" style="position: relative; top: -350px;
              left: 235px" width="20px" height="18px" alt="Not photo">
             <p>${product.name}</p>
@@ -312,14 +346,15 @@ document.addEventListener("DOMContentLoaded", () => {
         }
 
         loadLoveMore() {
-            getDataProductLove(apiURL, this.pageIndex, this.per_page)
+            getDataProductLove(apiURL, this.cursors[this.cursors.length - 1], this.per_page)
                 .then(response => {
                     this.container.innerHTML = '';
                     response.data.forEach((el) => {
                         this.addLoveElement(el)
                     });
-                    this.plusNext.style.display = !response.has_next ? "none" : "block";
-                    if (this.pageIndex === 1) {
+                    this.nextCursor = response.next;
+                    this.plusNext.style.display = !response.next ? "none" : "block";
+                    if (this.cursors.length === 1) {
                         this.minusNext.style.display = 'none';
                     }
                     else {
@@ -0,0 +1,188 @@
+"""
+Static files storage of ``collectstatic``.
+
+On top of ManifestStaticFilesStorage (content-hashed copies of every file,
+``url()`` references in the CSS rewritten, and ``{% static %}`` resolved
+through ``staticfiles.json``) it
+
+- re-encodes the PNGs losslessly with zlib's best compression before they
+  are hashed, keeping whichever of the two versions is smaller,
+- writes a lossless ``.webp`` sibling of each hashed PNG that it makes
+  smaller, for the front server to send to clients accepting WebP,
+- writes ``.gz`` and, when the ``brotli`` package is installed, ``.br``
+  siblings of the hashed text assets for the front server's
+  ``gzip_static``/``brotli_static``.
+
+Without a manifest, e.g. in the tests or before the first collectstatic,
+``{% static %}`` returns the plain names instead of failing.
+"""
+
+import gzip
+import io
+import logging
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from PIL import Image
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Extensions of the files precompressed with gzip and brotli
+COMPRESS_EXTENSIONS = (".css", ".js", ".svg", ".json", ".txt", ".map", ".ico")
+# Smaller files are not worth a second request path on the front server
+MIN_COMPRESS_SIZE = 256
+# PNG chunks carried over when re-encoding
+PNG_INFO_KEYS = ("transparency", "icc_profile", "dpi")
+
+
+def optimize_png(data):
+    """
+    Re-encode a PNG losslessly with the best zlib compression.
+
+    Args:
+        data (bytes): The PNG file.
+
+    Returns:
+        bytes: The smaller of the re-encoded and the original file.
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except (OSError, ValueError) as error:
+        logger.warning("Cannot optimize PNG: %s", error)
+        return data
+    options = {key: image.info[key] for key in PNG_INFO_KEYS if key in image.info}
+    output = io.BytesIO()
+    image.save(output, "PNG", optimize=True, **options)
+    optimized = output.getvalue()
+    return optimized if len(optimized) < len(data) else data
+
+
+def to_webp(data):
+    """
+    Convert a PNG to lossless WebP.
+
+    Args:
+        data (bytes): The PNG file.
+
+    Returns:
+        bytes: The WebP file, or None if it is not smaller.
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+        output = io.BytesIO()
+        image.save(output, "WEBP", lossless=True, method=4)
+    except (OSError, ValueError) as error:
+        logger.warning("Cannot convert PNG to WebP: %s", error)
+        return None
+    converted = output.getvalue()
+    return converted if len(converted) < len(data) else None
+
+
+def compress(data):
+    """
+    Compress a file for the front server.
+
+    Args:
+        data (bytes): The file content.
+
+    Returns:
+        dict: The compressed content by file suffix, only for the encodings
+        that make the file smaller.
+    """
+    encoded = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoded[".br"] = brotli.compress(data, quality=11)
+    return {
+        suffix: content
+        for suffix, content in encoded.items()
+        if len(content) < len(data) * 0.95
+    }
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage with optimized PNGs and precompressed text assets.
+    """
+
+    # A missing file leaves its reference as it is instead of failing
+    manifest_strict = False
+
+    def stored_name(self, name):
+        # The templates write {% static '/img/...' %}
+        name = name.lstrip("/")
+        if not self.hashed_files:
+            return name
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            logger.warning("Static file %s is missing", name)
+            return name
+
+    def url_converter(self, name, hashed_files, template=None):
+        converter = super().url_converter(name, hashed_files, template)
+
+        def convert(matchobj):
+            try:
+                return converter(matchobj)
+            except ValueError:
+                # e.g. url(image.png) in styles.css, which does not exist
+                return matchobj.groupdict()["matched"]
+
+        return convert
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            return
+        for name in list(paths):
+            if name.lower().endswith(".png"):
+                self._optimize(paths, name)
+        # The CSS is processed in several passes, the last name is final
+        hashed_names = {}
+        for original, hashed, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            if hashed:
+                hashed_names[original] = hashed
+            yield original, hashed, processed
+        for name in hashed_names.values():
+            if name.lower().endswith(COMPRESS_EXTENSIONS):
+                self._compress(name)
+            elif name.lower().endswith(".png"):
+                self._convert_to_webp(name)
+
+    def _optimize(self, paths, name):
+        storage, path = paths[name]
+        with storage.open(path) as file:
+            data = file.read()
+        optimized = optimize_png(data)
+        if optimized is data:
+            return
+        self.delete(name)
+        self._save(name, ContentFile(optimized))
+        # Hash and copy the optimized file instead of the source
+        paths[name] = (self, name)
+
+    def _compress(self, name):
+        with self.open(name) as file:
+            data = file.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        for suffix, content in compress(data).items():
+            self._save_sibling(name + suffix, content)
+
+    def _convert_to_webp(self, name):
+        with self.open(name) as file:
+            converted = to_webp(file.read())
+        if converted is not None:
+            self._save_sibling(name + ".webp", converted)
+
+    def _save_sibling(self, name, content):
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(content))
@@ -0,0 +1,124 @@
+"""
+Content-addressed storage of the product images.
+
+An upload is hashed with SHA-256 while it is streamed to a temporary file
+and then stored as ``<upload_to>/<digest[:2]>/<digest><ext>``. A file with
+that name already holds the same bytes, so a duplicate upload only removes
+its temporary copy and returns the existing name.
+
+Files are shared by every product image field pointing at them; the
+MediaBlob reference counts in womanshop/blobs.py decide when one can be
+deleted.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# <upload_to>/ab/abcdef...(64 hex digits).ext
+BLOB_NAME_RE = re.compile(r"(?:^|/)([0-9a-f]{2})/\1[0-9a-f]{62}(?:\.\w+)?$")
+
+
+def blob_name(directory, digest, extension):
+    """
+    Return the storage name of a file from its content hash.
+
+    Args:
+        directory (str): The upload directory, e.g. "products".
+        digest (str): The hex SHA-256 of the file.
+        extension (str): The file extension with its dot, may be empty.
+
+    Returns:
+        str: The name relative to the storage root.
+    """
+    name = f"{digest[:2]}/{digest}{extension.lower()}"
+    return f"{directory.strip('/')}/{name}" if directory.strip("/") else name
+
+
+def file_digest(file):
+    """
+    Return the hex SHA-256 of a file, read in chunks.
+
+    Args:
+        file (File): The open file.
+
+    Returns:
+        str: The content hash.
+    """
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def blob_digest(name):
+    """
+    Return the content hash of a content-addressed name.
+
+    Args:
+        name (str): A name produced by blob_name.
+
+    Returns:
+        str: The hex SHA-256 of the file.
+    """
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def is_blob_name(name):
+    """
+    Tell whether a file name is a content-addressed name.
+
+    Args:
+        name (str): The storage name.
+
+    Returns:
+        bool: True if the name was produced by blob_name.
+    """
+    return bool(name) and BLOB_NAME_RE.search(name) is not None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that names files after the SHA-256 of their content.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name only depends on the content, see _save
+        return name
+
+    def _save(self, name, content):
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1]
+        full_directory = self.path(directory)
+        os.makedirs(full_directory, exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(
+            dir=full_directory, prefix=".upload-"
+        )
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    file.write(chunk)
+            final_name = blob_name(directory, digest.hexdigest(), extension)
+            final_path = self.path(final_name)
+            if os.path.exists(final_path):
+                os.remove(temporary_path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.replace(temporary_path, final_path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(final_path, self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+        return final_name
+
+
+product_image_storage = ContentAddressedStorage()
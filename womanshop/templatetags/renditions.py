@@ -0,0 +1,73 @@
+from django import template
+from django.db.models.fields.files import FieldFile
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from womanshop.renditions import has_renditions, rendition_url, srcset
+
+register = template.Library()
+
+
+def placeholder_style(manifest):
+    """
+    Return the inline style that paints the placeholder of an image.
+
+    Args:
+        manifest (dict): The renditions of the image.
+
+    Returns:
+        str: The CSS declarations.
+    """
+    return f"background:url({manifest['placeholder']}) center/cover no-repeat"
+
+
+@register.simple_tag
+def responsive_image(image, display_width, manifest=None, **attrs):
+    """
+    Render an image with its WebP and JPEG renditions.
+
+    The intrinsic size of the image fills the ``width`` and ``height``
+    attributes unless given, and its placeholder is painted as the
+    background until the image loads.
+
+    Usage:
+        {% load renditions %}
+        {% responsive_image product.image1 436 id="product_image1" %}
+        {% responsive_image entry.image1_url 180 entry.image1_renditions %}
+
+    Args:
+        image: An ImageFieldFile, or the URL of the original image.
+        display_width (int): The displayed width in CSS pixels.
+        manifest (dict): The renditions of the image; read from the model
+            instance when ``image`` is an ImageFieldFile.
+        **attrs: Extra attributes of the <img> tag.
+
+    Returns:
+        str: A <picture> element, or a plain <img> if there are no renditions.
+    """
+    url = image
+    if isinstance(image, FieldFile):
+        url = image.url if image else ""
+        if manifest is None:
+            manifest = image.instance.renditions.get(image.field.name)
+    attrs.setdefault("alt", "")
+    if not has_renditions(manifest):
+        return format_html("<img{}>", flatatt(dict(attrs, src=url)))
+    if "width" in manifest:
+        attrs.setdefault("width", manifest["width"])
+        attrs.setdefault("height", manifest["height"])
+    if manifest.get("placeholder"):
+        style = placeholder_style(manifest)
+        attrs["style"] = f"{attrs['style']};{style}" if "style" in attrs else style
+    sizes = f"{display_width}px"
+    img = dict(
+        attrs,
+        src=rendition_url(manifest, display_width),
+        srcset=srcset(manifest, "jpeg"),
+        sizes=sizes,
+    )
+    return format_html(
+        '<picture><source type="image/webp"{}><img{}></picture>',
+        flatatt({"srcset": srcset(manifest, "webp"), "sizes": sizes}),
+        flatatt(img),
+    )
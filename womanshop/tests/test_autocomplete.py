@@ -0,0 +1,123 @@
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from womanshop.autocomplete import autocomplete
+from womanshop.catalog_cache import bump_catalog_version
+from womanshop.models import (
+    Product,
+    ProductVariant,
+    Order,
+    OrderItem,
+    UserProfile,
+    Brand,
+    Category,
+    Style,
+    Color,
+    Size,
+)
+
+
+class AutocompleteTest(TestCase):
+    def setUp(self):
+        autocomplete.invalidate()
+        self.category = Category.objects.create(name="bras")
+        self.style = Style.objects.create(name="lacy")
+        self.brand = Brand.objects.create(name="MILAVITSA")
+        self.body = self.create("Body Amelie", "A1")
+        self.bra = self.create("Бюстгальтер Amelie", "A2")
+        self.bra_push = self.create("Бюстгальтер Push-up", "A3")
+        self.user_profile = UserProfile.objects.create(
+            user=User.objects.create_user(username="user", password="password")
+        )
+        self.color = Color.objects.create(name="red")
+        self.size = Size.objects.create(name="75B")
+        self.order(self.bra_push, 5, "O")
+
+    def create(self, name, vendor_code):
+        return Product.objects.create(
+            name=name,
+            category=self.category,
+            style=self.style,
+            brand=self.brand,
+            vendor_code=vendor_code,
+            collection="Collection",
+            price=Decimal("10.00"),
+            description="Description",
+            sale=False,
+            image1="products/test.jpg",
+        )
+
+    def order(self, product, quantity, status):
+        order = Order.objects.create(
+            user_profile=self.user_profile,
+            order_number=str(Order.objects.count() + 1),
+            order_total=Decimal("10.00"),
+            status=status,
+        )
+        variant = ProductVariant.objects.create(
+            product=product, color=self.color, size=self.size
+        )
+        OrderItem.objects.create(
+            order=order, product_variant=variant, quantity=quantity
+        )
+
+    def names(self, prefix):
+        return [item["name"] for item in autocomplete.complete(prefix)]
+
+    def test_prefix_ranked_by_popularity(self):
+        self.assertEqual(
+            self.names("бюст"), ["Бюстгальтер Push-up", "Бюстгальтер Amelie"]
+        )
+        self.assertEqual(self.names("AME"), ["Body Amelie", "Бюстгальтер Amelie"])
+        self.assertEqual(self.names("бюстгальтер a"), ["Бюстгальтер Amelie"])
+        self.assertEqual(self.names("x"), [])
+        self.assertEqual(self.names(" "), [])
+
+    def test_unpaid_orders_ignored(self):
+        self.order(self.bra, 10, "P")
+        autocomplete.invalidate()
+        self.assertEqual(
+            self.names("бюст"), ["Бюстгальтер Push-up", "Бюстгальтер Amelie"]
+        )
+
+    def test_rebuilt_on_catalog_version_change(self):
+        self.assertEqual(self.names("omega"), [])
+        # A rename by another process only reaches this one through the
+        # shared catalog version
+        Product.objects.filter(pk=self.body.pk).update(name="Omega")
+        bump_catalog_version()
+        self.assertEqual(self.names("omega"), ["Omega"])
+
+    def test_brand_completion(self):
+        brand = autocomplete.complete("mila")[0]
+        self.assertEqual(brand["type"], "brand")
+        self.assertEqual(brand["url"], reverse("catalog") + "?categors=milavitsa")
+
+    @override_settings(AUTOCOMPLETE_LIMIT=1)
+    def test_limit(self):
+        autocomplete.invalidate()
+        self.assertEqual(self.names("б"), ["Бюстгальтер Push-up"])
+
+    def test_signals_drop_trie(self):
+        self.names("body")
+        self.body.name = "Corset Amelie"
+        self.body.save()
+        self.assertEqual(self.names("body"), [])
+        self.assertEqual(self.names("cors"), ["Corset Amelie"])
+
+    def test_autocomplete_view(self):
+        response = self.client.get(reverse("autocomplete"), {"q": "Body"})
+        self.assertEqual(
+            response.json(),
+            [
+                {
+                    "type": "product",
+                    "id": self.body.id,
+                    "name": "Body Amelie",
+                    "url": reverse("product", args=[self.body.id]),
+                }
+            ],
+        )
+        with self.assertNumQueries(0):
+            self.client.get(reverse("autocomplete"), {"q": "Bo"})
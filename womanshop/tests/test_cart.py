@@ -0,0 +1,239 @@
+import json
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from womanshop.carts import SESSION_KEY, add_line
+from womanshop.models import (
+    Product,
+    ProductVariant,
+    Brand,
+    Category,
+    Style,
+    Color,
+    Size,
+    Cart,
+    CartLine,
+    Favorite,
+    Order,
+    OrderItem,
+    UserProfile,
+)
+
+
+class CartTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user", password="password")
+        self.product = Product.objects.create(
+            name="Product",
+            category=Category.objects.create(name="bras"),
+            style=Style.objects.create(name="lacy"),
+            brand=Brand.objects.create(name="AVELIN"),
+            vendor_code="C1",
+            collection="Collection",
+            price=Decimal("10.00"),
+            description="Description",
+            sale=False,
+            image1="products/test.jpg",
+        )
+        red = Color.objects.create(name="red")
+        self.red_75b = ProductVariant.objects.create(
+            product=self.product,
+            color=red,
+            size=Size.objects.create(name="75B"),
+            stock=7,
+        )
+        self.red_80b = ProductVariant.objects.create(
+            product=self.product,
+            color=red,
+            size=Size.objects.create(name="80B"),
+            stock=3,
+        )
+
+    def post(self, url, data):
+        return self.client.post(url, json.dumps(data), content_type="application/json")
+
+    def add(self, size, quantity):
+        return self.post(
+            reverse("add_to_cart", args=[self.product.id]),
+            {"color": "red", "size": size, "quantity": quantity},
+        )
+
+
+class CartViewsTest(CartTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def test_add_to_cart(self):
+        response = self.add("75B", "2")
+        self.assertEqual(response.json()["stock"], 7)
+        self.assertEqual(response.json()["item_in_cart"], 1)
+        # The same variant again only increases the quantity of its line
+        self.assertEqual(self.add("75B", 1).json()["item_in_cart"], 1)
+        self.assertEqual(self.add("80B", 1).json()["item_in_cart"], 2)
+        lines = CartLine.objects.filter(cart__user=self.user).order_by("id")
+        self.assertEqual(
+            [(line.product_variant_id, line.quantity) for line in lines],
+            [(self.red_75b.id, 3), (self.red_80b.id, 1)],
+        )
+        # Nothing of the cart is kept in the session
+        self.assertNotIn("cart", self.client.session)
+
+        self.assertEqual(self.add("75B", 0).status_code, 400)
+        self.assertEqual(self.add("90D", 1).status_code, 404)
+
+    def test_concurrent_add_of_the_same_variant(self):
+        cart = Cart.objects.create(user=self.user)
+        update = QuerySet.update
+
+        def racing_update(queryset, **kwargs):
+            # Another request adds the variant between the update and the insert
+            if not CartLine.objects.exists():
+                CartLine.objects.create(cart=cart, product_variant=self.red_75b)
+                return 0
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, "update", racing_update):
+            add_line(cart, self.red_75b.id, 2)
+        self.assertEqual(CartLine.objects.get().quantity, 3)
+
+    def test_cart_page(self):
+        self.add("75B", 2)
+        self.add("80B", 1)
+        response = self.client.get(reverse("cart"))
+        items = response.context["cart_items"]
+        self.assertEqual(
+            [(item["size"], item["quantity"], item["stock"]) for item in items],
+            [("75B", 2, 7), ("80B", 1, 3)],
+        )
+        self.assertEqual(response.context["cart_total"], Decimal("30.00"))
+        self.assertEqual(response.context["item_in_cart"], 2)
+
+    def test_update_remove_and_clear(self):
+        self.add("75B", 2)
+        self.add("80B", 1)
+        line = CartLine.objects.get(product_variant=self.red_75b)
+        kept = CartLine.objects.get(product_variant=self.red_80b)
+        url = reverse("cart_quantity_update")
+        response = self.post(url, {"line": line.id, "quantity": "5"})
+        self.assertEqual(response.status_code, 200)
+        line.refresh_from_db()
+        self.assertEqual(line.quantity, 5)
+        self.assertEqual(self.post(url, {"line": 0, "quantity": 1}).status_code, 400)
+
+        # Lines of other carts are out of reach
+        other = Cart.objects.create()
+        foreign = CartLine.objects.create(cart=other, product_variant=self.red_75b)
+        self.client.get(reverse("remove_from_cart", args=[foreign.id]))
+        self.client.get(reverse("remove_from_cart", args=[line.id]))
+        self.assertEqual(
+            list(CartLine.objects.values_list("id", flat=True).order_by("id")),
+            [kept.id, foreign.id],
+        )
+        self.assertRedirects(
+            self.client.get(reverse("clear_cart")), reverse("cart"), 302, 200
+        )
+        self.assertEqual(list(CartLine.objects.all()), [foreign])
+
+    def test_checkout(self):
+        UserProfile.objects.create(user=self.user)
+        self.add("75B", 2)
+        self.add("80B", 1)
+        response = self.client.get(reverse("checkout", args=["30.00"]))
+        order = response.context["order"]
+        self.assertEqual(order.order_total, Decimal("30.00"))
+        self.assertEqual(OrderItem.objects.filter(order=order).count(), 2)
+        self.red_75b.refresh_from_db()
+        self.assertEqual(self.red_75b.stock, 5)
+        self.assertFalse(CartLine.objects.exists())
+        self.assertEqual(Order.objects.count(), 1)
+
+
+class FavoritesTest(CartTestCase):
+    def test_anonymous_favorites(self):
+        # Pages of a session without a cart cost no cart query
+        response = self.client.get(reverse("index"))
+        self.assertEqual(response.context["item_in_cart"], 0)
+        self.assertNotIn(SESSION_KEY, self.client.session)
+
+        url = reverse("add_favorite")
+        self.assertEqual(self.post(url, {"favorite": self.product.id}).status_code, 200)
+        self.post(url, {"favorite": self.product.id})
+        self.assertEqual(self.post(url, {"favorite": 0}).status_code, 404)
+        cart = Cart.objects.get()
+        self.assertIsNone(cart.user)
+        # The session only holds the cart ID
+        self.assertEqual(self.client.session[SESSION_KEY], cart.id)
+        self.assertEqual(
+            len(self.client.cookies[settings.SESSION_COOKIE_NAME].value), 32
+        )
+        self.assertEqual(Favorite.objects.filter(cart=cart).count(), 1)
+
+        response = self.client.get(reverse("product", args=[self.product.id]))
+        self.assertTrue(response.context["favorite"])
+        self.assertEqual(response.context["favorites_id"], f"[{self.product.id}]")
+
+        url = reverse("remove_from_favorites")
+        self.assertEqual(self.post(url, {"favorite": self.product.id}).status_code, 200)
+        self.assertEqual(self.post(url, {"favorite": self.product.id}).status_code, 400)
+
+    def test_session_cart_handed_over_on_login(self):
+        self.post(reverse("add_favorite"), {"favorite": self.product.id})
+        self.client.login(username="user", password="password")
+        cart = Cart.objects.get()
+        self.assertEqual(cart.user, self.user)
+        self.assertNotIn(SESSION_KEY, self.client.session)
+
+    def test_session_cart_merged_on_login(self):
+        cart = Cart.objects.create(user=self.user)
+        CartLine.objects.create(cart=cart, product_variant=self.red_75b, quantity=1)
+        Favorite.objects.create(cart=cart, product=self.product)
+        session_cart = Cart.objects.create()
+        CartLine.objects.create(
+            cart=session_cart, product_variant=self.red_75b, quantity=2
+        )
+        CartLine.objects.create(
+            cart=session_cart, product_variant=self.red_80b, quantity=1
+        )
+        Favorite.objects.create(cart=session_cart, product=self.product)
+        session = self.client.session
+        session[SESSION_KEY] = session_cart.id
+        session.save()
+
+        self.client.login(username="user", password="password")
+        self.assertEqual(list(Cart.objects.all()), [cart])
+        self.assertEqual(
+            dict(cart.lines.values_list("product_variant_id", "quantity")),
+            {self.red_75b.id: 3, self.red_80b.id: 1},
+        )
+        self.assertEqual(cart.favorites.count(), 1)
+
+    def test_expired_anonymous_carts_deleted(self):
+        self.post(reverse("add_favorite"), {"favorite": self.product.id})
+        cart = Cart.objects.get()
+        expired = timezone.now() - timedelta(seconds=settings.SESSION_COOKIE_AGE + 1)
+        Cart.objects.filter(pk=cart.pk).update(updated_at=expired)
+        # Changing the cart refreshes it
+        self.post(reverse("add_favorite"), {"favorite": self.product.id})
+        cart.refresh_from_db()
+        self.assertGreater(cart.updated_at, expired)
+
+        stale = Cart.objects.create()
+        user_cart = Cart.objects.create(user=self.user)
+        Favorite.objects.create(cart=stale, product=self.product)
+        Cart.objects.filter(pk__in=[stale.pk, user_cart.pk]).update(updated_at=expired)
+        out = StringIO()
+        call_command("clear_carts", stdout=out)
+        self.assertIn("Deleted 1 expired carts.", out.getvalue())
+        self.assertEqual(
+            set(Cart.objects.values_list("id", flat=True)), {cart.id, user_cart.id}
+        )
+        self.assertEqual(Favorite.objects.filter(cart=cart).count(), 1)
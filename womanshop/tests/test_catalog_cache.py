@@ -0,0 +1,134 @@
+import tempfile
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from womanshop.models import Product, Brand, Category, Style
+from womanshop.facets import facet_index
+from womanshop import catalog_cache
+
+
+class CatalogCacheTestCase(TestCase):
+    def setUp(self):
+        # A file cache of its own, shared like the one of the real processes
+        location = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(
+            override_settings(
+                CACHES={
+                    "default": {
+                        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                        "LOCATION": location,
+                    }
+                }
+            )
+        )
+        facet_index.invalidate()
+        self.product = Product.objects.create(
+            name="Product",
+            category=Category.objects.create(name="bras"),
+            style=Style.objects.create(name="lacy"),
+            brand=Brand.objects.create(name="AVELIN"),
+            vendor_code="C1",
+            collection="Collection",
+            price=Decimal("10.00"),
+            description="Description",
+            sale=False,
+            image1="products/test.jpg",
+        )
+        self.url = reverse("catalog_api")
+
+
+class CatalogCacheTest(CatalogCacheTestCase):
+    def test_equivalent_requests_share_cache_entry(self):
+        response = self.client.get(
+            self.url, {"sort_by": "price", "bras": "true", "lauma": "false"}
+        )
+        self.assertEqual(response["X-Cache"], "MISS")
+        response = self.client.get(
+            self.url,
+            {"bras": "true", "page": "1", "per_page": "3", "utm_source": "x"},
+        )
+        self.assertEqual(response["X-Cache"], "HIT")
+        response = self.client.get(self.url, {"bras": "true", "end": "20"})
+        self.assertEqual(response["X-Cache"], "MISS")
+
+    def test_catalog_change_invalidates_cache(self):
+        self.client.get(self.url)
+        self.product.name = "Renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["data"][0]["name"], "Renamed")
+
+    def test_version_bumped_on_commit(self):
+        version = catalog_cache.get_catalog_version()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.product.save()
+        # Other workers must not cache uncommitted data under a new version
+        self.assertEqual(catalog_cache.get_catalog_version(), version)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(catalog_cache.get_catalog_version(), version + 1)
+
+    def test_version_shared_between_processes(self):
+        etag = self.client.get(self.url)["ETag"]
+        # A management command bumps the version through its own cache instance
+        other = caches.create_connection("default")
+        self.assertIsNot(other, caches["default"])
+        other.incr(catalog_cache.VERSION_KEY)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Cache"], "MISS")
+
+    def test_version_seeded_after_clear(self):
+        version = catalog_cache.get_catalog_version()
+        cache.clear()
+        self.assertGreater(catalog_cache.get_catalog_version(), version)
+
+    def test_cache_stats_view(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+        url = reverse("catalog_cache_stats")
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        User.objects.create_superuser("admin", "admin@example.com", "adminpassword")
+        self.client.login(username="admin", password="adminpassword")
+        stats = self.client.get(url).json()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+
+class ConditionalGetTest(CatalogCacheTestCase):
+    def test_catalog_api_not_modified(self):
+        response = self.client.get(self.url, {"bras": "true"})
+        etag = response["ETag"]
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertIn("max-age=60", response["Cache-Control"])
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                self.url, {"bras": "true", "page": "1"}, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertIn("max-age=60", response["Cache-Control"])
+
+        self.product.price = Decimal("12.00")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        response = self.client.get(self.url, {"bras": "true"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_product_api_and_search_not_modified(self):
+        for url, params in (
+            (reverse("product_api"), {"category_by": "bras", "product_id": "0"}),
+            (reverse("search"), {"q": "Prod"}),
+        ):
+            etag = self.client.get(url, params)["ETag"]
+            response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+    def test_error_response_has_no_etag(self):
+        response = self.client.get(self.url, {"cursor": "!"})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.has_header("ETag"))
@@ -0,0 +1,91 @@
+from io import StringIO
+from decimal import Decimal
+from django.core.management import call_command
+from django.test import TestCase
+from womanshop.models import (
+    Product,
+    ProductVariant,
+    ProductCatalogEntry,
+    Brand,
+    Category,
+    Color,
+    Size,
+    Style,
+)
+
+
+class ProductCatalogEntryTest(TestCase):
+    def setUp(self):
+        self.brand = Brand.objects.create(name="LAUMA")
+        self.color = Color.objects.create(name="black")
+        self.size = Size.objects.create(name="75B")
+        self.product = Product.objects.create(
+            name="Бюстгальтер",
+            category=Category.objects.create(name="bras"),
+            style=Style.objects.create(name="lacy"),
+            brand=self.brand,
+            vendor_code="A1",
+            collection="Collection",
+            price=Decimal("25.50"),
+            description="Description",
+            sale=True,
+            image1="products/test.jpg",
+        )
+
+    def test_entry_created_with_product(self):
+        entry = ProductCatalogEntry.objects.get(product=self.product)
+        self.assertEqual(entry.name, "Бюстгальтер")
+        self.assertEqual(entry.brand_name, "LAUMA")
+        self.assertEqual(entry.category_name, "bras")
+        self.assertEqual(entry.style_name, "lacy")
+        self.assertEqual(entry.image1_url, self.product.image1.url)
+        self.assertTrue(entry.sale)
+        self.assertFalse(entry.has_large_size)
+        self.assertEqual(entry.sizes, "")
+
+    def test_entry_follows_variants(self):
+        ProductVariant.objects.create(
+            product=self.product, color=self.color, size=self.size, stock=3
+        )
+        variant = ProductVariant.objects.create(
+            product=self.product,
+            color=self.color,
+            size=Size.objects.create(name="80E"),
+            stock=7,
+        )
+        entry = ProductCatalogEntry.objects.get(product=self.product)
+        self.assertEqual(entry.sizes, "75B,80E")
+        self.assertTrue(entry.has_large_size)
+        self.product.refresh_from_db()
+        self.assertTrue(self.product.has_large_size)
+
+        variant.delete()
+        entry.refresh_from_db()
+        self.assertEqual(entry.sizes, "75B")
+        self.assertFalse(entry.has_large_size)
+        self.product.refresh_from_db()
+        self.assertFalse(self.product.has_large_size)
+
+    def test_entry_follows_renames(self):
+        self.brand.name = "TRIUMPH"
+        self.brand.save()
+        entry = ProductCatalogEntry.objects.get(product=self.product)
+        self.assertEqual(entry.brand_name, "TRIUMPH")
+
+    def test_rebuild_catalog_command(self):
+        ProductCatalogEntry.objects.all().delete()
+        call_command("rebuild_catalog", stdout=StringIO())
+        self.assertTrue(
+            ProductCatalogEntry.objects.filter(product=self.product).exists()
+        )
+
+    def test_rebuild_catalog_command_sets_large_size_flag(self):
+        ProductVariant.objects.create(
+            product=self.product,
+            color=self.color,
+            size=Size.objects.create(name="80F"),
+        )
+        Product.objects.update(has_large_size=False)
+        call_command("rebuild_catalog", stdout=StringIO())
+        self.product.refresh_from_db()
+        self.assertTrue(self.product.has_large_size)
@@ -0,0 +1,165 @@
+from decimal import Decimal
+from io import StringIO
+from unittest import skipIf
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from womanshop import co_purchases
+from womanshop.co_purchases import (
+    build_bought_together,
+    count_python,
+    count_sparse,
+    iter_order_lines,
+    rebuild_bought_together,
+)
+from womanshop.models import (
+    Product,
+    ProductVariant,
+    ProductRecommendation,
+    Order,
+    OrderItem,
+    UserProfile,
+    Brand,
+    Category,
+    Style,
+    Color,
+    Size,
+)
+from womanshop.recommendations import rebuild_recommendations
+
+
+class CoPurchasesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="bras")
+        style = Style.objects.create(name="lacy")
+        brand = Brand.objects.create(name="AVELIN")
+        color = Color.objects.create(name="red")
+        sizes = [Size.objects.create(name=name) for name in ("75B", "75C")]
+        self.products = []
+        self.variants = {}
+        for name in "ABCD":
+            product = Product.objects.create(
+                name=name,
+                category=category,
+                style=style,
+                brand=brand,
+                vendor_code=name,
+                collection="Collection",
+                price=Decimal("10.00"),
+                description="Description",
+                sale=False,
+                image1="products/test.jpg",
+                image2="products/test.jpg",
+                image3="products/test.jpg",
+                image4="products/test.jpg",
+            )
+            self.products.append(product)
+            self.variants[name] = [
+                ProductVariant.objects.create(
+                    product=product, color=color, size=size, stock=5
+                )
+                for size in sizes
+            ]
+        self.a, self.b, self.c, self.d = self.products
+        self.user_profile = UserProfile.objects.create(
+            user=User.objects.create_user(username="user", password="password")
+        )
+        # Two sizes of A in one order count once
+        self.order("O", ["A", "A", "B", "C"])
+        self.order("C", ["A", "B"])
+        self.order("D", ["B", "C"])
+        # Unpaid orders are ignored
+        self.order("P", ["A", "D"])
+
+    def order(self, status, names):
+        order = Order.objects.create(
+            user_profile=self.user_profile,
+            order_number=str(Order.objects.count() + 1),
+            order_total=Decimal("10.00"),
+            status=status,
+        )
+        used = {}
+        for name in names:
+            variant = self.variants[name][used.get(name, 0)]
+            used[name] = used.get(name, 0) + 1
+            OrderItem.objects.create(order=order, product_variant=variant)
+
+    def expected(self):
+        return {
+            self.a.id: [self.b.id, self.c.id],
+            self.b.id: [self.a.id, self.c.id],
+            self.c.id: [self.b.id, self.a.id],
+        }
+
+    def expected_counts(self):
+        return {
+            self.a.id: [(self.b.id, 2), (self.c.id, 1)],
+            self.b.id: [(self.a.id, 2), (self.c.id, 2)],
+            self.c.id: [(self.b.id, 2), (self.a.id, 1)],
+        }
+
+    def test_iter_order_lines(self):
+        chunks = list(iter_order_lines(chunk_size=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [5, 2])
+
+    def test_count_python(self):
+        for chunk_size in (1, 2, 10):
+            counts = count_python(iter_order_lines(chunk_size), 6)
+            self.assertEqual(counts, self.expected_counts())
+        counts = count_python(iter_order_lines(), 1)
+        self.assertEqual(counts[self.c.id], [(self.b.id, 2)])
+        self.assertEqual(build_bought_together(), self.expected())
+
+    @skipIf(co_purchases.sparse is None, "NumPy and SciPy are not installed")
+    def test_count_sparse(self):
+        product_ids = [product.id for product in self.products]
+        for chunk_size in (1, 2, 10):
+            counts = count_sparse(iter_order_lines(chunk_size), 6, product_ids)
+            self.assertEqual(counts, self.expected_counts())
+        self.assertEqual(build_bought_together(), self.expected())
+
+    def test_rebuild_keeps_recommendations(self):
+        rebuild_recommendations()
+        self.assertEqual(rebuild_bought_together(), 3)
+        recommendation = ProductRecommendation.objects.get(pk=self.a.id)
+        self.assertEqual(
+            recommendation.get_bought_together_ids(), [self.b.id, self.c.id]
+        )
+        self.assertTrue(recommendation.get_product_ids())
+        rebuild_recommendations()
+        recommendation.refresh_from_db()
+        self.assertEqual(
+            recommendation.get_bought_together_ids(), [self.b.id, self.c.id]
+        )
+        self.assertEqual(
+            ProductRecommendation.objects.get(pk=self.d.id).get_bought_together_ids(),
+            [],
+        )
+
+    def test_command(self):
+        call_command("build_bought_together", "--limit", "1", stdout=StringIO())
+        self.assertEqual(
+            ProductRecommendation.objects.get(pk=self.a.id).get_bought_together_ids(),
+            [self.b.id],
+        )
+
+    def test_product_page_and_api(self):
+        rebuild_bought_together()
+        response = self.client.get(reverse("product", args=[self.a.id]))
+        self.assertEqual(
+            [entry.product_id for entry in response.context["bought_together"]],
+            [self.b.id, self.c.id],
+        )
+        self.assertContains(response, 'id="bought_together"')
+
+        url = reverse("product-bought-together", args=[self.a.id])
+        response = self.client.get(url)
+        self.assertEqual(
+            [product["name"] for product in response.json()],
+            ["B", "C"],
+        )
+        url = reverse("product-bought-together", args=[self.d.id])
+        self.assertEqual(self.client.get(url).json(), [])
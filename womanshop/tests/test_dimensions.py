@@ -0,0 +1,92 @@
+import json
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.http import Http404
+from django.test import TestCase
+from django.urls import reverse
+from womanshop.models import (
+    Product,
+    ProductVariant,
+    Brand,
+    Category,
+    Style,
+    Color,
+    Size,
+)
+from womanshop.dimensions import dimensions
+
+
+class DimensionRegistryTest(TestCase):
+    def setUp(self):
+        for model in (Category, Style, Brand, Color, Size):
+            dimensions.invalidate(model)
+        self.red = Color.objects.create(name="red")
+        self.size = Size.objects.create(name="75B")
+
+    def test_lookups(self):
+        self.assertEqual(dimensions.id_for(Color, "red"), self.red.id)
+        self.assertEqual(dimensions.name_for(Color, self.red.id), "red")
+        self.assertIsNone(dimensions.id_for(Color, "blue"))
+        self.assertEqual(dimensions.get_id_or_404(Size, "75B"), self.size.id)
+        with self.assertRaises(Http404):
+            dimensions.get_id_or_404(Size, "80F")
+
+    def test_loaded_once(self):
+        dimensions.id_for(Color, "red")
+        with self.assertNumQueries(0):
+            dimensions.id_for(Color, "red")
+            dimensions.name_for(Color, self.red.id)
+
+    def test_invalidated_on_save_and_delete(self):
+        self.assertIsNone(dimensions.id_for(Color, "blue"))
+        blue = Color.objects.create(name="blue")
+        self.assertEqual(dimensions.id_for(Color, "blue"), blue.id)
+        self.red.name = "dark red"
+        self.red.save()
+        self.assertIsNone(dimensions.id_for(Color, "red"))
+        self.assertEqual(dimensions.name_for(Color, self.red.id), "dark red")
+        blue.delete()
+        self.assertIsNone(dimensions.id_for(Color, "blue"))
+
+
+class AvailableProductQuantityViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user", password="password")
+        self.client.force_login(self.user)
+        self.product = Product.objects.create(
+            name="Product",
+            category=Category.objects.create(name="bras"),
+            style=Style.objects.create(name="lacy"),
+            brand=Brand.objects.create(name="AVELIN"),
+            vendor_code="D1",
+            collection="Collection",
+            price=Decimal("10.00"),
+            description="Description",
+            sale=False,
+            image1="products/test.jpg",
+        )
+        ProductVariant.objects.create(
+            product=self.product,
+            color=Color.objects.create(name="red"),
+            size=Size.objects.create(name="75B"),
+            stock=7,
+        )
+        self.url = reverse("available_product_quantity", args=[self.product.id])
+
+    def post(self, color, size):
+        return self.client.post(
+            self.url,
+            json.dumps({"color": color, "size": size}),
+            content_type="application/json",
+        )
+
+    def test_stock(self):
+        self.post("red", "75B")
+        with self.assertNumQueries(2):
+            # The user and the variant; colors and sizes are cached
+            response = self.post("red", "75B")
+        self.assertEqual(response.json(), {"stock": 7})
+
+    def test_unknown_dimension(self):
+        self.assertEqual(self.post("blue", "75B").status_code, 404)
+        self.assertEqual(self.post("red", "80F").status_code, 404)
@@ -0,0 +1,192 @@
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from womanshop.models import (
+    Product,
+    ProductCatalogEntry,
+    ProductVariant,
+    Brand,
+    Category,
+    Color,
+    Size,
+    Style,
+)
+from womanshop.catalog_cache import bump_catalog_version
+from womanshop.facets import facet_index
+
+
+class CatalogTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        facet_index.invalidate()
+        self.bras = Category.objects.create(name="bras")
+        self.panties = Category.objects.create(name="panties")
+        self.lacy = Style.objects.create(name="lacy")
+        self.avelin = Brand.objects.create(name="AVELIN")
+        self.lauma = Brand.objects.create(name="LAUMA")
+        self.color = Color.objects.create(name="red")
+        self.large = Size.objects.create(name="80E")
+        self.small = Size.objects.create(name="70A")
+        self.products = []
+        for i in range(1, 16):
+            self.products.append(
+                Product.objects.create(
+                    name=f"Product {i:02d}",
+                    category=self.bras if i % 2 else self.panties,
+                    style=self.lacy,
+                    brand=self.avelin if i % 3 else self.lauma,
+                    vendor_code=f"V{i}",
+                    collection="Collection",
+                    price=Decimal(i * 10),
+                    description="Description",
+                    sale=i % 5 == 0,
+                    image1="products/test.jpg",
+                )
+            )
+        ProductVariant.objects.create(
+            product=self.products[0], color=self.color, size=self.large
+        )
+        ProductVariant.objects.create(
+            product=self.products[1], color=self.color, size=self.small
+        )
+
+
+class FacetIndexTest(CatalogTestCase):
+    def get_ids(self, **params):
+        response = self.client.get(reverse("catalog_api"), params)
+        self.assertEqual(response.status_code, 200)
+        json_data = response.json()
+        return [item["id"] for item in json_data["data"]], json_data["has_next"]
+
+    def test_pagination_and_sorting(self):
+        ids, has_next = self.get_ids(sort_by="price", sort_direction="desc")
+        self.assertEqual(ids, [p.id for p in reversed(self.products)][:12])
+        self.assertTrue(has_next)
+
+        ids, has_next = self.get_ids(page=2, sort_by="price", sort_direction="desc")
+        self.assertEqual(ids, [p.id for p in self.products[2::-1]])
+        self.assertFalse(has_next)
+
+    def test_facet_filters(self):
+        ids, _ = self.get_ids(sort_by="price", bras="true", lauma="true")
+        self.assertEqual(ids, [self.products[i].id for i in (2, 8, 14)])
+
+        ids, _ = self.get_ids(sort_by="name", start="30", end="70")
+        self.assertEqual(ids, [self.products[i].id for i in (3, 4, 5)])
+
+        ids, _ = self.get_ids(sort_by="price", categors="sale")
+        self.assertEqual(ids, [self.products[i].id for i in (4, 9, 14)])
+
+        ids, _ = self.get_ids(sort_by="price", categors="XXL")
+        self.assertEqual(ids, [self.products[0].id])
+
+    @override_settings(CATALOG_FACET_INDEX=False)
+    def test_database_path_flag_filters(self):
+        ids, _ = self.get_ids(sort_by="price", categors="sale")
+        self.assertEqual(ids, [self.products[i].id for i in (4, 9, 14)])
+
+        ids, _ = self.get_ids(sort_by="price", categors="XXL")
+        self.assertEqual(ids, [self.products[0].id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductVariant.objects.filter(size=self.large).delete()
+        ids, _ = self.get_ids(sort_by="price", categors="XXL")
+        self.assertEqual(ids, [])
+
+    def test_index_matches_database_path(self):
+        params = {"sort_by": "brand", "sort_direction": "asc", "panties": "true"}
+        ids, has_next = self.get_ids(**params)
+        with override_settings(CATALOG_FACET_INDEX=False):
+            db_ids, db_has_next = self.get_ids(**params)
+        self.assertEqual(sorted(ids), sorted(db_ids))
+        self.assertEqual(has_next, db_has_next)
+
+    def test_build_matches_incremental_adds(self):
+        facet_index.build()
+        incremental = type(facet_index)()
+        incremental._reset()
+        for row in ProductCatalogEntry.objects.values(*incremental._row_fields()):
+            incremental._add(row)
+        for name in ("_all", "_categories", "_styles", "_brands", "_orders"):
+            self.assertEqual(
+                getattr(facet_index, name), getattr(incremental, name), name
+            )
+        self.assertEqual(facet_index._large_size, incremental._large_size)
+        self.assertEqual(facet_index._sale, incremental._sale)
+
+    def test_signals_update_index(self):
+        self.get_ids()
+        product = self.products[1]
+        product.sale = True
+        product.save()
+        ProductVariant.objects.create(
+            product=product, color=self.color, size=self.large
+        )
+        self.products[0].delete()
+
+        ids, _ = self.get_ids(sort_by="price", categors="XXL")
+        self.assertEqual(ids, [product.id])
+        ids, _ = self.get_ids(sort_by="price", categors="sale")
+        self.assertEqual(ids[0], product.id)
+
+    def test_local_changes_not_rebuilt(self):
+        self.get_ids()
+        with mock.patch.object(facet_index, "build") as build:
+            product = self.products[1]
+            product.sale = True
+            with self.captureOnCommitCallbacks(execute=True):
+                product.save()
+            ids, _ = self.get_ids(sort_by="price", categors="sale")
+        build.assert_not_called()
+        self.assertEqual(ids, [self.products[i].id for i in (1, 4, 9, 14)])
+
+    def test_rebuilt_on_catalog_version_change(self):
+        self.get_ids()
+        # Changes made by another process only reach this one through the
+        # shared catalog version
+        ProductCatalogEntry.objects.filter(product=self.products[1]).update(sale=True)
+        ids, _ = self.get_ids(sort_by="price", categors="sale")
+        self.assertEqual(ids, [self.products[i].id for i in (4, 9, 14)])
+        bump_catalog_version()
+        ids, _ = self.get_ids(sort_by="price", categors="sale")
+        self.assertEqual(ids, [self.products[i].id for i in (1, 4, 9, 14)])
+
+    def test_rebuild_catalog_command(self):
+        self.get_ids()
+        Product.objects.filter(pk=self.products[1].pk).update(sale=True)
+        call_command("rebuild_catalog", stdout=StringIO())
+        ids, _ = self.get_ids(sort_by="price", categors="sale")
+        self.assertEqual(ids, [self.products[i].id for i in (1, 4, 9, 14)])
+
+
+class FacetCountsTest(CatalogTestCase):
+    def get_facets(self, **params):
+        response = self.client.get(reverse("catalog_api"), dict(params, facets="1"))
+        self.assertEqual(response.status_code, 200)
+        return response.json()["facets"]
+
+    def test_facet_counts(self):
+        facets = self.get_facets(sort_by="price", bras="true")
+        # The category counts ignore the category selection itself
+        self.assertEqual(facets["categories"]["bras"], 8)
+        self.assertEqual(facets["categories"]["panties"], 7)
+        self.assertEqual(facets["categories"]["bodysuit"], 0)
+        self.assertEqual(facets["brands"]["avelin"], 5)
+        self.assertEqual(facets["brands"]["lauma"], 3)
+        self.assertEqual(facets["styles"]["lacy"], 8)
+
+    def test_facet_counts_match_database(self):
+        params = {"sort_by": "price", "panties": "true", "lauma": "true", "end": "90"}
+        facets = self.get_facets(**params)
+        with override_settings(CATALOG_FACET_INDEX=False):
+            self.assertEqual(self.get_facets(**params), facets)
+
+    def test_facet_counts_follow_changes(self):
+        self.assertEqual(self.get_facets()["categories"]["bras"], 8)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products[0].delete()
+        self.assertEqual(self.get_facets()["categories"]["bras"], 7)
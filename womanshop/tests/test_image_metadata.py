@@ -0,0 +1,128 @@
+import io
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from womanshop import image_metadata
+from womanshop.jobs import run_pending_jobs
+from womanshop.models import Product, UserProfile, Brand, Category, Style
+
+
+def create_image(size=(300, 200), image_format="PNG", name="photo.png"):
+    output = io.BytesIO()
+    Image.new("RGB", size, color="red").save(output, format=image_format)
+    return SimpleUploadedFile(name, output.getvalue())
+
+
+class ImageMetadataTest(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root, IMAGE_JOBS_ASYNC=True)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.category = Category.objects.create(name="bras")
+        self.style = Style.objects.create(name="lacy")
+        self.brand = Brand.objects.create(name="AVELIN")
+
+    def create(self, **images):
+        return Product.objects.create(
+            name="Product",
+            category=self.category,
+            style=self.style,
+            brand=self.brand,
+            vendor_code="M1",
+            collection="Collection",
+            price=Decimal("10.00"),
+            description="Description",
+            sale=False,
+            **images,
+        )
+
+    def test_product_upload(self):
+        image = create_image()
+        product = self.create(
+            image1=image,
+            image2=create_image((40, 80), "JPEG", "small.jpg"),
+            image3="products/missing.png",
+        )
+        metadata = Product.objects.get(pk=product.pk).image_metadata
+        self.assertEqual(
+            metadata["image1"],
+            {
+                "name": product.image1.name,
+                "width": 300,
+                "height": 200,
+                "size": image.size,
+                "format": "PNG",
+            },
+        )
+        self.assertEqual(
+            (metadata["image2"]["width"], metadata["image2"]["format"]), (40, "JPEG")
+        )
+        self.assertEqual(metadata["image3"], {"name": "products/missing.png"})
+        self.assertEqual(product.image_metadata, metadata)
+
+        with mock.patch.object(
+            image_metadata, "read_metadata", wraps=image_metadata.read_metadata
+        ) as read_metadata:
+            product.name = "Renamed"
+            product.save()
+            self.assertEqual(read_metadata.call_count, 0)
+            product.image2 = create_image((60, 30))
+            product.save()
+            self.assertEqual(read_metadata.call_count, 1)
+        self.assertEqual(product.image_metadata["image2"]["width"], 60)
+
+        response = self.client.get(reverse("product-detail", args=[product.pk]))
+        self.assertEqual(response.json()["image_metadata"]["image1"]["height"], 200)
+
+    def test_exif_orientation(self):
+        output = io.BytesIO()
+        exif = Image.Exif()
+        # Rotated by 90 degrees when displayed
+        exif[0x0112] = 6
+        Image.new("RGB", (300, 200), color="red").save(output, "JPEG", exif=exif)
+        product = self.create(image1=SimpleUploadedFile("photo.jpg", output.getvalue()))
+        run_pending_jobs()
+        product.refresh_from_db()
+        metadata = product.image_metadata["image1"]
+        manifest = product.renditions["image1"]
+        self.assertEqual((metadata["width"], metadata["height"]), (200, 300))
+        self.assertEqual((manifest["width"], manifest["height"]), (200, 300))
+
+    def test_profile_pic(self):
+        profile = UserProfile.objects.create(
+            user=User.objects.create_user(username="user", password="password")
+        )
+        profile.profile_pic = create_image((1024, 512))
+        profile.save()
+        self.assertEqual(profile.image_metadata["profile_pic"]["width"], 1024)
+        # The worker shrinks the picture and updates the metadata
+        run_pending_jobs()
+        profile.refresh_from_db()
+        item = profile.image_metadata["profile_pic"]
+        self.assertEqual(
+            (item["name"], item["width"], item["height"]),
+            (profile.profile_pic.name, 512, 256),
+        )
+
+    def test_backfill_command(self):
+        product = self.create(image1=create_image())
+        UserProfile.objects.create(
+            user=User.objects.create_user(username="user", password="password")
+        )
+        Product.objects.filter(pk=product.pk).update(image_metadata={})
+        output = io.StringIO()
+        call_command("backfill_image_metadata", stdout=output)
+        self.assertIn("of 1 products", output.getvalue())
+        # Saving the profile already recorded its missing default picture
+        self.assertIn("of 0 user profiles", output.getvalue())
+        product.refresh_from_db()
+        self.assertEqual(product.image_metadata["image1"]["width"], 300)
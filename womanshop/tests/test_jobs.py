@@ -0,0 +1,136 @@
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from womanshop import jobs
+from womanshop.jobs import enqueue, run_pending_jobs
+from womanshop.models import (
+    ImageJob,
+    Product,
+    ProductCatalogEntry,
+    UserProfile,
+    Brand,
+    Category,
+    Style,
+)
+
+
+def create_image(size=(500, 400), name="photo.jpg"):
+    output = io.BytesIO()
+    Image.new("RGB", size, color="red").save(output, format="JPEG")
+    return SimpleUploadedFile(name, output.getvalue(), content_type="image/jpeg")
+
+
+class ImageJobTest(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root, IMAGE_JOBS_ASYNC=True)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.category = Category.objects.create(name="bras")
+        self.style = Style.objects.create(name="lacy")
+        self.brand = Brand.objects.create(name="AVELIN")
+
+    def create_product(self, **images):
+        return Product.objects.create(
+            name="Product",
+            category=self.category,
+            style=self.style,
+            brand=self.brand,
+            vendor_code="J1",
+            collection="Collection",
+            price=Decimal("10.00"),
+            description="Description",
+            sale=False,
+            **images,
+        )
+
+    def test_product_upload_is_queued(self):
+        product = self.create_product(image1=create_image())
+        product.save()
+        job = ImageJob.objects.get()
+        self.assertEqual(
+            (job.kind, job.object_id, job.status),
+            (ImageJob.PRODUCT_RENDITIONS, product.id, ImageJob.PENDING),
+        )
+        self.assertEqual(Product.objects.get(pk=product.pk).renditions, {})
+
+        self.assertEqual(run_pending_jobs(), [ImageJob.DONE])
+        job.refresh_from_db()
+        self.assertEqual((job.progress, job.attempts), (100, 1))
+        product.refresh_from_db()
+        self.assertEqual(product.renditions["image1"]["widths"], [68, 180, 360])
+        entry = ProductCatalogEntry.objects.get(pk=product.pk)
+        self.assertEqual(entry.image1_renditions, product.renditions["image1"])
+        # Saving again without new images queues nothing
+        product.save()
+        self.assertEqual(ImageJob.objects.count(), 1)
+        self.assertEqual(run_pending_jobs(), [])
+
+    @override_settings(IMAGE_JOB_RETRY_DELAY=0, IMAGE_JOB_MAX_ATTEMPTS=2)
+    def test_retries(self):
+        failing = mock.Mock(side_effect=OSError("disk full"))
+        with mock.patch.dict(jobs.HANDLERS, {ImageJob.PRODUCT_RENDITIONS: failing}):
+            job = enqueue(ImageJob.PRODUCT_RENDITIONS, 1)
+            self.assertEqual(run_pending_jobs(), [ImageJob.PENDING])
+            self.assertEqual(run_pending_jobs(), [ImageJob.FAILED])
+            self.assertEqual(run_pending_jobs(), [])
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+        self.assertIn("disk full", job.error)
+        self.assertEqual(failing.call_count, 2)
+
+    def test_retry_delay(self):
+        failing = mock.Mock(side_effect=OSError("disk full"))
+        with mock.patch.dict(jobs.HANDLERS, {ImageJob.PRODUCT_RENDITIONS: failing}):
+            job = enqueue(ImageJob.PRODUCT_RENDITIONS, 1)
+            run_pending_jobs()
+            self.assertEqual(run_pending_jobs(), [])
+        job.refresh_from_db()
+        self.assertGreater(job.available_at, timezone.now())
+
+    def test_stale_jobs_are_requeued(self):
+        job = enqueue(ImageJob.PRODUCT_RENDITIONS, 1)
+        ImageJob.objects.filter(pk=job.pk).update(
+            status=ImageJob.RUNNING, updated_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(run_pending_jobs(), [ImageJob.DONE])
+
+    def test_profile_pic(self):
+        profile = UserProfile.objects.create(
+            user=User.objects.create_user(username="user", password="password")
+        )
+        profile.address = "Street"
+        profile.save()
+        self.assertFalse(ImageJob.objects.exists())
+
+        profile.profile_pic = create_image(size=(1024, 768))
+        profile.save()
+        old_name = profile.profile_pic.name
+        job = ImageJob.objects.get(kind=ImageJob.PROFILE_PIC)
+        self.assertEqual(job.object_id, profile.id)
+        call_command(
+            "run_image_worker", "--processes", "0", "--once", stdout=io.StringIO()
+        )
+        profile.refresh_from_db()
+        with profile.profile_pic.open("rb") as file:
+            self.assertEqual(Image.open(file).size, (512, 384))
+        self.assertFalse(default_storage.exists(old_name))
+
+        # Small pictures are kept as they are
+        profile.profile_pic = create_image(size=(100, 100), name="small.jpg")
+        profile.save()
+        name = profile.profile_pic.name
+        run_pending_jobs()
+        profile.refresh_from_db()
+        self.assertEqual(profile.profile_pic.name, name)
@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.utils.http import http_date
+from womanshop.media import parse_range
+from womanshop.storage import product_image_storage
+
+DATA = bytes(range(256)) * 4
+
+
+class MediaViewTest(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root, MEDIA_SENDFILE_BACKEND="")
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.legacy = default_storage.save("products/photo.png", ContentFile(DATA))
+        self.blob = product_image_storage.save("products/a.png", ContentFile(DATA))
+        self.media_root = media_root
+
+    def get(self, name, **headers):
+        return self.client.get(f"/media/{name}", **headers)
+
+    def test_full_file(self):
+        response = self.get(self.blob)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), DATA)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=31536000", response["Cache-Control"])
+
+        response = self.get(self.legacy)
+        self.assertNotIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=3600", response["Cache-Control"])
+        response.close()
+
+    def test_range(self):
+        response = self.get(self.blob, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), DATA[10:20])
+        self.assertEqual(response["Content-Range"], f"bytes 10-19/{len(DATA)}")
+        self.assertEqual(response["Content-Length"], "10")
+
+        response = self.get(self.blob, HTTP_RANGE="bytes=-5")
+        self.assertEqual(b"".join(response.streaming_content), DATA[-5:])
+
+        response = self.get(self.blob, HTTP_RANGE=f"bytes={len(DATA)}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(DATA)}")
+
+        # A range of an older version of the file gets the whole file
+        response = self.get(self.blob, HTTP_RANGE="bytes=0-1", HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range("bytes=0-", 10), (0, 9))
+        self.assertEqual(parse_range("bytes=5-100", 10), (5, 9))
+        self.assertEqual(parse_range("bytes=-100", 10), (0, 9))
+        self.assertIsNone(parse_range("bytes=0-1,4-5", 10))
+        self.assertIsNone(parse_range("items=0-1", 10))
+        with self.assertRaises(ValueError):
+            parse_range("bytes=5-4", 10)
+
+    def test_not_modified(self):
+        response = self.get(self.blob)
+        etag = response["ETag"]
+        response.close()
+        self.assertEqual(self.get(self.blob, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        mtime = os.stat(os.path.join(self.media_root, self.blob)).st_mtime
+        response = self.get(self.blob, HTTP_IF_MODIFIED_SINCE=http_date(mtime))
+        self.assertEqual(response.status_code, 304)
+        self.assertIn("immutable", response["Cache-Control"])
+
+    def test_not_found(self):
+        self.assertEqual(self.get("products/missing.png").status_code, 404)
+        self.assertEqual(self.get("products").status_code, 404)
+        self.assertEqual(self.get("../manage.py").status_code, 404)
+        # Temporary files of uploads in progress
+        name = default_storage.save("products/ab/.upload-x1y2", ContentFile(DATA))
+        self.assertEqual(self.get(name).status_code, 404)
+        self.assertEqual(self.client.post(f"/media/{self.blob}").status_code, 405)
+
+    @override_settings(
+        MEDIA_SENDFILE_BACKEND="x-accel-redirect",
+        MEDIA_ACCEL_REDIRECT_PREFIX="/protected-media/",
+    )
+    def test_x_accel_redirect(self):
+        response = self.get("products/photo.png")
+        self.assertEqual(
+            response["X-Accel-Redirect"], "/protected-media/" + self.legacy
+        )
+        self.assertEqual(response.content, b"")
+        self.assertIn("max-age=3600", response["Cache-Control"])
+
+    @override_settings(MEDIA_SENDFILE_BACKEND="x-sendfile")
+    def test_x_sendfile(self):
+        response = self.get(self.blob)
+        self.assertEqual(
+            response["X-Sendfile"], os.path.join(self.media_root, self.blob)
+        )
+        self.assertEqual(response.content, b"")
@@ -0,0 +1,92 @@
+from decimal import Decimal
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from womanshop.models import Product, Brand, Category, Style
+from womanshop.facets import facet_index
+from womanshop.pagination import (
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+    keyset_paginate,
+)
+
+
+class CursorPaginationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        facet_index.invalidate()
+        self.category = Category.objects.create(name="bras")
+        style = Style.objects.create(name="lacy")
+        brand = Brand.objects.create(name="AVELIN")
+        # Prices repeat so the (price, id) tie-break is exercised
+        self.products = [
+            Product.objects.create(
+                name=f"Товар {i:02d}",
+                category=self.category,
+                style=style,
+                brand=brand,
+                vendor_code=f"V{i}",
+                collection="Collection",
+                price=Decimal(i % 7),
+                description="Description",
+                sale=False,
+                image1="products/test.jpg",
+            )
+            for i in range(30)
+        ]
+
+    def walk(self, url, params):
+        ids = []
+        cursor = ""
+        while cursor is not None:
+            response = self.client.get(url, dict(params, cursor=cursor))
+            self.assertEqual(response.status_code, 200)
+            json_data = response.json()
+            self.assertNotIn("has_next", json_data)
+            ids.extend(item["id"] for item in json_data["data"])
+            cursor = json_data["next"]
+        return ids
+
+    def test_cursor_roundtrip(self):
+        token = encode_cursor("Товар", 5)
+        self.assertEqual(decode_cursor(token), ("Товар", 5))
+        self.assertIsNone(decode_cursor(""))
+        with self.assertRaises(InvalidCursor):
+            decode_cursor("not a cursor")
+
+    def test_catalog_api_cursor_walk(self):
+        expected = [
+            p.id for p in sorted(self.products, key=lambda p: (-p.price, -p.id))
+        ]
+        params = {"sort_by": "price", "sort_direction": "desc"}
+        self.assertEqual(self.walk(reverse("catalog_api"), params), expected)
+        with override_settings(CATALOG_FACET_INDEX=False):
+            self.assertEqual(self.walk(reverse("catalog_api"), params), expected)
+
+    def test_product_api_cursor_walk(self):
+        params = {"category_by": "bras", "product_id": self.products[0].id}
+        ids = self.walk(reverse("product_api"), params)
+        self.assertEqual(ids, [p.id for p in self.products[1:]])
+
+    def test_keyset_paginate(self):
+        rows, cursor = keyset_paginate(Product.objects.all(), "name", "asc", "", 10)
+        self.assertEqual(rows, self.products[:10])
+        rows, cursor = keyset_paginate(Product.objects.all(), "name", "asc", cursor, 10)
+        self.assertEqual(rows, self.products[10:20])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("catalog_api"), {"cursor": "%%%"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_tampered_price_cursor(self):
+        for value in ("abc", "NaN"):
+            cursor = encode_cursor(value, self.products[0].id)
+            with self.assertRaises(InvalidCursor):
+                keyset_paginate(Product.objects.all(), "price", "asc", cursor, 10)
+            params = {"sort_by": "price", "cursor": cursor}
+            response = self.client.get(reverse("catalog_api"), params)
+            self.assertEqual(response.status_code, 400)
+            with override_settings(CATALOG_FACET_INDEX=False):
+                response = self.client.get(reverse("catalog_api"), params)
+                self.assertEqual(response.status_code, 400)
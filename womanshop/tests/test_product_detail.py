@@ -0,0 +1,130 @@
+from decimal import Decimal
+from django.test import TestCase
+from django.urls import reverse
+from womanshop.models import (
+    Product,
+    ProductVariant,
+    Brand,
+    Category,
+    Style,
+    Color,
+    Size,
+)
+from womanshop.views import get_availability
+
+
+class ProductTestCase(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(
+            name="Product",
+            category=Category.objects.create(name="bras"),
+            style=Style.objects.create(name="lacy"),
+            brand=Brand.objects.create(name="AVELIN"),
+            vendor_code="P1",
+            collection="Collection",
+            price=Decimal("10.00"),
+            description="Description",
+            sale=False,
+            image1="products/test.jpg",
+            image2="products/test.jpg",
+            image3="products/test.jpg",
+            image4="products/test.jpg",
+        )
+        colors = [Color.objects.create(name=name) for name in ("red", "black")]
+        sizes = [Size.objects.create(name=name) for name in ("75B", "75C", "80B")]
+        for i, (color, size) in enumerate(
+            [
+                (c, s)
+                for c in colors
+                for s in sizes
+                if (c.name, s.name) != ("black", "80B")
+            ]
+        ):
+            ProductVariant.objects.create(
+                product=self.product, color=color, size=size, stock=i + 1
+            )
+
+
+class ProductDetailViewTest(ProductTestCase):
+    def test_get_availability(self):
+        with self.assertNumQueries(1):
+            availability = get_availability(self.product.id)
+        self.assertEqual(
+            availability,
+            {
+                "red": {"75B": 1, "75C": 2, "80B": 3},
+                "black": {"75B": 4, "75C": 5},
+            },
+        )
+
+    def test_context_and_json(self):
+        url = reverse("product", args=[self.product.id])
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(
+            response.context["data"],
+            [
+                {"color": "red", "sizes": "75B,75C,80B"},
+                {"color": "black", "sizes": "75B,75C"},
+            ],
+        )
+        self.assertContains(response, 'id="product-availability"')
+        self.assertContains(response, '"black": {"75B": 4, "75C": 5}')
+
+
+class StockAPITest(ProductTestCase):
+    def test_batch_stock(self):
+        other = Product.objects.create(
+            name="Other",
+            category=self.product.category,
+            style=self.product.style,
+            brand=self.product.brand,
+            vendor_code="P2",
+            collection="Collection",
+            price=Decimal("10.00"),
+            description="Description",
+            sale=False,
+            image1="products/test.jpg",
+        )
+        url = reverse("stock_api")
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                url, {"product_id": f"{other.id},{self.product.id}"}
+            )
+        self.assertEqual(
+            response.json(),
+            {
+                "products": {
+                    str(self.product.id): {
+                        "red": {"75B": 1, "75C": 2, "80B": 3},
+                        "black": {"75B": 4, "75C": 5},
+                    },
+                    str(other.id): {},
+                }
+            },
+        )
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_not_modified_until_stock_changes(self):
+        url = reverse("stock_api")
+        params = {"product_id": self.product.id}
+        etag = self.client.get(url, params)["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        variant = ProductVariant.objects.filter(product=self.product).first()
+        variant.stock = 0
+        variant.save()
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["products"][str(self.product.id)]["red"]["75B"], 0
+        )
+
+    def test_invalid_product_ids(self):
+        url = reverse("stock_api")
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {"product_id": "x"}).status_code, 400)
+        response = self.client.get(url, {"product_id": ",".join(map(str, range(101)))})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,178 @@
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from womanshop.models import (
+    Product,
+    ProductCatalogEntry,
+    ProductVariant,
+    ProductRecommendation,
+    Order,
+    OrderItem,
+    UserProfile,
+    Brand,
+    Category,
+    Style,
+    Color,
+    Size,
+)
+from womanshop.recommendations import (
+    _Catalog,
+    price_proximity,
+    rebuild_recommendations,
+    refresh_recommendations,
+)
+
+
+class RecommendationsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.bras = Category.objects.create(name="bras")
+        self.panties = Category.objects.create(name="panties")
+        self.style = Style.objects.create(name="lacy")
+        self.avelin = Brand.objects.create(name="AVELIN")
+        self.milavitsa = Brand.objects.create(name="MILAVITSA")
+        self.lauma = Brand.objects.create(name="LAUMA")
+        self.bra = self.create("Bra", self.bras, self.avelin, "10.00")
+        self.push_up = self.create("Push-up", self.bras, self.avelin, "11.00")
+        self.balconette = self.create("Balconette", self.bras, self.milavitsa, "10.00")
+        self.slip = self.create("Slip", self.panties, self.milavitsa, "50.00")
+        self.thong = self.create("Thong", self.panties, self.lauma, "10.00")
+        # The bra and the thong were bought together once
+        self.order = order = Order.objects.create(
+            user_profile=UserProfile.objects.create(
+                user=User.objects.create_user(username="user", password="password")
+            ),
+            order_number="1",
+            order_total=Decimal("20.00"),
+            status="O",
+        )
+        color = Color.objects.create(name="red")
+        size = Size.objects.create(name="75B")
+        for product in (self.bra, self.thong):
+            variant = ProductVariant.objects.create(
+                product=product, color=color, size=size, stock=5
+            )
+            OrderItem.objects.create(order=order, product_variant=variant)
+
+    def create(self, name, category, brand, price):
+        return Product.objects.create(
+            name=name,
+            category=category,
+            style=self.style,
+            brand=brand,
+            vendor_code=name,
+            collection="Collection",
+            price=Decimal(price),
+            description="Description",
+            sale=False,
+            image1="products/test.jpg",
+        )
+
+    def recommended(self, product):
+        return ProductRecommendation.objects.get(pk=product.id).get_product_ids()
+
+    def test_price_proximity(self):
+        self.assertEqual(price_proximity(Decimal("10"), Decimal("10")), 1.0)
+        self.assertEqual(price_proximity(Decimal("10"), Decimal("20")), 0.0)
+        self.assertEqual(price_proximity(Decimal("0"), Decimal("0")), 1.0)
+
+    def test_rebuild(self):
+        self.assertEqual(rebuild_recommendations(), 5)
+        # Same category and brand first, then same category, then the
+        # co-purchased product; the slip shares nothing with the bra
+        self.assertEqual(
+            self.recommended(self.bra),
+            [self.push_up.id, self.balconette.id, self.thong.id],
+        )
+        self.assertEqual(rebuild_recommendations(limit=1), 5)
+        self.assertEqual(self.recommended(self.bra), [self.push_up.id])
+
+    def test_candidates_match_scoring_every_product(self):
+        # Prices within a factor of two, so no two scores tie at a price
+        # proximity of zero
+        ProductCatalogEntry.objects.all().delete()
+        for i in range(24):
+            self.create(
+                f"Product {i}",
+                (self.bras, self.panties)[i % 2],
+                (self.avelin, self.milavitsa, self.lauma)[i % 3],
+                f"{20 + i * 0.7:.2f}",
+            )
+        catalog = _Catalog()
+        for product_id in catalog.entries:
+            others = [other for other in catalog.entries if other != product_id]
+            others.sort(key=lambda other: (-catalog.score(product_id, other), other))
+            self.assertEqual(catalog.recommend(product_id, 3), others[:3])
+
+    def test_new_product_and_refresh(self):
+        rebuild_recommendations()
+        wired = self.create("Wired", self.bras, self.avelin, "10.00")
+        self.assertEqual(self.recommended(wired)[0], self.bra.id)
+        self.assertNotIn(wired.id, self.recommended(self.bra))
+        self.assertEqual(refresh_recommendations(self.bra.id, limit=1), [wired.id])
+        self.assertEqual(self.recommended(self.bra), [wired.id])
+
+    def test_unpaid_orders_ignored(self):
+        Order.objects.filter(pk=self.order.pk).update(status="P")
+        rebuild_recommendations()
+        self.assertNotIn(self.thong.id, self.recommended(self.bra))
+        self.assertEqual(refresh_recommendations(self.thong.id), [self.slip.id])
+
+    def test_refresh_loads_only_candidates(self):
+        with self.assertNumQueries(7):
+            # The entry, the orders containing it and the candidates, then
+            # update_or_create with its savepoint
+            product_ids = refresh_recommendations(self.thong.id)
+        # The co-purchased bra and the slip of the same category
+        self.assertEqual(product_ids, [self.slip.id, self.bra.id])
+
+    def test_command(self):
+        call_command("rebuild_recommendations", "--limit", "2", stdout=StringIO())
+        self.assertEqual(
+            self.recommended(self.bra), [self.push_up.id, self.balconette.id]
+        )
+
+    def test_product_api(self):
+        rebuild_recommendations()
+        params = {"category_by": "bras", "product_id": self.bra.id}
+        with self.assertNumQueries(2):
+            # The recommendation list and its catalog entries
+            response = self.client.get(reverse("product_api"), params)
+        json_data = response.json()
+        self.assertFalse(json_data["has_next"])
+        self.assertEqual(
+            [item["id"] for item in json_data["data"]],
+            [self.push_up.id, self.balconette.id, self.thong.id],
+        )
+
+    def test_product_api_cursor(self):
+        wired = self.create("Wired", self.bras, self.avelin, "10.00")
+        plunge = self.create("Plunge", self.bras, self.avelin, "10.00")
+        rebuild_recommendations()
+        url = reverse("product_api")
+        params = {"category_by": "bras", "product_id": self.bra.id}
+        ids = []
+        cursor = ""
+        while cursor is not None:
+            json_data = self.client.get(url, dict(params, cursor=cursor)).json()
+            ids.extend(item["id"] for item in json_data["data"])
+            cursor = json_data["next"]
+        self.assertEqual(
+            ids,
+            [wired.id, plunge.id, self.push_up.id, self.balconette.id, self.thong.id],
+        )
+        response = self.client.get(url, dict(params, cursor="%%%"))
+        self.assertEqual(response.status_code, 400)
+
+    def test_product_api_falls_back_to_category(self):
+        ProductRecommendation.objects.all().delete()
+        params = {"category_by": "bras", "product_id": self.bra.id}
+        response = self.client.get(reverse("product_api"), params)
+        self.assertEqual(
+            [item["id"] for item in response.json()["data"]],
+            [self.push_up.id, self.balconette.id],
+        )
@@ -0,0 +1,183 @@
+import base64
+import io
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from womanshop.models import Product, ProductCatalogEntry, Brand, Category, Style
+from womanshop.renditions import (
+    generate_renditions,
+    refresh_product_renditions,
+    renditions_outdated,
+    rendition_name,
+    rendition_url,
+    srcset,
+)
+
+
+def create_image(name="photo.png", size=(500, 400), mode="RGBA", color="red"):
+    output = io.BytesIO()
+    Image.new(mode, size, color=color).save(output, format="PNG")
+    return SimpleUploadedFile(name, output.getvalue(), content_type="image/png")
+
+
+class RenditionsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        # Render inside the request; the job queue is tested in test_jobs.py
+        settings = override_settings(MEDIA_ROOT=media_root, IMAGE_JOBS_ASYNC=False)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.category = Category.objects.create(name="bras")
+        self.style = Style.objects.create(name="lacy")
+        self.brand = Brand.objects.create(name="AVELIN")
+
+    def create(self, vendor_code, **images):
+        return Product.objects.create(
+            name="Product",
+            category=self.category,
+            style=self.style,
+            brand=self.brand,
+            vendor_code=vendor_code,
+            collection="Collection",
+            price=Decimal("10.00"),
+            description="Description",
+            sale=False,
+            **images,
+        )
+
+    def test_generated_on_upload(self):
+        product = self.create(
+            "R1", image1=create_image(), image2=create_image(size=(50, 40))
+        )
+        manifest = product.renditions["image1"]
+        self.assertEqual(manifest["name"], product.image1.name)
+        self.assertEqual(manifest["widths"], [68, 180, 360])
+        self.assertEqual((manifest["width"], manifest["height"]), (500, 400))
+        prefix, data = manifest["placeholder"].split(",")
+        self.assertEqual(prefix, "data:image/jpeg;base64")
+        image = Image.open(io.BytesIO(base64.b64decode(data)))
+        self.assertEqual((image.format, image.size), ("JPEG", (16, 13)))
+        # Images narrower than every width get a single rendition
+        self.assertEqual(product.renditions["image2"]["widths"], [50])
+        self.assertNotIn("image3", product.renditions)
+        with default_storage.open(
+            rendition_name(manifest["digest"], 180, "jpeg")
+        ) as file:
+            image = Image.open(file)
+            self.assertEqual((image.format, image.mode), ("JPEG", "RGB"))
+            self.assertEqual(image.size, (180, 144))
+        with default_storage.open(
+            rendition_name(manifest["digest"], 360, "webp")
+        ) as file:
+            self.assertEqual(Image.open(file).format, "WEBP")
+        self.assertEqual(
+            Product.objects.get(pk=product.pk).renditions, product.renditions
+        )
+        entry = ProductCatalogEntry.objects.get(pk=product.pk)
+        self.assertEqual(entry.image1_renditions, manifest)
+
+    def test_identical_images_share_renditions(self):
+        first = self.create("R1", image1=create_image())
+        second = self.create("R2", image1=create_image())
+        # The content-addressed storage keeps a single copy
+        self.assertEqual(first.image1.name, second.image1.name)
+        self.assertEqual(
+            first.renditions["image1"]["digest"],
+            second.renditions["image1"]["digest"],
+        )
+        other = self.create("R3", image1=create_image(color="blue"))
+        self.assertNotEqual(
+            first.renditions["image1"]["digest"],
+            other.renditions["image1"]["digest"],
+        )
+
+    def test_incomplete_manifest_is_regenerated(self):
+        product = self.create("R1", image1=create_image())
+        manifest = product.renditions["image1"]
+        Product.objects.filter(pk=product.pk).update(
+            renditions={"image1": {"name": product.image1.name, "widths": [68]}}
+        )
+        product.refresh_from_db()
+        self.assertTrue(renditions_outdated(product))
+        self.assertTrue(refresh_product_renditions(product))
+        self.assertEqual(product.renditions["image1"], manifest)
+        self.assertFalse(renditions_outdated(product))
+
+    def test_missing_file(self):
+        product = self.create("R1", image1="products/missing.jpg")
+        self.assertIsNone(generate_renditions(product.image1))
+        # Recorded by name, so later saves do not queue the same failure
+        marker = {"image1": {"name": "products/missing.jpg"}}
+        self.assertEqual(Product.objects.get(pk=product.pk).renditions, marker)
+        self.assertFalse(renditions_outdated(product))
+        product.name = "Renamed"
+        with mock.patch(
+            "womanshop.renditions.generate_renditions"
+        ) as generate_renditions_mock:
+            product.save()
+        generate_renditions_mock.assert_not_called()
+        self.assertEqual(rendition_url(marker["image1"], 100), "")
+        self.assertEqual(srcset(marker["image1"]), "")
+        self.assertEqual(
+            ProductCatalogEntry.objects.get(pk=product.pk).image1_renditions,
+            marker["image1"],
+        )
+        response = self.client.get(reverse("catalog_api"))
+        self.assertEqual(response.json()["data"][0]["image1_srcset"], "")
+
+    def test_urls(self):
+        manifest = {"name": "products/a.png", "digest": "ab" * 16, "widths": [68, 180]}
+        self.assertEqual(
+            rendition_url(manifest, 100),
+            f"/media/renditions/ab/{'ab' * 16}_180.jpg",
+        )
+        self.assertEqual(rendition_url(manifest, 800, "webp")[-9:], "_180.webp")
+        self.assertEqual(srcset(manifest, "webp").count("w, "), 1)
+        self.assertEqual(rendition_url({}, 100), "")
+        self.assertEqual(srcset({}), "")
+
+    def test_template_tag(self):
+        product = self.create("R1", image1=create_image(), image2="products/a.jpg")
+        template = Template(
+            "{% load renditions %}"
+            '{% responsive_image product.image1 436 id="main" %}'
+            "{% responsive_image product.image2 110 %}"
+        )
+        html = template.render(Context({"product": product}))
+        digest = product.renditions["image1"]["digest"]
+        self.assertIn('<picture><source type="image/webp"', html)
+        self.assertIn(f'src="/media/renditions/{digest[:2]}/{digest}_360.jpg"', html)
+        self.assertIn(f"{digest}_68.jpg 68w", html)
+        self.assertIn('id="main"', html)
+        self.assertIn('sizes="436px"', html)
+        self.assertIn('height="400"', html)
+        self.assertIn('width="500"', html)
+        self.assertIn(
+            f'style="background:url({product.renditions["image1"]["placeholder"]})',
+            html,
+        )
+        self.assertIn('<img alt="" src="/media/products/a.jpg">', html)
+
+    def test_catalog_api_and_serializer(self):
+        product = self.create("R1", image1=create_image())
+        data = self.client.get(reverse("catalog_api")).json()["data"][0]
+        self.assertTrue(data["image1"].endswith("_360.jpg"))
+        self.assertIn("68w", data["image1_srcset"])
+        self.assertIn(".webp 360w", data["image1_webp_srcset"])
+        self.assertEqual((data["image1_width"], data["image1_height"]), (500, 400))
+        self.assertTrue(data["image1_placeholder"].startswith("data:image/jpeg"))
+
+        response = self.client.get(reverse("product-detail", args=[product.pk]))
+        renditions = response.json()["renditions"]["image1"]
+        self.assertEqual([item["width"] for item in renditions], [68, 180, 360])
+        self.assertTrue(renditions[0]["webp"].startswith("http://testserver/media/"))
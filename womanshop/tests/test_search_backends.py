@@ -0,0 +1,76 @@
+from decimal import Decimal
+from unittest import skipUnless
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from womanshop.models import Product, Brand, Category, Style
+from womanshop.search_backends import (
+    PortableSearchBackend,
+    PostgresSearchBackend,
+    get_search_backend,
+    get_search_config,
+)
+
+
+class SearchBackendTestCase(TestCase):
+    def setUp(self):
+        self.brand = Brand.objects.create(name="MILAVITSA")
+        self.bra = self.create("Бюстгальтер Lace", "B1", "Кружевной бюстгальтер")
+        self.body = self.create("Body Amelie", "B2", "Боди из кружева")
+
+    def create(self, name, vendor_code, description):
+        return Product.objects.create(
+            name=name,
+            category=Category.objects.create(name=f"category {vendor_code}"),
+            style=Style.objects.create(name=f"style {vendor_code}"),
+            brand=self.brand,
+            vendor_code=vendor_code,
+            collection="Collection",
+            price=Decimal("10.00"),
+            description=description,
+            sale=False,
+            image1="products/test.jpg",
+        )
+
+    def ids(self, query):
+        products = get_search_backend().search(Product.objects.all(), query)
+        return list(products.values_list("id", flat=True))
+
+
+class PortableSearchBackendTest(SearchBackendTestCase):
+    @override_settings(SEARCH_BACKEND="womanshop.search_backends.PortableSearchBackend")
+    def test_search(self):
+        self.assertIsInstance(get_search_backend(), PortableSearchBackend)
+        self.assertEqual(self.ids("body"), [self.body.id])
+        self.assertEqual(self.ids("milavitsa"), [self.bra.id, self.body.id])
+        self.assertEqual(self.ids("lace бюстгальтер"), [self.bra.id])
+        self.assertEqual(self.ids("b2"), [self.body.id])
+        self.assertEqual(self.ids(""), [])
+
+    def test_product_api_search(self):
+        response = self.client.get(reverse("product-list-api"), {"search": "amelie"})
+        self.assertEqual(
+            [product["name"] for product in response.json()["results"]],
+            ["Body Amelie"],
+        )
+
+    @override_settings(SEARCH_CONFIG="simple")
+    def test_search_config(self):
+        # One source for the stored vectors and the queries
+        self.assertEqual(get_search_config(), "simple")
+        self.assertEqual(PostgresSearchBackend().config, "simple")
+
+
+@skipUnless(connection.vendor == "postgresql", "PostgreSQL full-text search")
+class PostgresSearchBackendTest(SearchBackendTestCase):
+    def test_search_ranks_name_matches_first(self):
+        self.assertIsInstance(get_search_backend(), PostgresSearchBackend)
+        # Stemmed: "бюстгальтеры" matches "бюстгальтер"
+        self.assertEqual(self.ids("бюстгальтеры"), [self.bra.id])
+        self.assertEqual(self.ids("кружевной"), [self.bra.id])
+        self.assertEqual(self.ids("milavitsa"), [self.bra.id, self.body.id])
+
+    def test_brand_rename_updates_vectors(self):
+        self.brand.name = "LAUMA"
+        self.brand.save()
+        self.assertEqual(self.ids("lauma"), [self.bra.id, self.body.id])
@@ -0,0 +1,108 @@
+from decimal import Decimal
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from womanshop.catalog_cache import bump_catalog_version
+from womanshop.models import Product, Brand, Category, Style
+from womanshop.search_index import search_index, tokenize
+
+
+class SearchIndexTest(TestCase):
+    def setUp(self):
+        search_index.invalidate()
+        self.category = Category.objects.create(name="bras")
+        self.style = Style.objects.create(name="lacy")
+        self.brand = Brand.objects.create(name="MILAVITSA")
+        self.bra = self.create("Бюстгальтер Ёлка", "S1", "Winter", "Кружевной")
+        self.body = self.create("Body Amelie", "S2", "Amelie", "Lace bodysuit")
+        self.panties = self.create("Трусы Classic", "S3", "Amelie", "Хлопок")
+
+    def create(self, name, vendor_code, collection, description):
+        return Product.objects.create(
+            name=name,
+            category=self.category,
+            style=self.style,
+            brand=self.brand,
+            vendor_code=vendor_code,
+            collection=collection,
+            price=Decimal("10.00"),
+            description=description,
+            sale=False,
+            image1="products/test.jpg",
+        )
+
+    def ids(self, query, limit=10):
+        return [product_id for product_id, _ in search_index.search(query, limit)]
+
+    def search(self, query):
+        return self.client.get(reverse("search"), {"q": query}).json()
+
+    def test_tokenize(self):
+        self.assertEqual(
+            tokenize("Бюстгальтер ЁЛКА, push-up"), ["бюстгальтер", "елка", "push", "up"]
+        )
+
+    def test_exact_and_prefix(self):
+        self.assertEqual(self.ids("бюстгальтер"), [self.bra.id])
+        self.assertEqual(self.ids("бюст"), [self.bra.id])
+        self.assertEqual(self.ids("ёлк"), [self.bra.id])
+        self.assertEqual(self.ids("s2"), [self.body.id])
+        self.assertEqual(
+            self.ids("milav"), [self.bra.id, self.body.id, self.panties.id]
+        )
+
+    def test_ranking_and_limit(self):
+        # The name match ranks above the collection-only match
+        self.assertEqual(self.ids("amelie"), [self.body.id, self.panties.id])
+        self.assertEqual(self.ids("amelie", limit=1), [self.body.id])
+        self.assertEqual(self.ids("amelie трусы"), [self.panties.id])
+
+    def test_fuzzy(self):
+        self.assertEqual(self.ids("бюстгалтер"), [self.bra.id])
+        self.assertEqual(self.ids("amelei")[:2], [self.body.id, self.panties.id])
+        self.assertEqual(self.ids("zzzzzz"), [])
+
+    def test_signals_update_index(self):
+        self.ids("body")
+        self.body.name = "Corset Amelie"
+        self.body.save()
+        self.assertEqual(self.ids("body"), [self.body.id])  # description
+        self.assertEqual(self.ids("corset"), [self.body.id])
+        self.panties.delete()
+        self.assertEqual(self.ids("трусы"), [])
+        self.brand.name = "LAUMA"
+        self.brand.save()
+        self.assertEqual(self.ids("lauma"), [self.bra.id, self.body.id])
+
+    def test_local_changes_not_rebuilt(self):
+        self.ids("body")
+        with mock.patch.object(search_index, "build") as build:
+            self.body.name = "Corset Amelie"
+            with self.captureOnCommitCallbacks(execute=True):
+                self.body.save()
+            self.assertEqual(self.ids("corset"), [self.body.id])
+        build.assert_not_called()
+
+    def test_rebuilt_on_catalog_version_change(self):
+        self.assertEqual(self.search("omega"), [])
+        # A rename by another process only reaches this one through the
+        # shared catalog version
+        Product.objects.filter(pk=self.body.pk).update(name="Omega")
+        bump_catalog_version()
+        self.assertEqual(self.search("omega"), [{"name": "Omega", "id": self.body.id}])
+
+    def test_search_view(self):
+        response = self.client.get(reverse("search"), {"q": "Бюст"})
+        self.assertEqual(
+            response.json(), [{"name": "Бюстгальтер Ёлка", "id": self.bra.id}]
+        )
+        with override_settings(SEARCH_INDEX=False):
+            response = self.client.get(reverse("search"), {"q": "Amelie"})
+        # The database backend also searches the collection
+        self.assertEqual(
+            response.json(),
+            [
+                {"name": "Body Amelie", "id": self.body.id},
+                {"name": "Трусы Classic", "id": self.panties.id},
+            ],
+        )
@@ -0,0 +1,89 @@
+import threading
+import time
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from womanshop import catalog_cache
+from womanshop.singleflight import SingleFlight
+
+
+class SingleFlightTest(SimpleTestCase):
+    def test_concurrent_calls_share_one_computation(self):
+        group = SingleFlight()
+        barrier = threading.Barrier(7)
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return object()
+
+        results = []
+
+        def run():
+            barrier.wait(5)
+            results.append(group.do("k", compute))
+
+        threads = [threading.Thread(target=run) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        barrier.wait(5)
+        # Keep the leader busy while the five other threads join it
+        time.sleep(0.2)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 6)
+        # Every thread got the very object the leader computed
+        self.assertEqual(len({id(result) for result in results}), 1)
+        self.assertEqual(group.do("k", lambda: "again"), "again")
+
+    def test_waiter_gives_up_after_timeout(self):
+        group = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+
+        def stuck():
+            started.set()
+            release.wait(5)
+            return "stuck"
+
+        leader = threading.Thread(target=group.do, args=("k", stuck))
+        leader.start()
+        started.wait(5)
+        self.assertEqual(group.do("k", lambda: "own", timeout=0.05), "own")
+        release.set()
+        leader.join(5)
+
+    def test_error_is_shared_and_cleared(self):
+        group = SingleFlight()
+        with self.assertRaises(ValueError):
+            group.do("k", lambda: int("x"))
+        self.assertEqual(group.do("k", lambda: 1), 1)
+
+
+@override_settings(CATALOG_CACHE_LOCK=True, CATALOG_CACHE_LOCK_TIMEOUT=2)
+class CrossProcessLockTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_waits_for_the_lock_holder(self):
+        cache.add("key:lock", 1)
+        threading.Timer(0.2, lambda: cache.set("key", {"data": 1})).start()
+        data, hit = catalog_cache.get_or_build("key", self.fail)
+        self.assertEqual((data, hit), ({"data": 1}, False))
+
+    def test_builds_when_lock_is_free(self):
+        data, hit = catalog_cache.get_or_build("key", lambda: {"data": 2})
+        self.assertEqual((data, hit), ({"data": 2}, False))
+        self.assertIsNone(cache.get("key:lock"))
+        self.assertEqual(
+            catalog_cache.get_or_build("key", self.fail), ({"data": 2}, True)
+        )
+
+    def test_takes_over_an_abandoned_lock(self):
+        cache.add("key:lock", 1)
+        threading.Timer(0.2, lambda: cache.delete("key:lock")).start()
+        data, _ = catalog_cache.get_or_build("key", lambda: {"data": 3})
+        self.assertEqual(data, {"data": 3})
@@ -0,0 +1,98 @@
+import gzip
+import io
+import os
+import shutil
+import tempfile
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase
+from PIL import Image
+from womanshop.static_storage import (
+    CompressedManifestStaticFilesStorage,
+    compress,
+    optimize_png,
+)
+
+CSS = (
+    "body { background: url(../img/logo.png); }\n"
+    ".card { background: url(image.png); }\n" + "/* padding */\n" * 40
+)
+
+
+def png_bytes():
+    # Uncompressed stripes, so both the optimizer and WebP beat the original
+    output = io.BytesIO()
+    image = Image.new("RGB", (64, 64), "white")
+    for x in range(0, 64, 8):
+        image.paste((200, 20, 100), (x, 0, x + 4, 64))
+    image.save(output, format="PNG", compress_level=0)
+    return output.getvalue()
+
+
+class CompressedManifestStaticFilesStorageTest(SimpleTestCase):
+    def setUp(self):
+        self.source_root = tempfile.mkdtemp()
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source_root)
+        self.addCleanup(shutil.rmtree, self.static_root)
+        files = {
+            "css/styles.css": CSS.encode(),
+            "img/logo.png": png_bytes(),
+            "js/tiny.js": b"let a = 1;",
+        }
+        for name, content in files.items():
+            for root in (self.source_root, self.static_root):
+                os.makedirs(os.path.join(root, os.path.dirname(name)), exist_ok=True)
+                with open(os.path.join(root, name), "wb") as file:
+                    file.write(content)
+
+    def storage(self):
+        return CompressedManifestStaticFilesStorage(
+            location=self.static_root, base_url="/static/"
+        )
+
+    def collect(self):
+        source = FileSystemStorage(location=self.source_root)
+        paths = {
+            name: (source, name)
+            for name in ("css/styles.css", "img/logo.png", "js/tiny.js")
+        }
+        results = list(self.storage().post_process(paths))
+        for _, _, processed in results:
+            self.assertNotIsInstance(processed, Exception)
+
+    def read(self, name):
+        with open(os.path.join(self.static_root, name), "rb") as file:
+            return file.read()
+
+    def test_without_manifest(self):
+        storage = self.storage()
+        self.assertEqual(storage.url("/img/logo.png"), "/static/img/logo.png")
+        self.assertEqual(storage.url("css/styles.css"), "/static/css/styles.css")
+
+    def test_post_process(self):
+        self.collect()
+        storage = self.storage()
+        png = storage.stored_name("/img/logo.png")
+        css = storage.stored_name("css/styles.css")
+        self.assertRegex(png, r"^img/logo\.[0-9a-f]{12}\.png$")
+        self.assertRegex(css, r"^css/styles\.[0-9a-f]{12}\.css$")
+        self.assertLess(len(self.read(png)), len(png_bytes()))
+        self.assertLess(len(self.read(png + ".webp")), len(self.read(png)))
+        with Image.open(io.BytesIO(self.read(png + ".webp"))) as image:
+            self.assertEqual(image.format, "WEBP")
+
+        content = self.read(css)
+        self.assertIn(f'url("../{png}")'.encode(), content)
+        self.assertIn(b"url(image.png)", content)
+        self.assertEqual(gzip.decompress(self.read(css + ".gz")), content)
+        tiny = storage.stored_name("js/tiny.js")
+        self.assertFalse(os.path.exists(os.path.join(self.static_root, tiny + ".gz")))
+        # Missing files keep their plain name
+        self.assertEqual(storage.url("missing.js"), "/static/missing.js")
+
+    def test_helpers(self):
+        data = png_bytes()
+        self.assertLess(len(optimize_png(data)), len(data))
+        self.assertEqual(optimize_png(b"not a png"), b"not a png")
+        self.assertEqual(compress(b"x"), {})
+        self.assertIn(".gz", compress(b"body {}\n" * 100))
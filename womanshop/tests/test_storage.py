@@ -0,0 +1,176 @@
+import hashlib
+import io
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from womanshop.models import (
+    MediaBlob,
+    Product,
+    ProductCatalogEntry,
+    Brand,
+    Category,
+    Style,
+)
+from womanshop.storage import blob_name, is_blob_name, product_image_storage
+
+
+def image_bytes(color="red"):
+    output = io.BytesIO()
+    Image.new("RGB", (40, 30), color=color).save(output, format="PNG")
+    return output.getvalue()
+
+
+def create_image(color="red", name="Rectangle_30.png"):
+    return SimpleUploadedFile(name, image_bytes(color), content_type="image/png")
+
+
+class ContentAddressedStorageTest(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root, IMAGE_JOBS_ASYNC=False)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.category = Category.objects.create(name="bras")
+        self.style = Style.objects.create(name="lacy")
+        self.brand = Brand.objects.create(name="AVELIN")
+
+    def create(self, vendor_code, **images):
+        return Product.objects.create(
+            name="Product",
+            category=self.category,
+            style=self.style,
+            brand=self.brand,
+            vendor_code=vendor_code,
+            collection="Collection",
+            price=Decimal("10.00"),
+            description="Description",
+            sale=False,
+            **images,
+        )
+
+    def refcount(self, name):
+        return MediaBlob.objects.get(pk=name).refcount
+
+    def test_save(self):
+        digest = hashlib.sha256(b"data").hexdigest()
+        name = product_image_storage.save("products/a.TXT", ContentFile(b"data"))
+        self.assertEqual(name, f"products/{digest[:2]}/{digest}.txt")
+        self.assertEqual(blob_name("products/", digest, ".TXT"), name)
+        self.assertTrue(is_blob_name(name))
+        self.assertFalse(is_blob_name("products/Rectangle_30_2cpD8S4.png"))
+        self.assertEqual(
+            product_image_storage.save("products/b.txt", ContentFile(b"data")), name
+        )
+        _, files = product_image_storage.listdir(f"products/{digest[:2]}")
+        self.assertEqual(files, [f"{digest}.txt"])
+
+    def test_reference_counts(self):
+        first = self.create("S1", image1=create_image(), image2=create_image())
+        second = self.create("S2", image1=create_image(name="other.png"))
+        name = first.image1.name
+        self.assertEqual((first.image2.name, second.image1.name), (name, name))
+        self.assertEqual(self.refcount(name), 3)
+        self.assertEqual(MediaBlob.objects.get(pk=name).size, len(image_bytes()))
+
+        first.image2 = create_image(color="blue")
+        first.save()
+        blue = first.image2.name
+        self.assertEqual((self.refcount(name), self.refcount(blue)), (2, 1))
+        # Saving without changes keeps the counts
+        first.save()
+        self.assertEqual((self.refcount(name), self.refcount(blue)), (2, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.refcount(name), 1)
+        self.assertFalse(MediaBlob.objects.filter(pk=blue).exists())
+        self.assertFalse(default_storage.exists(blue))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(default_storage.exists(name))
+
+    def test_renditions_released_with_blob(self):
+        product = self.create("S1", image1=create_image())
+        digest = product.renditions["image1"]["digest"]
+        renditions = f"renditions/{digest[:2]}"
+        self.assertTrue(default_storage.listdir(renditions)[1])
+        shared = self.create("S2", image1=create_image())
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        # Still used by the other product
+        self.assertTrue(default_storage.listdir(renditions)[1])
+
+        shared.image1 = create_image(color="blue")
+        with self.captureOnCommitCallbacks(execute=True):
+            shared.save()
+        self.assertEqual(default_storage.listdir(renditions)[1], [])
+        blue = shared.renditions["image1"]["digest"]
+        self.assertTrue(default_storage.listdir(f"renditions/{blue[:2]}")[1])
+
+    def test_dedupe_media(self):
+        for filename in ("Rectangle_30.png", "Rectangle_30_2cpD8S4.png"):
+            default_storage.save(f"products/{filename}", ContentFile(image_bytes()))
+        default_storage.save("products/blue.png", ContentFile(image_bytes("blue")))
+        default_storage.save("products/unused.png", ContentFile(b"unused"))
+        first = self.create(
+            "S1",
+            image1="products/Rectangle_30.png",
+            image2="products/blue.png",
+            image3="products/missing.png",
+        )
+        second = self.create("S2", image1="products/Rectangle_30_2cpD8S4.png")
+        Product.objects.filter(pk=first.pk).update(
+            renditions={"image1": {"name": "products/Rectangle_30.png"}}
+        )
+        self.assertFalse(MediaBlob.objects.exists())
+
+        output = io.StringIO()
+        call_command("dedupe_media", "--dry-run", stdout=output)
+        self.assertIn("Would move 4 files, 1 duplicates", output.getvalue())
+        self.assertTrue(default_storage.exists("products/Rectangle_30.png"))
+
+        output = io.StringIO()
+        with self.captureOnCommitCallbacks() as callbacks:
+            call_command("dedupe_media", "--delete-unreferenced", stdout=output)
+            # The old files outlive the transaction pointing products away
+            self.assertTrue(default_storage.exists("products/Rectangle_30.png"))
+        for callback in callbacks:
+            callback()
+        self.assertIn("updated 2 products; 2 files referenced, 1", output.getvalue())
+        first.refresh_from_db()
+        second.refresh_from_db()
+        name = first.image1.name
+        self.assertTrue(is_blob_name(name))
+        self.assertEqual(second.image1.name, name)
+        self.assertEqual(first.image3.name, "products/missing.png")
+        self.assertEqual(first.renditions["image1"]["name"], name)
+        self.assertEqual(
+            (self.refcount(name), self.refcount(first.image2.name)), (2, 1)
+        )
+        _, files = default_storage.listdir("products")
+        self.assertEqual(files, [])
+        self.assertEqual(
+            ProductCatalogEntry.objects.get(pk=first.pk).image1_url, first.image1.url
+        )
+
+    def test_dedupe_media_interrupted(self):
+        default_storage.save("products/legacy.png", ContentFile(image_bytes()))
+        product = self.create("S1", image1="products/legacy.png")
+        with mock.patch(
+            "womanshop.management.commands.dedupe_media.recount",
+            side_effect=RuntimeError,
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertRaises(RuntimeError):
+                    call_command("dedupe_media", stdout=io.StringIO())
+        product.refresh_from_db()
+        self.assertEqual(product.image1.name, "products/legacy.png")
+        self.assertTrue(default_storage.exists("products/legacy.png"))
@@ -7,6 +7,11 @@ urlpatterns = [
     path("", views.IndexView.as_view(), name="index"),
     path("catalog/", views.CatalogView.as_view(), name="catalog"),
     path("catalog_api/", views.catalog_api, name="catalog_api"),
+    path(
+        "catalog_api/cache_stats/",
+        views.CatalogCacheStatsView.as_view(),
+        name="catalog_cache_stats",
+    ),
     path(
         "product/<int:product_id>/",
         views.ProductDetailView.as_view(),
@@ -35,6 +40,7 @@ urlpatterns = [
         name="cart_quantity_update",
     ),
     path("product_api/", views.product_api, name="product_api"),
+    path("stock_api/", views.stock_api, name="stock_api"),
     path("add_favorite/", views.AddFavorite.as_view(), name="add_favorite"),
     path(
         "remove_from_favorites/",
@@ -62,4 +68,5 @@ urlpatterns = [
         name="payment_canceled",
     ),
     path("search/", views.search_view, name="search"),
+    path("autocomplete/", views.autocomplete_view, name="autocomplete"),
 ]
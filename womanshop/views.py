@@ -1,5 +1,6 @@
 from decimal import Decimal
 from datetime import datetime
+import hashlib
 import json
 from typing import Any, Dict
 from django.shortcuts import (
@@ -12,12 +13,16 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.models import User
 from django.views import View
 from django.views.generic import TemplateView
-from django.db.models import Q
+from django.db.models import Q, Count, F
 from django.db import transaction
 from django.core.paginator import Paginator
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.utils.http import urlencode
+from django.views.decorators.http import condition
 from django.conf import settings
+from django.core.cache import cache
 from paypal.standard.forms import PayPalPaymentsForm
 from .models import (
     UserProfile,
@@ -28,8 +33,19 @@ from .models import (
     Category,
     Order,
     OrderItem,
+    ProductCatalogEntry,
+    ProductRecommendation,
+    Favorite,
 )
 from .forms import UserProfileForm
+from . import carts, catalog_cache
+from .dimensions import dimensions
+from .facets import facet_index, parse_price, SORT_FIELDS, DEFAULT_SORT
+from .search_index import search_index
+from .search_backends import get_search_backend
+from .autocomplete import autocomplete
+from .renditions import rendition_url, srcset
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_paginate
 
 
 # Create your views here.
@@ -69,7 +85,10 @@ BRANDS = {
     "TEATRO",
     "TRIUMPH",
 }
-SIZE = {"80B", "80C", "80D", "80E", "80F"}
+# Maximum number of products per stock_api request
+STOCK_API_MAX_PRODUCTS = 100
+# Displayed width in CSS pixels of the image of a catalog card
+CARD_IMAGE_WIDTH = 273
 
 
 class IndexView(TemplateView):
@@ -96,7 +115,7 @@ class IndexView(TemplateView):
         """
 
         context = super().get_context_data(**kwargs)
-        context["item_in_cart"] = len(self.request.session.get("cart", []))
+        context["item_in_cart"] = carts.cart_size(self.request)
         return context
 
 
@@ -195,36 +214,6 @@ def filter_data(request, data):
     ]
 
 
-def filters_categors_xxl():
-    """
-    Retrieves the product_id values of ProductVariant objects that have a size name in the SIZE list.
-
-    Returns:
-        JsonResponse: The JSON response containing the filtered product_id values. If no matching product_id values are found, an empty JSON response is returned.
-    """
-    size_xxl_id = ProductVariant.objects.filter(size__name__in=SIZE).values(
-        "product_id"
-    )
-    if not size_xxl_id:
-        data = {"data": []}
-        return JsonResponse(data)
-    return Product.objects.filter(id__in=size_xxl_id).values("id")
-
-
-def filters_categors_sale():
-    """
-    Retrieves the id values of Product objects that have the sale field set to True.
-
-    Returns:
-        JsonResponse: The JSON response containing the filtered id values. If no matching id values are found, an empty JSON response is returned.
-    """
-    product_sale = Product.objects.filter(sale=True).values("id")
-    if not product_sale:
-        data = {"data": []}
-        return JsonResponse(data)
-    return product_sale
-
-
 def filters_catalog_products(
     categors, style, brand, startprice, endprice, xxl, sale, sortdirect, sortby
 ):
@@ -237,35 +226,36 @@ def filters_catalog_products(
         brand (list): The list of brand names to filter by.
         startprice (int): The minimum price to filter by.
         endprice (int): The maximum price to filter by.
-        xxl (set): The set of product_id values for the "XXL" category.
-        sale (set): The set of id values for the "sale" category.
+        xxl (bool): Only products that have a large size variant ("XXL" category).
+        sale (bool): Only products on sale ("sale" category).
         sortdirect (str): The sort direction ("asc" or "desc").
         sortby (str): The field to sort by.
 
     Returns:
-        queryset: The filtered and sorted queryset of Product objects.
+        queryset: The filtered and sorted queryset of ProductCatalogEntry objects.
     """
     filters = Q()
     if categors:
-        filters &= Q(category__name__in=categors)
+        filters &= Q(category_name__in=categors)
     if style:
-        filters &= Q(style__name__in=style)
+        filters &= Q(style_name__in=style)
     if brand:
-        filters &= Q(brand__name__in=brand)
+        filters &= Q(brand_name__in=brand)
     if startprice:
         filters &= Q(price__gt=startprice)
     if endprice:
         filters &= Q(price__lt=endprice)
-    # Determine the sort direction
+    # Determine the sort field and direction
+    sortby = SORT_FIELDS.get(sortby, SORT_FIELDS[DEFAULT_SORT])
     if sortdirect == "desc":
         sortby = f"-{sortby}"
     # Apply additional filters based on "XXL" or "sale" category
     if xxl:
-        filters &= Q(id__in=xxl)
+        filters &= Q(has_large_size=True)
     if sale:
-        filters &= Q(id__in=sale)
-    # Filter and sort the products
-    return Product.objects.filter(filters).order_by(sortby)
+        filters &= Q(sale=True)
+    # Filter and sort the catalog entries
+    return ProductCatalogEntry.objects.filter(filters).order_by(sortby)
 
 
 def paginator_products(products, pg_number, number):
@@ -284,61 +274,250 @@ def paginator_products(products, pg_number, number):
     return paginator.get_page(pg_number)
 
 
-def create_response_data(pg_obj):
+def serialize_products(products):
     """
-    Create response data for a paginated object.
+    Serialize a page of catalog entries for the catalog cards.
+
+    ``image1`` is the rendition that fits a card, or the original image if
+    it has no renditions yet; the ``srcset`` values list all renditions, and
+    the intrinsic size and placeholder let the card lay out before loading.
 
     Args:
-        pg_obj (Paginator): The paginated object.
+        products (iterable): The ProductCatalogEntry objects on the page.
+
+    Returns:
+        list: The list of product dictionaries.
+
+    """
+    return [
+        {
+            "name": product.name,
+            "price": product.price,
+            "brand": product.brand_name,
+            "image1": rendition_url(product.image1_renditions, CARD_IMAGE_WIDTH)
+            or product.image1_url,
+            "image1_srcset": srcset(product.image1_renditions, "jpeg"),
+            "image1_webp_srcset": srcset(product.image1_renditions, "webp"),
+            "image1_width": product.image1_renditions.get("width"),
+            "image1_height": product.image1_renditions.get("height"),
+            "image1_placeholder": product.image1_renditions.get("placeholder", ""),
+            "id": product.product_id,
+        }
+        for product in products
+    ]
+
+
+def create_response_data(products, has_next):
+    """
+    Create response data for a page of products.
+
+    Args:
+        products (iterable): The products on the page.
+        has_next (bool): Whether there is a next page.
+
+    Returns:
+        dict: The response data.
+
+    """
+    return {"has_next": has_next, "data": serialize_products(products)}
+
+
+def create_cursor_response_data(products, next_cursor):
+    """
+    Create response data for a page of products in cursor pagination mode.
+
+    Args:
+        products (iterable): The products on the page.
+        next_cursor (str): The cursor of the next page, None on the last page.
 
     Returns:
         dict: The response data.
 
     """
-    data = {
-        "has_next": pg_obj.has_next(),
-        "data": [
-            {
-                "name": product.name,
-                "price": product.price,
-                "brand": product.brand.name,
-                "image1": product.image1.url,
-                "id": product.id,
-            }
-            for product in pg_obj.object_list
-        ],
+    return {"next": next_cursor, "data": serialize_products(products)}
+
+
+def get_page_number(page_number):
+    """
+    Convert a page query parameter to a positive integer.
+
+    Args:
+        page_number (str): The raw query parameter.
+
+    Returns:
+        int: The page number, 1 if the value is missing or invalid.
+    """
+    try:
+        return max(int(page_number), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def catalog_filters(request):
+    """
+    Parse the catalog filter parameters of the request.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        dict: The selected categories, styles and brands, the price range and
+        the "XXL" and "sale" flags.
+    """
+    categors = request.GET.get("categors")
+    return {
+        "categories": sorted(filter_data(request, CATEGORS)),
+        "styles": sorted(filter_data(request, STYLES)),
+        "brands": sorted(filter_data(request, BRANDS)),
+        "start_price": parse_price(request.GET.get("start")),
+        "end_price": parse_price(request.GET.get("end")),
+        "xxl": categors == "XXL",
+        "sale": categors == "sale",
     }
-    return data
 
 
-def catalog_api(request):
+def facet_counts_from_database(filters):
     """
-    API endpoint for catalog data.
+    Count the matching products per category, style and brand with one grouped
+    aggregate query.
+
+    As in FacetIndex.counts, the count of a facet value ignores the selection
+    of its own group.
+
+    Args:
+        filters (dict): The parsed catalog filters, see catalog_filters.
+
+    Returns:
+        dict: {"categories": {name: count}, "styles": {...}, "brands": {...}}.
+    """
+    products = filters_catalog_products(
+        [],
+        [],
+        [],
+        filters["start_price"],
+        filters["end_price"],
+        filters["xxl"],
+        filters["sale"],
+        "asc",
+        "price",
+    )
+    rows = (
+        products.order_by()
+        .values("category_name", "style_name", "brand_name")
+        .annotate(count=Count("product_id"))
+    )
+    counts = {"categories": {}, "styles": {}, "brands": {}}
+    for row in rows:
+        names = {
+            "categories": row["category_name"],
+            "styles": row["style_name"],
+            "brands": row["brand_name"],
+        }
+        selected = {
+            group: not filters[group] or names[group] in filters[group]
+            for group in counts
+        }
+        for group in counts:
+            if all(selected[other] for other in counts if other != group):
+                counts[group][names[group]] = (
+                    counts[group].get(names[group], 0) + row["count"]
+                )
+    return counts
+
+
+def get_facet_counts(filters):
+    """
+    Return the facet counts for the filters, cached per normalized filter set.
+
+    Args:
+        filters (dict): The parsed catalog filters, see catalog_filters.
+
+    Returns:
+        dict: The counts keyed by the request parameter of each facet value,
+        e.g. {"categories": {"bras": 3}, "brands": {"avelin": 0}, ...}.
+    """
+    filter_key = json.dumps(filters, sort_keys=True, default=str)
+    cache_key = "catalog_facets:%s:%s" % (
+        catalog_cache.get_catalog_version(),
+        hashlib.md5(filter_key.encode("utf-8")).hexdigest(),
+    )
+    counts = cache.get(cache_key)
+    if counts is None:
+        if getattr(settings, "CATALOG_FACET_INDEX", True):
+            counts = facet_index.counts(**filters)
+        else:
+            counts = facet_counts_from_database(filters)
+        groups = {"categories": CATEGORS, "styles": STYLES, "brands": BRANDS}
+        counts = {
+            group: {name.lower(): counts[group].get(name, 0) for name in sorted(names)}
+            for group, names in groups.items()
+        }
+        cache.set(cache_key, counts, getattr(settings, "CATALOG_FACET_COUNTS_TTL", 300))
+    return counts
+
+
+def catalog_page_from_index(request, page_number, cursor, per_page):
+    """
+    Answer a catalog page from the in-memory facet index.
+
+    Only the products on the requested page are fetched from the database.
 
     Args:
         request (HttpRequest): The HTTP request object.
+        page_number (str): The requested page number.
+        cursor (str): The cursor of the previous page, None in page-number mode.
+        per_page (int): The number of products per page.
 
     Returns:
-        JsonResponse: The JSON response.
+        tuple: The list of products, a flag telling whether more pages follow
+        and the cursor of the next page.
 
+    Raises:
+        InvalidCursor: If the cursor is malformed.
+    """
+    entries, has_next = facet_index.search(
+        **catalog_filters(request),
+        sort_by=request.GET.get("sort_by"),
+        sort_direction=request.GET.get("sort_direction"),
+        offset=0
+        if cursor is not None
+        else (get_page_number(page_number) - 1) * per_page,
+        limit=per_page,
+        after=decode_cursor(cursor),
+    )
+    product_ids = [product_id for _, product_id in entries]
+    products = ProductCatalogEntry.objects.in_bulk(product_ids)
+    next_cursor = encode_cursor(*entries[-1]) if has_next else None
+    return (
+        [products[id] for id in product_ids if id in products],
+        has_next,
+        next_cursor,
+    )
+
+
+def catalog_page_from_database(request, page_number, cursor, per_page):
+    """
+    Answer a catalog page with ORM queries.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        page_number (str): The requested page number.
+        cursor (str): The cursor of the previous page, None in page-number mode.
+        per_page (int): The number of products per page.
+
+    Returns:
+        tuple: The list of products, a flag telling whether more pages follow
+        and the cursor of the next page.
+
+    Raises:
+        InvalidCursor: If the cursor is malformed.
     """
-    page_number = request.GET.get("page")
     sort_by = request.GET.get("sort_by")
     sort_direction = request.GET.get("sort_direction")
     start_price = request.GET.get("start")
     end_price = request.GET.get("end")
     categors = request.GET.get("categors")
 
-    product_xxl = set()
-    product_sale_id = set()
-
-    # Check for specific category "XXL" or "sale" to filter the products
-    if categors == "XXL":
-        product_xxl = filters_categors_xxl()
-
-    if categors == "sale":
-        product_sale_id = filters_categors_sale()
-
     # Create the filters based on the selected categories, styles, brands, and price range
     filtered_categories = filter_data(request, CATEGORS)
     filters_style = filter_data(request, STYLES)
@@ -350,19 +529,244 @@ def catalog_api(request):
         filters_brand,
         start_price,
         end_price,
-        product_xxl,
-        product_sale_id,
+        categors == "XXL",
+        categors == "sale",
         sort_direction,
         sort_by,
     )
-    page_obj = paginator_products(products, page_number, 12)
+    if cursor is not None:
+        sort_field = SORT_FIELDS.get(sort_by, SORT_FIELDS[DEFAULT_SORT])
+        products, next_cursor = keyset_paginate(
+            products,
+            sort_field,
+            sort_direction,
+            cursor,
+            per_page,
+        )
+        return products, next_cursor is not None, next_cursor
+
+    page_obj = paginator_products(products, page_number, per_page)
+    return page_obj.object_list, page_obj.has_next(), None
+
+
+def catalog_cache_params(request):
+    """
+    Canonicalize the catalog query parameters for the response cache.
+
+    Unknown parameters are stripped, boolean filters are normalized and
+    default values are filled in, so equivalent requests share a cache key.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        str: The canonical, URL-encoded parameters.
+    """
+    params = {}
+    for name in CATEGORS | STYLES | BRANDS:
+        if request.GET.get(name.lower()) == "true":
+            params[name.lower()] = "true"
+    categors = request.GET.get("categors")
+    if categors in {"XXL", "sale"} or any(
+        categors == name.lower() for name in CATEGORS | STYLES | BRANDS
+    ):
+        params["categors"] = categors
+    for name in ("start", "end"):
+        price = parse_price(request.GET.get(name))
+        if price is not None:
+            params[name] = str(price.normalize())
+    sort_by = request.GET.get("sort_by")
+    params["sort_by"] = sort_by if sort_by in SORT_FIELDS else DEFAULT_SORT
+    params["sort_direction"] = (
+        "desc" if request.GET.get("sort_direction") == "desc" else "asc"
+    )
+    if "cursor" in request.GET:
+        params["cursor"] = request.GET["cursor"]
+    else:
+        params["page"] = get_page_number(request.GET.get("page"))
+    if request.GET.get("facets") == "1":
+        params["facets"] = "1"
+    return urlencode(sorted(params.items()))
+
+
+def build_catalog_data(request):
+    """
+    Build the catalog response data.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
 
-    return JsonResponse(create_response_data(page_obj))
+    Returns:
+        dict: The response data.
+
+    Raises:
+        InvalidCursor: If the cursor is malformed.
+    """
+    page_number = request.GET.get("page")
+    cursor = request.GET.get("cursor")
 
+    if getattr(settings, "CATALOG_FACET_INDEX", True):
+        catalog_page = catalog_page_from_index
+    else:
+        catalog_page = catalog_page_from_database
 
+    products, has_next, next_cursor = catalog_page(request, page_number, cursor, 12)
+
+    if cursor is not None:
+        data = create_cursor_response_data(products, next_cursor)
+    else:
+        data = create_response_data(products, has_next)
+    if request.GET.get("facets") == "1":
+        data["facets"] = get_facet_counts(catalog_filters(request))
+    return data
+
+
+@catalog_cache.conditional_response("catalog_api", catalog_cache_params)
+def catalog_api(request):
+    """
+    API endpoint for catalog data.
+
+    The page is answered from the in-memory facet index unless the
+    CATALOG_FACET_INDEX setting is disabled. Passing a ``cursor`` parameter
+    (empty for the first page) switches to keyset pagination: the response
+    then carries an opaque ``next`` token instead of ``has_next``. With
+    ``facets=1`` the response also carries per-facet product counts.
+
+    Responses are cached per canonical parameters and catalog version; the
+    X-Cache header tells whether the response came from the cache. A
+    matching If-None-Match header is answered with 304.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        JsonResponse: The JSON response.
+
+    """
+    cache_key = catalog_cache.make_key("catalog_api", catalog_cache_params(request))
+    try:
+        data, hit = catalog_cache.get_or_build(
+            cache_key, lambda: build_catalog_data(request)
+        )
+    except InvalidCursor:
+        return JsonResponse({"message": "Error: Invalid cursor."}, status=400)
+
+    response = JsonResponse(data)
+    response["X-Cache"] = "HIT" if hit else "MISS"
+    return response
+
+
+class CatalogCacheStatsView(UserPassesTestMixin, View):
+    """
+    View returning the catalog response cache hit/miss counters (staff only).
+    """
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request):
+        """
+        Handle GET request and return the cache counters.
+
+        Returns:
+            JsonResponse: The hits, misses, hit ratio and catalog version.
+        """
+        return JsonResponse(catalog_cache.stats())
+
+
+def product_cache_params(request):
+    """
+    Canonicalize the product_api query parameters for the ETag.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        str: The canonical, URL-encoded parameters.
+    """
+    params = {
+        "category_by": request.GET.get("category_by", ""),
+        "product_id": request.GET.get("product_id", ""),
+    }
+    if "cursor" in request.GET:
+        params["cursor"] = request.GET["cursor"]
+    else:
+        params["page"] = get_page_number(request.GET.get("page"))
+    return urlencode(sorted(params.items()))
+
+
+def get_recommended_entries(product_id):
+    """
+    Return the catalog entries recommended for a product.
+
+    Args:
+        product_id (int): The ID of the product.
+
+    Returns:
+        list: The ProductCatalogEntry objects, best first. Empty if the
+        recommendations of the product have not been computed.
+    """
+    recommendation = ProductRecommendation.objects.filter(pk=product_id).first()
+    if recommendation is None:
+        return []
+    return get_catalog_entries(recommendation.get_product_ids())
+
+
+def get_catalog_entries(product_ids):
+    """
+    Return the catalog entries of products in the given order.
+
+    Args:
+        product_ids (list): The product IDs.
+
+    Returns:
+        list: The ProductCatalogEntry objects of the products that still exist.
+    """
+    if not product_ids:
+        return []
+    entries = ProductCatalogEntry.objects.in_bulk(product_ids)
+    return [entries[pk] for pk in product_ids if pk in entries]
+
+
+def paginate_list_by_cursor(items, cursor, per_page):
+    """
+    Return the page of a precomputed list that follows the given cursor.
+
+    The cursor holds the position of the last item of the previous page.
+
+    Args:
+        items (list): The objects to paginate.
+        cursor (str): The cursor token of the previous page, empty for the first page.
+        per_page (int): The number of items per page.
+
+    Returns:
+        tuple: The list of items and the cursor of the next page (None on the last page).
+
+    Raises:
+        InvalidCursor: If the cursor is malformed.
+    """
+    position = decode_cursor(cursor)
+    start = 0
+    if position is not None:
+        try:
+            start = int(position[0]) + 1
+        except ValueError as error:
+            raise InvalidCursor(cursor) from error
+    page = items[start : start + per_page]
+    if start + per_page >= len(items):
+        return page, None
+    return page, encode_cursor(start + per_page - 1, page[-1].pk)
+
+
+@catalog_cache.conditional_response("product_api", product_cache_params)
 def product_api(request):
     """
-    API view for retrieving product data.
+    API view for retrieving the products recommended for a product.
+
+    Serves the precomputed recommendations of the product (see
+    womanshop/recommendations.py) and falls back to the other products of
+    the category when there are none yet. Passing a ``cursor``
+    parameter (empty for the first page) switches to cursor pagination.
 
     Args:
         request (HttpRequest): The HTTP request object.
@@ -377,28 +781,95 @@ def product_api(request):
 
     # Get the request parameters
     page_number = request.GET.get("page")  # Page number
+    cursor = request.GET.get("cursor")  # Cursor of the previous page
     category = request.GET.get("category_by")  # Product category
     product_id = request.GET.get("product_id")  # Product ID
 
-    # Get the category ID based on the category name
-    category_id = get_object_or_404(Category, name=category).id
+    products = get_recommended_entries(int(product_id))
+    if products:
+        if cursor is not None:
+            try:
+                products, next_cursor = paginate_list_by_cursor(products, cursor, 3)
+            except InvalidCursor:
+                return JsonResponse({"message": "Error: Invalid cursor."}, status=400)
+            return JsonResponse(create_cursor_response_data(products, next_cursor))
+        page_obj = paginator_products(products, page_number, 3)
+        return JsonResponse(
+            create_response_data(page_obj.object_list, page_obj.has_next())
+        )
+
+    # Make sure the category exists
+    dimensions.get_id_or_404(Category, category)
 
     # Filter products by category and exclude the specified product
-    products = Product.objects.filter(category_id=category_id).exclude(
-        id=int(product_id)
+    products = (
+        ProductCatalogEntry.objects.filter(category_name=category)
+        .exclude(product_id=int(product_id))
+        .order_by("pk")
     )
 
+    if cursor is not None:
+        try:
+            products, next_cursor = keyset_paginate(products, "pk", "asc", cursor, 3)
+        except InvalidCursor:
+            return JsonResponse({"message": "Error: Invalid cursor."}, status=400)
+        return JsonResponse(create_cursor_response_data(products, next_cursor))
+
     page_obj = paginator_products(products, page_number, 3)
 
     return JsonResponse(
-        create_response_data(page_obj)
+        create_response_data(page_obj.object_list, page_obj.has_next())
     )  # Return a JSON response with the data
 
 
+def search_products(search_term):
+    """
+    Find the products matching a search term.
+
+    Args:
+        search_term (str): The search query.
+
+    Returns:
+        list: Dictionaries with the name and ID of the matching products.
+    """
+    limit = getattr(settings, "SEARCH_RESULTS_LIMIT", 10)
+    if not search_term:
+        return []
+    if getattr(settings, "SEARCH_INDEX", True):
+        # Ranked prefix/fuzzy search over the in-memory index
+        return [
+            {"name": name, "id": product_id}
+            for product_id, name in search_index.search(search_term, limit)
+        ]
+    # Full-text search in the database
+    products = get_search_backend().search(Product.objects.all(), search_term)
+    return list(products.values("name", "id")[:limit])
+
+
+def search_cache_params(request):
+    """
+    Canonicalize the search query parameters for the ETag.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        str: The canonical, URL-encoded parameters.
+    """
+    return urlencode({"q": request.GET.get("q") or ""})
+
+
+@catalog_cache.conditional_response("search", search_cache_params)
 def search_view(request):
     """
     View function for handling product search.
 
+    Results come from the in-memory search index (ranked, prefix and typo
+    tolerant) unless the SEARCH_INDEX setting is disabled, and are limited
+    to SEARCH_RESULTS_LIMIT products. Otherwise the database search backend
+    is used (see womanshop/search_backends.py). They are cached like catalog_api
+    responses, and identical concurrent searches are computed once.
+
     Args:
         request (HttpRequest): The HTTP request object.
 
@@ -407,15 +878,29 @@ def search_view(request):
 
     """
     search_term = request.GET.get("q")
-    results = []
+    cache_key = catalog_cache.make_key("search", search_cache_params(request))
+    results, hit = catalog_cache.get_or_build(
+        cache_key, lambda: search_products(search_term)
+    )
+
+    response = JsonResponse(results, safe=False)
+    response["X-Cache"] = "HIT" if hit else "MISS"
+    return response
 
-    if search_term:
-        # Perform case-insensitive search for products that contain the search term in their name
-        results = Product.objects.filter(name__icontains=search_term).values(
-            "id", "name"
-        )
 
-    return JsonResponse(list(results), safe=False)
+@catalog_cache.conditional_response("autocomplete", search_cache_params)
+def autocomplete_view(request):
+    """
+    View function returning the most popular product and brand completions
+    of the typed prefix.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        JsonResponse: JSON list of completions with type, id, name and url.
+    """
+    return JsonResponse(autocomplete.complete(request.GET.get("q") or ""), safe=False)
 
 
 class CatalogView(TemplateView):
@@ -455,12 +940,121 @@ class CatalogView(TemplateView):
         context["catalog_api_url"] = reverse("catalog_api")
 
         # Displaying the number of items in the cart
-        context["item_in_cart"] = len(self.request.session.get("cart", []))
-        context["favorites_id"] = json.dumps(self.request.session.get("favorite", []))
+        context["item_in_cart"] = carts.cart_size(self.request)
+        context["favorites_id"] = json.dumps(carts.favorite_ids(self.request))
 
         return context
 
 
+def get_availability(product_id):
+    """
+    Build the color -> size -> stock matrix of a product with one query.
+
+    Args:
+        product_id (int): The ID of the product.
+
+    Returns:
+        dict: {color name: {size name: stock}} in variant order.
+    """
+    return get_availability_many([product_id])[product_id]
+
+
+def get_availability_many(product_ids):
+    """
+    Build the color -> size -> stock matrices of several products with one query.
+
+    Args:
+        product_ids (list): The IDs of the products.
+
+    Returns:
+        dict: {product ID: {color name: {size name: stock}}}; products
+        without variants map to an empty matrix.
+    """
+    availability = {product_id: {} for product_id in product_ids}
+    variants = (
+        ProductVariant.objects.filter(product_id__in=product_ids)
+        .order_by("id")
+        .values_list("product_id", "color__name", "size__name", "stock")
+    )
+    for product_id, color, size, stock in variants:
+        availability[product_id].setdefault(color, {})[size] = stock
+    return availability
+
+
+def get_stock_product_ids(request):
+    """
+    Parse the product IDs of a stock_api request.
+
+    IDs are given as repeated or comma separated ``product_id`` parameters.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        list: The sorted unique IDs, or None if they are missing, invalid or
+        more than STOCK_API_MAX_PRODUCTS.
+    """
+    try:
+        product_ids = {
+            int(value)
+            for values in request.GET.getlist("product_id")
+            for value in values.split(",")
+        }
+    except ValueError:
+        return None
+    if not product_ids or len(product_ids) > STOCK_API_MAX_PRODUCTS:
+        return None
+    return sorted(product_ids)
+
+
+def stock_etag(request):
+    """
+    Compute the stock_api ETag from the stock versions of the requested products.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        str: The weak ETag, or None for an invalid request.
+    """
+    product_ids = get_stock_product_ids(request)
+    if product_ids is None:
+        return None
+    versions = catalog_cache.get_stock_versions(product_ids)
+    raw = ",".join(f"{product_id}:{versions[product_id]}" for product_id in product_ids)
+    return f'W/"stock-{hashlib.md5(raw.encode()).hexdigest()}"'
+
+
+@condition(etag_func=stock_etag)
+def stock_api(request):
+    """
+    API view returning the stock of every variant of one or many products.
+
+    A matching If-None-Match header is answered with 304 without touching
+    the database; the ETag changes whenever a variant of one of the
+    products changes.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        JsonResponse: {"products": {product ID: {color: {size: stock}}}}.
+    """
+    product_ids = get_stock_product_ids(request)
+    if product_ids is None:
+        return JsonResponse(
+            {"message": f"Error: Pass 1 to {STOCK_API_MAX_PRODUCTS} product IDs."},
+            status=400,
+        )
+    availability = get_availability_many(product_ids)
+    response = JsonResponse(
+        {"products": {str(pk): matrix for pk, matrix in availability.items()}}
+    )
+    # Let clients poll with If-None-Match
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
 class ProductDetailView(TemplateView):
     """View class for displaying product details."""
 
@@ -478,55 +1072,112 @@ class ProductDetailView(TemplateView):
         """
         context = super().get_context_data(**kwargs)
         product_id = kwargs.get("product_id")
-        product = Product.objects.get(
-            id=product_id
-        )  # Get the product object based on the id
-        product_variant = ProductVariant.objects.filter(
-            product_id=product.id
-        )  # Get the product variants
-        colors = {
-            obj.color.name for obj in product_variant
-        }  # Get unique colors from the product variants
-        data = []
+        # Get the product object based on the id, with its precomputed lists
+        product = Product.objects.select_related(
+            "brand", "category", "recommendation"
+        ).get(id=product_id)
+        availability = get_availability(product.id)  # Color -> size -> stock
         user = self.request.user
 
         # Check if the product is in favorites and add the favorite flag to the context if it is
-        if product_id in self.request.session.get("favorite", []):
+        favorite_ids = carts.favorite_ids(self.request)
+        if product_id in favorite_ids:
             context["favorite"] = True
 
-        for color in list(colors):
-            # Create a dictionary with information about the color and associated sizes
-            data.append(
-                {
-                    "color": color,
-                    "sizes": ",".join(
-                        [
-                            obj.size.name
-                            for obj in product_variant
-                            if color == obj.color.name
-                        ]
-                    ),
-                }
-            )
+        # Information about every color and its sizes
+        data = [
+            {"color": color, "sizes": ",".join(sizes)}
+            for color, sizes in availability.items()
+        ]
 
         context["product"] = product  # Add the product object to the context
         context["data"] = data  # Add the list of data to the context
+        context["availability"] = availability  # Rendered as JSON for product.js
+        try:
+            bought_together = product.recommendation.get_bought_together_ids()
+        except ProductRecommendation.DoesNotExist:
+            bought_together = []
+        context["bought_together"] = get_catalog_entries(bought_together)
         context[
             "user"
         ] = (
             user.is_authenticated
         )  # Add information about the authenticated user to the context
-        context[
-            "product_variant"
-        ] = product_variant  # Add the product variants to the context
-        context["item_in_cart"] = len(
-            self.request.session.get("cart", [])
+        context["item_in_cart"] = carts.cart_size(
+            self.request
         )  # Add the count of items in the cart to the context
-        context["favorites_id"] = json.dumps(self.request.session.get("favorite", []))
+        context["favorites_id"] = json.dumps(favorite_ids)
 
         return context  # Return the context data
 
 
+def get_variant(product_id, color, size):
+    """
+    Return the ID and the stock of a product variant given by color and size names.
+
+    The names are resolved through the dimension registry, so only the
+    variant itself is read from the database.
+
+    Args:
+        product_id (int): The ID of the product.
+        color (str): The color name.
+        size (str): The size name.
+
+    Returns:
+        tuple: The ID and the stock of the variant.
+
+    Raises:
+        Http404: If the color, the size or the variant does not exist.
+    """
+    variant = (
+        ProductVariant.objects.filter(
+            product_id=product_id,
+            color_id=dimensions.get_id_or_404(Color, color),
+            size_id=dimensions.get_id_or_404(Size, size),
+        )
+        .values_list("id", "stock")
+        .first()
+    )
+    if variant is None:
+        raise Http404("No ProductVariant matches the given query.")
+    return variant
+
+
+def get_variant_stock(product_id, color, size):
+    """
+    Return the stock of a product variant given by color and size names.
+
+    Args:
+        product_id (int): The ID of the product.
+        color (str): The color name.
+        size (str): The size name.
+
+    Returns:
+        int: The stock of the variant.
+
+    Raises:
+        Http404: If the color, the size or the variant does not exist.
+    """
+    return get_variant(product_id, color, size)[1]
+
+
+def parse_quantity(value):
+    """
+    Parse a positive item quantity sent by the cart scripts.
+
+    Args:
+        value: The quantity, a number or a numeric string.
+
+    Returns:
+        int: The quantity, or None if it is not a positive integer.
+    """
+    try:
+        quantity = int(value)
+    except (TypeError, ValueError):
+        return None
+    return quantity if quantity > 0 else None
+
+
 class AddToCartView(LoginRequiredMixin, View):
     """
     View class to add a product to the cart for authenticated users.
@@ -551,24 +1202,20 @@ class AddToCartView(LoginRequiredMixin, View):
             json_data = json.loads(data)
             color = json_data.get("color")
             size = json_data.get("size")
-            quantity = json_data.get("quantity")
+            quantity = parse_quantity(json_data.get("quantity"))
 
             if color and size and quantity:
-                cart = request.session.get("cart", [])
-                cart.append([product_id, color, size, quantity])
-                request.session["cart"] = cart
-                # Fetch stock information from the database
-                product = get_object_or_404(Product, id=product_id)
-                color_id = get_object_or_404(Color, name=color).id
-                size_id = get_object_or_404(Size, name=size).id
-                stock = ProductVariant.objects.filter(
-                    product=product, color_id=color_id, size_id=size_id
-                ).values("stock")
+                # Fetch the variant and its stock from the database
+                variant_id, stock = get_variant(product_id, color, size)
+                carts.add_line(
+                    carts.get_cart(request, create=True), variant_id, quantity
+                )
                 # Return a successful response
                 return JsonResponse(
                     {
                         "message": "Data received and processed successfully.",
-                        "stock": stock[0]["stock"],
+                        "stock": stock,
+                        "item_in_cart": carts.cart_size(request),
                     }
                 )
 
@@ -599,15 +1246,10 @@ class AvailableProductQuantityView(LoginRequiredMixin, View):
             size = json_data.get("size")
 
             if color and size:
-                product = get_object_or_404(Product, id=product_id)
-                color_id = get_object_or_404(Color, name=color).id
-                size_id = get_object_or_404(Size, name=size).id
-                stock = ProductVariant.objects.filter(
-                    product=product, color_id=color_id, size_id=size_id
-                ).values("stock")
+                stock = get_variant_stock(product_id, color, size)
 
                 # Return JSON response with stock quantity
-                return JsonResponse({"stock": stock[0]["stock"]})
+                return JsonResponse({"stock": stock})
 
 
 class CartView(LoginRequiredMixin, TemplateView):
@@ -636,32 +1278,30 @@ class CartView(LoginRequiredMixin, TemplateView):
         """
 
         context = super().get_context_data(**kwargs)
-        cart = self.request.session.get("cart", [])
+        # One query for the lines with their variants and products
+        lines = carts.cart_lines(self.request).select_related(
+            "product_variant__product"
+        )
         product_data = []
-        for id, data in enumerate(cart):
-            product_obj = get_object_or_404(Product, id=data[0])
-            color = get_object_or_404(Color, name=data[1])
-            size = get_object_or_404(Size, name=data[2])
-            stock = ProductVariant.objects.filter(
-                product=product_obj, color_id=color.id, size_id=size.id
-            ).values("stock")
-            subtotal = product_obj.price * Decimal(data[3])
+        for line in lines:
+            variant = line.product_variant
+            subtotal = variant.product.price * line.quantity
             product_data.append(
                 {
-                    "id": id,
-                    "product": product_obj,
-                    "quantity": data[3],
+                    "id": line.id,
+                    "product": variant.product,
+                    "quantity": line.quantity,
                     "subtotal": subtotal,
-                    "stock": stock[0]["stock"],
-                    "color": color.name,
-                    "size": size.name,
+                    "stock": variant.stock,
+                    "color": dimensions.name_for(Color, variant.color_id),
+                    "size": dimensions.name_for(Size, variant.size_id),
                 }
             )
         item_id = [[item["id"], item["stock"]] for item in product_data]
         context["items_id"] = json.dumps(item_id)
         context["cart_items"] = product_data
         context["cart_total"] = sum(item["subtotal"] for item in product_data)
-        context["item_in_cart"] = len(self.request.session.get("cart", []))
+        context["item_in_cart"] = len(product_data)
         return context
 
 
@@ -679,15 +1319,12 @@ class RemoveFromCartView(LoginRequiredMixin, View):
 
         Args:
             request (HttpRequest): The request object.
-            id (int): The identifier of the item to remove.
+            id (int): The ID of the cart line to remove.
 
         Returns:
             HttpResponseRedirect: Redirects to the cart page.
         """
-        item_cart = request.session.get("cart")
-        if item_cart and str(id):
-            del item_cart[id]
-            request.session["cart"] = item_cart
+        carts.cart_lines(request).filter(id=id).delete()
         return redirect("cart")
 
 
@@ -708,9 +1345,8 @@ class ClearCartView(LoginRequiredMixin, View):
         Returns:
             A redirect to the "cart" URL.
         """
-        if request.session.get("cart"):
-            request.session["cart"] = []
-            return redirect("cart")
+        carts.cart_lines(request).delete()
+        return redirect("cart")
 
 
 class CartQuantityUpdateView(LoginRequiredMixin, View):
@@ -739,15 +1375,21 @@ class CartQuantityUpdateView(LoginRequiredMixin, View):
 
         """
         data = request.body.decode("utf-8")
-        cart = request.session.get("cart")
 
-        if data and cart:
+        if data:
             json_data = json.loads(data)
-            quantity = json_data.get("quantity")
-            index = json_data.get("index")
-            cart[index][3] = quantity
-            request.session["cart"] = cart
-            return JsonResponse({"message": "Количество товаров в корзине обновлено."})
+            quantity = parse_quantity(json_data.get("quantity"))
+            line_id = json_data.get("line")
+            if quantity and line_id is not None:
+                updated = (
+                    carts.cart_lines(request)
+                    .filter(id=line_id)
+                    .update(quantity=quantity)
+                )
+                if updated:
+                    return JsonResponse(
+                        {"message": "Количество товаров в корзине обновлено."}
+                    )
 
         return JsonResponse(
             {"message": "Error: No data provided or request method is not POST."},
@@ -769,12 +1411,14 @@ class AddFavorite(View):
 
         """
         data = request.body.decode("utf-8")
-        favorite = request.session.get("favorite", [])
         if data:
             json_data = json.loads(data)
-            favorite_id = json_data.get("favorite")
-            favorite.append(int(favorite_id))
-            request.session["favorite"] = list(set(favorite))
+            product = get_object_or_404(
+                Product.objects.only("id"), id=int(json_data.get("favorite"))
+            )
+            Favorite.objects.get_or_create(
+                cart=carts.get_cart(request, create=True), product=product
+            )
             return JsonResponse({"message": "Товар добавлен в фавориты."})
         return JsonResponse(
             {"message": "Error: No data provided or request method is not POST."},
@@ -796,14 +1440,14 @@ class RemoveFromFavorites(View):
 
         """
         data = request.body.decode("utf-8")
-        if request.session.get("favorite") and data:
-            favorites = request.session["favorite"]
+        if data:
             json_data = json.loads(data)
             favorite_id = json_data.get("favorite")
 
-            if int(favorite_id) in favorites:
-                favorites.remove(int(favorite_id))
-                request.session["favorite"] = favorites
+            deleted, _ = (
+                carts.favorites(request).filter(product_id=int(favorite_id)).delete()
+            )
+            if deleted:
                 return JsonResponse({"message": "Product removed from favorites."})
             return JsonResponse(
                 {"message": "Error: Not a favorite or request method is not POST."},
@@ -831,7 +1475,8 @@ class CheckoutTemplateView(TemplateView):
         context = super().get_context_data(**kwargs)
         user = get_object_or_404(User, username=self.request.user)
         user_profile = get_object_or_404(UserProfile, user=user)
-        cart_items = self.request.session.get("cart", [])
+        cart_lines = carts.cart_lines(self.request)
+        cart_items = list(cart_lines.select_related("product_variant__product"))
         if cart_items:
             with transaction.atomic():
                 order = Order.objects.create(
@@ -842,24 +1487,19 @@ class CheckoutTemplateView(TemplateView):
                 )
 
             for item in cart_items:
-                color = get_object_or_404(Color, name=item[1])
-                size = get_object_or_404(Size, name=item[2])
-                product_variant = ProductVariant.objects.filter(
-                    product_id=item[0],
-                    color_id=color.id,
-                    size_id=size.id,
-                ).first()
+                product_variant = item.product_variant
                 OrderItem.objects.create(
                     order=order,
                     product_variant=product_variant,
-                    quantity=item[3],
+                    quantity=item.quantity,
                     price=product_variant.product.price,
-                    subtotal=product_variant.product.price * Decimal(item[3]),
+                    subtotal=product_variant.product.price * item.quantity,
                 )
                 ProductVariant.objects.filter(id=product_variant.id).update(
-                    stock=product_variant.stock - int(item[3])
+                    stock=F("stock") - item.quantity
                 )
-        self.request.session["cart"] = []
+                catalog_cache.bump_stock_version(product_variant.product_id)
+        cart_lines.delete()
         context["order"] = order
         return context
 
@@ -881,17 +1521,12 @@ class CheckoutTemplateView(TemplateView):
         Calculate the total amount of the cart.
 
         Args:
-            cart (list): List of cart items.
+            cart (list): CartLine objects with their variants and products.
 
         Returns:
             decimal.Decimal: Total amount of the cart.
         """
-        total_cart = []
-        for data in cart:
-            product = get_object_or_404(Product, id=data[0])
-            subtotal = product.price * Decimal(data[3])
-            total_cart.append(subtotal)
-        return sum(total_cart)
+        return sum(line.product_variant.product.price * line.quantity for line in cart)
 
 
 class PayPalSuccessView(TemplateView):